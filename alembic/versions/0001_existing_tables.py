@@ -0,0 +1,80 @@
+"""Alterações a tabelas existentes que o create_all não aplica.
+
+Idempotente: numa base criada de raiz por `init_db` as colunas e índices já estão
+como nos modelos e nada é alterado; numa base antiga são acrescentados.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+"""
+from typing import List, Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _index_columns(table: str, name: str) -> Optional[List[str]]:
+    for index in sa.inspect(op.get_bind()).get_indexes(table):
+        if index["name"] == name:
+            return index["column_names"]
+    return None
+
+
+def _replace_index(table: str, name: str, columns: List[str]):
+    current = _index_columns(table, name)
+    if current == columns:
+        return
+    if current is not None:
+        op.drop_index(name, table_name=table)
+    op.create_index(name, table, columns)
+
+
+def _has_table(table: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(table)
+
+
+def _add_user_reference(table: str, column: str, index: str):
+    """Coluna opcional com FK para user (ON DELETE SET NULL) e o respetivo índice."""
+    if column not in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}:
+        op.add_column(table, sa.Column(column, sa.Integer(), nullable=True))
+        # O SQLite não acrescenta FKs a tabelas existentes; fica só a coluna
+        if op.get_bind().dialect.name != "sqlite":
+            op.create_foreign_key(f"{table}_{column}_fkey", table, "user", [column], ["userId"], ondelete="SET NULL")
+    _replace_index(table, index, [column])
+
+
+def _drop_user_reference(table: str, column: str, index: str):
+    if column in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}:
+        if _index_columns(table, index) is not None:
+            op.drop_index(index, table_name=table)
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column(column)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Vendedor do produto e vendedor a quem cada venda foi atribuída (analítica de vendas)
+    for table, index in (("product", "idx_product_seller"), ("order", "idx_order_seller"),
+                         ("orderline", "idx_order_line_seller")):
+        if _has_table(table):
+            _add_user_reference(table, "sellerId", index)
+    # Respostas de um comentário por ordem de criação (fio e paginação das respostas)
+    if _has_table("commentreply"):
+        _replace_index("commentreply", "idx_comment_reply_comment", ["commentId", "createdAt"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, index in (("orderline", "idx_order_line_seller"), ("order", "idx_order_seller"),
+                         ("product", "idx_product_seller")):
+        if _has_table(table):
+            _drop_user_reference(table, "sellerId", index)
+    if _has_table("commentreply"):
+        _replace_index("commentreply", "idx_comment_reply_comment", ["commentId"])
@@ -0,0 +1,108 @@
+"""Throughput de pedidos rápidos enquanto há consultas lentas em curso: Session síncrona vs AsyncSession.
+
+Simula uma consulta lenta em SQLite com uma função `sleep_ms` registada em cada ligação
+e dispara, em simultâneo, SLOW pedidos lentos e FAST pedidos rápidos (`SELECT 1`) contra
+duas rotas `async def`: uma usa a Session síncrona (bloqueia o event loop), a outra a
+AsyncSession (aiosqlite corre a consulta numa thread e liberta o loop).
+
+Uso:
+    python -m benchmarks.bench_async_sessions [--slow 20] [--fast 200] [--delay-ms 200]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+def _register_sleep(dbapi_connection, connection_record):
+    dbapi_connection.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000) or 0)
+
+
+def build_app(path: str, delay_ms: int) -> FastAPI:
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}, pool_size=64)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=64)
+    event.listen(engine, "connect", _register_sleep)
+    event.listen(async_engine.sync_engine, "connect", _register_sleep)
+
+    def get_session():
+        with Session(engine) as session:
+            yield session
+
+    async def get_async_session():
+        async with AsyncSession(async_engine) as session:
+            yield session
+
+    app = FastAPI()
+
+    @app.get("/sync/slow")
+    async def sync_slow(db: Session = Depends(get_session)):
+        return db.exec(text(f"SELECT sleep_ms({delay_ms})")).first()[0]
+
+    @app.get("/sync/fast")
+    async def sync_fast(db: Session = Depends(get_session)):
+        return db.exec(text("SELECT 1")).first()[0]
+
+    @app.get("/async/slow")
+    async def async_slow(db: AsyncSession = Depends(get_async_session)):
+        return (await db.exec(text(f"SELECT sleep_ms({delay_ms})"))).first()[0]
+
+    @app.get("/async/fast")
+    async def async_fast(db: AsyncSession = Depends(get_async_session)):
+        return (await db.exec(text("SELECT 1"))).first()[0]
+
+    return app
+
+
+async def run_mode(app: FastAPI, mode: str, slow: int, fast: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get(f"/{mode}/fast")
+        latencies = []
+
+        async def timed_fast():
+            start = time.perf_counter()
+            await client.get(f"/{mode}/fast")
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        slow_tasks = [asyncio.create_task(client.get(f"/{mode}/slow")) for _ in range(slow)]
+        await asyncio.sleep(0)
+        await asyncio.gather(*(timed_fast() for _ in range(fast)))
+        fast_elapsed = time.perf_counter() - start
+        await asyncio.gather(*slow_tasks)
+
+    latencies.sort()
+    return {
+        "fast_rps": fast / fast_elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--slow", type=int, default=20, help="consultas lentas em simultâneo")
+    parser.add_argument("--fast", type=int, default=200, help="pedidos rápidos medidos")
+    parser.add_argument("--delay-ms", type=int, default=200, help="duração de cada consulta lenta")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, "bench.db"), args.delay_ms)
+        for mode in ("sync", "async"):
+            result = asyncio.run(run_mode(app, mode, args.slow, args.fast))
+            print(f"{mode:>5} session: {result['fast_rps']:8.1f} fast req/s  "
+                  f"p50={result['p50_ms']:7.1f} ms  p99={result['p99_ms']:7.1f} ms  "
+                  f"({args.slow} x {args.delay_ms} ms slow queries in flight)")
+
+
+if __name__ == "__main__":
+    main()
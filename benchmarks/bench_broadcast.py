@@ -0,0 +1,115 @@
+"""Latência de broadcast com 10k ligações simuladas, algumas paradas.
+
+Compara o envio sequencial antigo (um `await send_text` por ligação) com o
+ConnectionManager (fila limitada + tarefa de escrita por ligação). Cada socket
+simulado demora `--send-us` a enviar; os sockets "parados" demoram `--stall-ms`.
+
+Uso:
+    python -m benchmarks.bench_broadcast [--connections 10000] [--stalled 50] [--messages 5]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from shared.websocket import ConnectionManager
+
+
+class Delivery:
+    """Conta as entregas aos sockets saudáveis e assinala quando todos receberam a mensagem."""
+
+    def __init__(self, expected: int):
+        self.expected = expected
+        self.counts = {}
+        self.done = {}
+
+    def arrived(self, message: str):
+        self.counts[message] = self.counts.get(message, 0) + 1
+        if self.counts[message] == self.expected:
+            self.done[message] = time.perf_counter()
+
+
+class SimulatedSocket:
+    def __init__(self, delay: float, delivery: Delivery = None):
+        self.delay = delay
+        self.delivery = delivery
+
+    async def send_text(self, message: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.delivery:
+            self.delivery.arrived(message)
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def build_sockets(connections: int, stalled: int, send_us: float, stall_ms: float):
+    delivery = Delivery(connections - stalled)
+    healthy = [SimulatedSocket(send_us / 1e6, delivery) for _ in range(connections - stalled)]
+    slow = [SimulatedSocket(stall_ms / 1000) for _ in range(stalled)]
+    sockets = healthy + slow
+    # Os sockets parados ficam espalhados pela lista, como numa sala real
+    random.Random(0).shuffle(sockets)
+    return delivery, sockets
+
+
+async def legacy(args) -> dict:
+    delivery, sockets = build_sockets(args.connections, args.stalled, args.send_us, args.stall_ms)
+    call_latencies, served = [], []
+    for i in range(args.messages):
+        message = f"m{i}"
+        start = time.perf_counter()
+        for socket in sockets:
+            await socket.send_text(message)
+        call_latencies.append(time.perf_counter() - start)
+        served.append(delivery.done[message] - start)
+    return {"call": call_latencies, "delivery": served}
+
+
+async def hub(args, policy: str) -> dict:
+    delivery, sockets = build_sockets(args.connections, args.stalled, args.send_us, args.stall_ms)
+    manager = ConnectionManager(queue_size=args.queue_size, policy=policy, send_timeout=60)
+    for socket in sockets:
+        manager.register(socket)
+    await asyncio.sleep(0)
+    call_latencies, served = [], []
+    for i in range(args.messages):
+        message = f"m{i}"
+        start = time.perf_counter()
+        await manager.broadcast(message)
+        call_latencies.append(time.perf_counter() - start)
+        while message not in delivery.done:
+            await asyncio.sleep(0.001)
+        served.append(delivery.done[message] - start)
+    stats = manager.stats()
+    for socket in list(manager.active_connections):
+        manager.disconnect(socket)
+    return {"call": call_latencies, "delivery": served, "stats": stats}
+
+
+def report(name: str, result: dict):
+    call = statistics.median(result["call"]) * 1000
+    delivery = statistics.median(result["delivery"]) * 1000
+    extra = f"  {result['stats']}" if "stats" in result else ""
+    print(f"{name:>22}: broadcast() p50={call:9.2f} ms  all healthy clients served p50={delivery:9.2f} ms{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--stalled", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--send-us", type=float, default=0, help="tempo de envio de um socket saudável")
+    parser.add_argument("--stall-ms", type=float, default=50, help="tempo de envio de um socket parado")
+    parser.add_argument("--queue-size", type=int, default=4)
+    args = parser.parse_args()
+
+    report("sequential (legacy)", asyncio.run(legacy(args)))
+    report("hub drop_oldest", asyncio.run(hub(args, "drop_oldest")))
+    report("hub disconnect", asyncio.run(hub(args, "disconnect")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Latência do checkout em função do tamanho do carrinho: um pedido por produto vs `/api/checkout/cart`.
+
+A versão antiga cria um Order por produto, cada um com o seu commit (o corpo de
+`/api/add/orders`), com o preço enviado pelo cliente; a nova é um `place_order` com
+todas as linhas. Cada tamanho é repetido `--repeat` vezes.
+
+Uso:
+    DATABASE_URL=sqlite:// python -m benchmarks.bench_cart [--repeat 200]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.utils.models import Category, Order, Product
+from src.utils.reservations import place_order
+
+SIZES = (1, 5, 20, 50, 100)
+PRODUCTS = 500
+
+
+async def one_order_per_line(db, buyer_id: int, lines):
+    for product_id, quantity in lines:
+        order = Order(buyerId=buyer_id, productId=product_id, itemQuantity=str(quantity), invoiceAmount=10.0)
+        db.add(order)
+        await db.commit()
+        await db.refresh(order)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    path = os.path.join(tempfile.mkdtemp(), "cart.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *a: statements.append(1))
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine) as db:
+        db.add(Category(categoryName="Casa"))
+        db.add_all(Product(productName=f"Produto {i}", unitPrice=round(rng.uniform(1, 100), 2),
+                           unitInStock=10 ** 9, unitInOrder=0, categoryId=1) for i in range(PRODUCTS))
+        await db.commit()
+
+    print(f"{'linhas':>6}  {'um pedido por linha':>30}  {'checkout do carrinho':>30}")
+    for size in SIZES:
+        results = []
+        for checkout in (one_order_per_line, place_order):
+            samples = []
+            statements.clear()
+            for buyer_id in range(args.repeat):
+                lines = [(product_id, rng.randint(1, 3)) for product_id in rng.sample(range(1, PRODUCTS + 1), size)]
+                async with AsyncSession(engine) as db:
+                    start = time.perf_counter()
+                    await checkout(db, buyer_id, lines)
+                    samples.append((time.perf_counter() - start) * 1000)
+            results.append(f"{statistics.median(samples):8.2f} ms {len(statements) / args.repeat:6.0f} instruções")
+        print(f"{size:>6}  {results[0]:>30}  {results[1]:>30}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
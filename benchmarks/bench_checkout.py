@@ -0,0 +1,90 @@
+"""Venda relâmpago: `--buyers` compradores em simultâneo a comprar um produto com `--stock` unidades.
+
+Compara a verificação em Python (ler o produto, comparar o stock, gravar o novo valor
+e o pedido) com `place_order` (UPDATE condicional ... RETURNING na transação do
+pedido). Mostra pedidos aceites, stock final, unidades vendidas a mais e a latência
+de cada compra.
+
+Uso:
+    DATABASE_URL=sqlite:// python -m benchmarks.bench_checkout [--buyers 2000] [--stock 500] [--concurrency 100]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.utils.models import Category, Order, Product
+from src.utils.reservations import place_order
+
+
+async def naive_order(db, buyer_id: int, lines):
+    (product_id, quantity), = lines
+    # Ler, verificar e escrever: dois compradores podem ler o mesmo stock
+    product = await db.get(Product, product_id)
+    if product.unitInStock < quantity:
+        raise HTTPException(status_code=409, detail="Stock insuficiente.")
+    product.unitInStock = product.unitInStock - quantity
+    db.add(product)
+    db.add(Order(buyerId=buyer_id, productId=product_id, itemQuantity=str(quantity)))
+    await db.commit()
+
+
+async def run(engine, order, buyers: int, concurrency: int):
+    queue = iter(range(1, buyers + 1))
+    latencies, rejected = [], 0
+
+    async def buyer():
+        nonlocal rejected
+        for buyer_id in queue:
+            start = time.perf_counter()
+            async with AsyncSession(engine) as db:
+                try:
+                    await order(db, buyer_id, [(1, 1)])
+                except HTTPException:
+                    rejected += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(buyer() for _ in range(concurrency)))
+    return time.perf_counter() - start, sorted(latencies), rejected
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--buyers", type=int, default=2000)
+    parser.add_argument("--stock", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    for label, order in (("ler + verificar", naive_order), ("UPDATE condicional", place_order)):
+        path = os.path.join(tempfile.mkdtemp(), "checkout.db")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=args.concurrency,
+                                     connect_args={"timeout": 60})
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        async with AsyncSession(engine) as db:
+            db.add(Category(categoryName="Promoções"))
+            db.add(Product(productName="Consola", unitPrice=299, unitInStock=args.stock, unitInOrder=0, categoryId=1))
+            await db.commit()
+
+        elapsed, latencies, rejected = await run(engine, order, args.buyers, args.concurrency)
+
+        async with AsyncSession(engine) as db:
+            orders = (await db.exec(select(func.count()).select_from(Order))).one()
+            stock = (await db.get(Product, 1)).unitInStock
+        print(f"{label:<20} {args.buyers / elapsed:6.0f} compras/s   p50 {statistics.median(latencies):6.1f} ms   "
+              f"p95 {latencies[int(len(latencies) * 0.95) - 1]:6.1f} ms   pedidos {orders}   recusados {rejected}   "
+              f"stock final {stock}   vendidas a mais {max(orders - args.stock, 0)}")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
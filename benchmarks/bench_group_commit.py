@@ -0,0 +1,81 @@
+"""Débito vs latência das inserções em `/api/add/orders`: um commit por pedido vs group commit.
+
+Cada nível de `--concurrency` lança `--requests` inserções de Order, pelo corpo atual
+da rota (add, commit, refresh) e por `GroupCommitQueue.add`. O ganho vem de partilhar
+o fsync do commit entre os pedidos que chegam juntos; com um só cliente o group
+commit só acrescenta a espera da janela.
+
+Uso:
+    DATABASE_URL=sqlite:// python -m benchmarks.bench_group_commit [--requests 2000] [--delay-ms 2] [--max-rows 200]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.utils.groupCommit import GroupCommitQueue
+from src.utils.models import Order
+
+LEVELS = (1, 10, 50, 200)
+
+
+async def per_request(engine, queue, buyer_id: int):
+    async with AsyncSession(engine) as db:
+        order = Order(buyerId=buyer_id, itemQuantity="1", invoiceAmount=10.0)
+        db.add(order)
+        await db.commit()
+        await db.refresh(order)
+
+
+async def grouped(engine, queue, buyer_id: int):
+    await queue.add(Order(buyerId=buyer_id, itemQuantity="1", invoiceAmount=10.0))
+
+
+async def run(engine, queue, create, requests: int, concurrency: int):
+    buyers = iter(range(requests))
+    latencies = []
+
+    async def client():
+        for buyer_id in buyers:
+            start = time.perf_counter()
+            await create(engine, queue, buyer_id)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    latencies.sort()
+    return requests / (time.perf_counter() - start), statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--delay-ms", type=float, default=2)
+    parser.add_argument("--max-rows", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'clientes':>8}  {'modo':<18} {'pedidos/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'linhas/lote':>12}")
+    for concurrency in LEVELS:
+        for label, create in (("commit por pedido", per_request), ("group commit", grouped)):
+            path = os.path.join(tempfile.mkdtemp(), "orders.db")
+            engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=concurrency,
+                                         connect_args={"timeout": 60})
+            async with engine.begin() as conn:
+                await conn.run_sync(SQLModel.metadata.create_all)
+            queue = GroupCommitQueue(Order, engine, delay=args.delay_ms / 1000, max_rows=args.max_rows)
+            queue.start()
+            throughput, p50, p99 = await run(engine, queue, create, args.requests, concurrency)
+            await queue.stop()
+            per_batch = queue.stats()["rowsPerBatch"] or 1
+            print(f"{concurrency:>8}  {label:<18} {throughput:10.0f} {p50:8.2f} {p99:8.2f} {per_batch:12.1f}")
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
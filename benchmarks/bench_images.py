@@ -0,0 +1,98 @@
+"""Bytes transferidos numa segunda visita: StaticFiles antigo vs /images com URLs imutáveis.
+
+Simula um browser com cache HTTP: respostas com `max-age`/`immutable` são servidas da
+cache sem pedido; as restantes são revalidadas com If-None-Match. Uma "visita" carrega
+`--avatars` imagens de `--size` KB.
+
+Uso:
+    python -m benchmarks.bench_images [--avatars 50] [--size 40] [--visits 5]
+"""
+import argparse
+import hashlib
+import os
+import re
+import tempfile
+
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+from fastapi.testclient import TestClient
+
+from shared import uploads
+from src.routers import image
+
+
+class BrowserCache:
+    def __init__(self, client: TestClient):
+        self.client = client
+        self.entries = {}
+        self.requests = 0
+        self.bytes = 0
+
+    def get(self, url: str):
+        entry = self.entries.get(url)
+        if entry and entry["fresh"]:
+            return
+        headers = {"If-None-Match": entry["etag"]} if entry and entry["etag"] else {}
+        response = self.client.get(url, headers=headers)
+        self.requests += 1
+        self.bytes += len(response.content) + sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+        cache_control = response.headers.get("cache-control", "")
+        max_age = re.search(r"max-age=(\d+)", cache_control)
+        self.entries[url] = {
+            "etag": response.headers.get("etag"),
+            "fresh": bool(max_age and int(max_age.group(1)) > 0),
+        }
+
+    def visit(self, urls):
+        before_requests, before_bytes = self.requests, self.bytes
+        for url in urls:
+            self.get(url)
+        return self.requests - before_requests, self.bytes - before_bytes
+
+
+def make_avatars(root: str, count: int, size_kb: int):
+    legacy, hashed = [], []
+    for i in range(count):
+        content = os.urandom(size_kb * 1024)
+        name = f"{i}_avatar.png"
+        with open(os.path.join(root, "seller_images", name), "wb") as f:
+            f.write(content)
+        legacy.append(f"/seller_images/{name}")
+        digest = hashlib.sha256(content).hexdigest()
+        relative = uploads.content_path("seller_images", digest, ".png")
+        os.makedirs(os.path.join(root, os.path.dirname(relative)), exist_ok=True)
+        with open(os.path.join(root, relative), "wb") as f:
+            f.write(content)
+        hashed.append("/images/" + relative.replace(os.sep, "/"))
+    return legacy, hashed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--avatars", type=int, default=50)
+    parser.add_argument("--size", type=int, default=40, help="tamanho de cada imagem em KB")
+    parser.add_argument("--visits", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        uploads.UPLOAD_ROOT = root
+        os.makedirs(os.path.join(root, "seller_images"))
+        legacy_urls, hashed_urls = make_avatars(root, args.avatars, args.size)
+
+        legacy_app = FastAPI()
+        legacy_app.mount("/seller_images", StaticFiles(directory=os.path.join(root, "seller_images")))
+        new_app = FastAPI()
+        new_app.include_router(image.router)
+
+        for name, app, urls in (("StaticFiles", legacy_app, legacy_urls), ("/images", new_app, hashed_urls)):
+            cache = BrowserCache(TestClient(app))
+            first = cache.visit(urls)
+            repeat = [cache.visit(urls) for _ in range(args.visits)]
+            repeat_requests = sum(r for r, _ in repeat) / args.visits
+            repeat_bytes = sum(b for _, b in repeat) / args.visits
+            print(f"{name:>12}: 1ª visita {first[0]} pedidos / {first[1] / 1024:8.1f} KB   "
+                  f"visitas seguintes {repeat_requests:.0f} pedidos / {repeat_bytes / 1024:8.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Likes por segundo num único comentário muito popular: contador lido/incrementado em Python vs write-behind.
+
+A versão antiga (ler a linha, somar 1, commit, refresh) corre com `--concurrency`
+pedidos em simultâneo e perde atualizações; a nova regista cada like em CommentLike
+e acumula o contador em memória, escrito em lote por `LikeCounter.flush`.
+
+Uso:
+    python -m benchmarks.bench_likes [--likes 5000] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.utils.likes import add_like, like_counter
+from src.utils.models import Comment, User
+
+
+async def old_like(engine, comment_id: int, user_id: int):
+    # Cópia da rota anterior: três idas à base de dados e incremento fora da transação
+    async with AsyncSession(engine) as session:
+        comment = await session.get(Comment, comment_id)
+        comment.totalLikes = comment.totalLikes + 1
+        session.add(comment)
+        await session.commit()
+        await session.refresh(comment)
+
+
+async def new_like(engine, comment_id: int, user_id: int):
+    async with AsyncSession(engine) as session:
+        await add_like(session, "comment", comment_id, user_id)
+
+
+async def run(engine, like, total: int, concurrency: int) -> float:
+    users = iter(range(1, total + 1))
+
+    async def client():
+        for user_id in users:
+            await like(engine, 1, user_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def total_likes(engine) -> int:
+    async with AsyncSession(engine) as session:
+        return (await session.get(Comment, 1)).totalLikes
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--likes", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    for label, like in (("ler + incrementar", old_like), ("write-behind", new_like)):
+        path = os.path.join(tempfile.mkdtemp(), "likes.db")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=args.concurrency,
+                                     connect_args={"timeout": 60})
+        updates = []
+        event.listen(engine.sync_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *rest: updates.append(1) if statement.startswith("UPDATE") else None)
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        async with AsyncSession(engine) as session:
+            session.add(Comment(commentDescription="Comentário popular", totalLikes=0))
+            # add_like só aceita likes de utilizadores existentes
+            session.add_all(User(userFirstName="U", userLastName="T", userEmail=f"u{i}@gmail.com",
+                                 userType="Buyer", password="x") for i in range(args.likes))
+            await session.commit()
+
+        # add_like usa o contador global da aplicação
+        like_counter.engine = engine
+        like_counter.start()
+        elapsed = await run(engine, like, args.likes, args.concurrency)
+        await like_counter.stop()
+
+        stored = await total_likes(engine)
+        print(f"{label:<18} {args.likes / elapsed:8.0f} likes/s   totalLikes={stored} "
+              f"(perdidos: {args.likes - stored})   UPDATEs: {len(updates)}")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""Throughput de login: pbkdf2 no event loop vs no pool de hashing.
+
+Cada "login" verifica uma senha pbkdf2_sha256. Em modo `inline` a verificação corre
+dentro da coroutine (como antes, bloqueando o loop); em modo `pool` usa
+`PasswordHasher`, que a envia para o pool de threads. Em paralelo mede-se a latência
+de um ping que só precisa do event loop livre.
+
+Uso:
+    python -m benchmarks.bench_login [--logins 200] [--concurrency 32] [--workers 4] [--rounds 29000]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from shared.hashing import PasswordHasher, build_context
+
+
+async def run_mode(mode: str, hasher: PasswordHasher, stored_hash: str, logins: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    ping_latencies = []
+    done = asyncio.Event()
+
+    async def login():
+        async with semaphore:
+            if mode == "inline":
+                assert hasher.context.verify("segredo", stored_hash)
+            else:
+                ok, _ = await hasher.verify("segredo", stored_hash)
+                assert ok
+
+    async def ping():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            ping_latencies.append((time.perf_counter() - start - 0.005) * 1000)
+
+    pinger = asyncio.create_task(ping())
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await pinger
+
+    ping_latencies.sort()
+    return {
+        "logins_per_s": logins / elapsed,
+        "loop_lag_p50_ms": statistics.median(ping_latencies) if ping_latencies else 0.0,
+        "loop_lag_max_ms": ping_latencies[-1] if ping_latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=29000)
+    args = parser.parse_args()
+
+    hasher = PasswordHasher(build_context(args.rounds), workers=args.workers, queue_limit=args.logins)
+    stored_hash = hasher.hash_sync("segredo")
+    for mode in ("inline", "pool"):
+        result = asyncio.run(run_mode(mode, hasher, stored_hash, args.logins, args.concurrency))
+        print(f"{mode:>6}: {result['logins_per_s']:7.1f} logins/s  "
+              f"event-loop lag p50={result['loop_lag_p50_ms']:6.1f} ms  max={result['loop_lag_max_ms']:6.1f} ms")
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Envio de emails: uma ligação SMTP por mensagem vs SMTPPool.
+
+Usa o servidor SMTP local (`shared.smtp_sink`) com `--handshake-ms` de atraso em cada
+EHLO, para simular o custo de ligação + STARTTLS + login de um servidor real.
+
+Uso:
+    python -m benchmarks.bench_mail [--emails 200] [--handshake-ms 50] [--pool-size 2]
+"""
+import argparse
+import smtplib
+import time
+from email.mime.text import MIMEText
+
+from shared.mail import SMTPPool
+from shared.smtp_sink import SMTPSink
+
+
+def build(i: int) -> MIMEText:
+    msg = MIMEText(f"Código de verificação: {i:04d}")
+    msg['From'] = "loja@procuraaqui.ao"
+    msg['To'] = f"cliente{i}@gmail.com"
+    msg['Subject'] = "Redefinição de Senha"
+    return msg
+
+
+def per_message(sink: SMTPSink, emails: int) -> float:
+    start = time.perf_counter()
+    for i in range(emails):
+        msg = build(i)
+        server = smtplib.SMTP(sink.hostname, sink.port)
+        server.sendmail(msg['From'], [msg['To']], msg.as_string())
+        server.quit()
+    return time.perf_counter() - start
+
+
+def pooled(sink: SMTPSink, emails: int, size: int) -> float:
+    pool = SMTPPool(sink.hostname, sink.port, password="", starttls=False, size=size)
+    start = time.perf_counter()
+    futures = [pool.submit(build(i)) for i in range(emails)]
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - start
+    pool.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--handshake-ms", type=float, default=50)
+    parser.add_argument("--pool-size", type=int, default=2)
+    args = parser.parse_args()
+
+    for name, run in (("per-message", lambda sink: per_message(sink, args.emails)),
+                      ("pool", lambda sink: pooled(sink, args.emails, args.pool_size))):
+        with SMTPSink(latency=args.handshake_ms / 1000) as sink:
+            elapsed = run(sink)
+            print(f"{name:>12}: {args.emails / elapsed:8.1f} emails/s  ({elapsed:.2f} s, {sink.handler.sessions} sessões SMTP)")
+
+
+if __name__ == "__main__":
+    main()
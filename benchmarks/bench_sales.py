@@ -0,0 +1,103 @@
+"""Painel de vendas de um vendedor: agregação sobre Order vs leitura de SalesDaily.
+
+Gera pedidos ao longo de dois anos para `--products` produtos de `--sellers`
+vendedores, até cada tamanho de histórico em `--sizes`. Para cada tamanho reconstrói
+SalesDaily com `backfill_sales` e mede, para vendedores aleatórios, as vendas por dia
+dos últimos 30 e 365 dias calculadas a partir de Order (com idx_order_date) e a partir
+das agregações.
+
+Uso:
+    DATABASE_URL=sqlite:// python -m benchmarks.bench_sales [--sizes 100000 1000000] [--queries 30]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from src.utils.models import Category, Order, Product
+from src.utils.sales import backfill_sales, sales_query
+
+NOW = datetime(2026, 6, 30, 12, tzinfo=timezone.utc)
+HISTORY_DAYS = 730
+
+
+def order_rows(rng: random.Random, count: int, products: int):
+    for _ in range(count):
+        quantity = rng.randint(1, 5)
+        yield {"productId": rng.randint(1, products), "buyerId": rng.randint(1, 100_000),
+               "itemQuantity": str(quantity), "invoiceAmount": round(quantity * rng.uniform(1, 200), 2),
+               "transactStatus": "paid",
+               "orderDate": NOW - timedelta(seconds=rng.randint(0, HISTORY_DAYS * 86400)), "createdAt": NOW}
+
+
+def from_orders(db: Session, seller_id: int, start, end):
+    day = func.date(Order.orderDate)
+    return db.execute(
+        select(day, func.count(), func.sum(Order.invoiceAmount))
+        .join(Product, Product.productId == Order.productId)
+        .where(Product.sellerId == seller_id, Order.orderDate >= start, Order.orderDate < end + timedelta(days=1))
+        .group_by(day).order_by(day)
+    ).all()
+
+
+def from_rollup(db: Session, seller_id: int, start, end):
+    return db.execute(sales_query(seller_id, start.date(), end.date(), "day")).all()
+
+
+def timed(db, fn, sellers, days):
+    samples = []
+    for seller_id in sellers:
+        start = time.perf_counter()
+        fn(db, seller_id, NOW - timedelta(days=days - 1), NOW)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--sellers", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'sales.db')}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Category(categoryName="Geral"))
+        db.execute(insert(Product.__table__), [
+            {"productName": f"Produto {i}", "unitPrice": 10.0, "categoryId": 1, "disabled": False, "unitInOrder": 0,
+             "sellerId": i % args.sellers + 1, "createdAt": NOW}
+            for i in range(args.products)
+        ])
+        db.commit()
+
+        total = 0
+        print(f"{'pedidos':>9}  {'backfill':>9}  {'30 dias: Order':>15} {'SalesDaily':>11}  "
+              f"{'365 dias: Order':>16} {'SalesDaily':>11}")
+        for size in sorted(args.sizes):
+            rows = list(order_rows(rng, size - total, args.products))
+            for start in range(0, len(rows), 50_000):
+                db.execute(insert(Order.__table__), rows[start:start + 50_000])
+            db.commit()
+            total = size
+
+            start = time.perf_counter()
+            backfill_sales(db, force=True)
+            backfill = time.perf_counter() - start
+
+            sellers = [rng.randint(1, args.sellers) for _ in range(args.queries)]
+            print(f"{size:>9}  {backfill:8.1f}s  "
+                  f"{timed(db, from_orders, sellers, 30):12.2f} ms {timed(db, from_rollup, sellers, 30):8.2f} ms  "
+                  f"{timed(db, from_orders, sellers, 365):13.2f} ms {timed(db, from_rollup, sellers, 365):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
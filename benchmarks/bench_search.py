@@ -0,0 +1,102 @@
+"""Pesquisa num catálogo sintético: índice FTS5 (/api/search) vs LIKE sobre a tabela product.
+
+Gera `--products` produtos com nomes e descrições aleatórios, constrói o índice com
+`rebuild_search_index` e mede a latência das mesmas pesquisas pelas duas vias. Corre
+sobre SQLite; no Postgres o caminho equivalente é o tsvector + GIN.
+
+Uso:
+    python -m benchmarks.bench_search [--products 1000000] [--queries 50]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import insert, or_
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from shared.pagination import PageParams, keyset
+from src.utils.models import Category, Product, SearchDocument
+from src.utils.searchIndex import rebuild_search_index, search_query
+
+NOUNS = ["telemóvel", "capa", "sapatos", "camisa", "relógio", "mochila", "auscultadores", "portátil",
+         "cadeira", "mesa", "candeeiro", "tapete", "bicicleta", "garrafa", "caneca", "livro", "vestido",
+         "carregador", "colchão", "frigorífico"]
+ADJECTIVES = ["azul", "preto", "branco", "premium", "barato", "usado", "novo", "artesanal", "ecológico",
+              "compacto", "grande", "pequeno", "luxuoso", "resistente", "leve", "clássico"]
+BRANDS = [f"marca{i}" for i in range(500)]
+CATEGORIES = ["Eletrónica", "Moda", "Casa", "Desporto", "Livros", "Cozinha", "Beleza", "Brinquedos"]
+
+
+def generate(rng: random.Random, count: int, category_ids):
+    for _ in range(count):
+        name = f"{rng.choice(NOUNS)} {rng.choice(ADJECTIVES)} {rng.choice(BRANDS)}"
+        description = " ".join(rng.choice(NOUNS + ADJECTIVES) for _ in range(12))
+        yield {"productName": name, "productDescription": description, "unitInOrder": 0, "disabled": False,
+               "categoryId": rng.choice(category_ids)}
+
+
+def timed(fn, queries):
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    directory = tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'search.db')}")
+    SQLModel.metadata.create_all(engine)
+
+    with Session(engine) as db:
+        db.add_all(Category(categoryName=name) for name in CATEGORIES)
+        db.commit()
+        category_ids = list(range(1, len(CATEGORIES) + 1))
+        start = time.perf_counter()
+        rows = list(generate(rng, args.products, category_ids))
+        for i in range(0, len(rows), 50_000):
+            db.execute(insert(Product), rows[i:i + 50_000])
+        db.commit()
+        print(f"{args.products} produtos inseridos em {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        documents = rebuild_search_index(db, force=True)
+        print(f"Índice com {documents} documentos construído em {time.perf_counter() - start:.1f}s")
+
+        # Pesquisas largas (milhares de resultados a ordenar) e seletivas (uma marca)
+        query_sets = {
+            "largas": [f"{rng.choice(NOUNS)[:5]} {rng.choice(ADJECTIVES)}" for _ in range(args.queries)],
+            "seletivas": [f"{rng.choice(BRANDS)} {rng.choice(NOUNS)[:5]}" for _ in range(args.queries)],
+        }
+        page = PageParams(cursor=None, limit=args.limit, stream=False)
+
+        def fts(q):
+            query, score = search_query("sqlite", q, kind="product")
+            return db.execute(keyset(query, [score, SearchDocument.id], page, descending=True)).all()
+
+        def like(q):
+            # O que o cliente fazia: trazer todas as correspondências por substring para as ordenar
+            clauses = [or_(Product.productName.ilike(f"%{term}%"), Product.productDescription.ilike(f"%{term}%"))
+                       for term in q.split()]
+            return db.execute(select(Product.productId, Product.productName).where(*clauses)).all()
+
+        for name, queries in query_sets.items():
+            for label, fn in (("FTS5 + bm25", fts), ("LIKE (scan)", like)):
+                median, p95 = timed(fn, queries)
+                print(f"{name:<10} {label:<12} mediana {median:8.2f} ms   p95 {p95:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
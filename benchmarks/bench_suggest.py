@@ -0,0 +1,94 @@
+"""Memória e latência do índice de sugestões (/api/suggest) para um catálogo sintético.
+
+Constrói o índice com `--products` nomes de produtos, `--sellers` empresas e algumas
+categorias, mede a memória (estimativa do índice e tracemalloc) e a latência de
+prefixos de 1 a 6 letras, diretamente e pelo cabeçalho Server-Timing da rota.
+
+Uso:
+    python -m benchmarks.bench_suggest [--products 1000000] [--sellers 50000] [--queries 2000]
+"""
+import argparse
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.bench_search import ADJECTIVES, BRANDS, CATEGORIES, NOUNS
+from src.routers import search
+from src.utils.suggestIndex import suggest_index
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--sellers", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+
+    def catalog():
+        # Os nomes são criados aqui, como se viessem da base de dados, para contarem na memória do índice
+        names = {("category", i + 1): name for i, name in enumerate(CATEGORIES)}
+        for i in range(args.products):
+            names[("product", i + 1)] = f"{rng.choice(NOUNS).capitalize()} {rng.choice(ADJECTIVES)} {rng.choice(BRANDS)}"
+        for i in range(args.sellers):
+            names[("seller", i + 1)] = f"Loja {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}"
+        return names
+
+    start = time.perf_counter()
+    suggest_index.build(catalog())
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    suggest_index.build(catalog())
+    gc.collect()
+    traced = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    stats = suggest_index.stats()
+    print(f"{stats['names']} nomes, {sum(stats['keys'].values())} chaves, construído em {elapsed:.1f}s")
+    print(f"Memória: estimativa {stats['memoryBytes'] / 2**20:.0f} MiB, tracemalloc {traced / 2**20:.0f} MiB "
+          f"({traced / stats['names']:.0f} bytes por nome)")
+
+    words = NOUNS + ADJECTIVES + BRANDS + ["loja"]
+    prefixes = [rng.choice(words)[:rng.randint(1, 6)] for _ in range(args.queries)]
+    samples = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        suggest_index.suggest(prefix, 10)
+        samples.append((time.perf_counter() - start) * 1e6)
+    median, p99 = percentiles(samples)
+    print(f"suggest() direto       mediana {median:7.1f} µs   p99 {p99:7.1f} µs")
+
+    app = FastAPI()
+    app.include_router(search.router)
+    client = TestClient(app)
+    samples = []
+    for prefix in prefixes[:500]:
+        timing = client.get("/api/suggest", params={"q": prefix}).headers["server-timing"]
+        samples.append(float(timing.split("dur=")[1]) * 1000)
+    median, p99 = percentiles(samples)
+    print(f"/api/suggest (servidor) mediana {median:7.1f} µs   p99 {p99:7.1f} µs")
+
+    samples = []
+    for i in range(1000):
+        start = time.perf_counter()
+        suggest_index.put("product", args.products + i + 1, f"{rng.choice(NOUNS)} novo {i}")
+        samples.append((time.perf_counter() - start) * 1e6)
+    median, p99 = percentiles(samples)
+    print(f"put() incremental      mediana {median:7.1f} µs   p99 {p99:7.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Importação e exportação em stream de um catálogo de `--rows` produtos (NDJSON e CSV).
+
+A importação lê o corpo em blocos de 64 KiB (como `request.stream()`) e grava-o com
+`import_products`; a exportação percorre a tabela com `yield_per` e `encode_rows`.
+Mede linhas por segundo e o pico de memória do processo (ru_maxrss), que não deve
+crescer com o número de linhas. Corre sobre SQLite (executemany); no Postgres a
+importação usa COPY.
+
+Uso:
+    DATABASE_URL=sqlite:// python -m benchmarks.bench_transfer [--rows 1000000]
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import tempfile
+import resource
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.bench_search import ADJECTIVES, BRANDS, NOUNS
+from src.utils.models import Category, Product
+from src.utils.transfer import encode_rows, export_query, import_products, read_records
+
+BLOCK_SIZE = 64 * 1024
+FIELDS = ["productName", "productDescription", "quantity", "unitPrice", "unitInStock", "picture", "categoryId"]
+
+
+def write_source(path: str, fmt: str, rows: int):
+    rng = random.Random(42)
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file, lineterminator="\n")
+        if fmt == "csv":
+            writer.writerow(FIELDS)
+        for _ in range(rows):
+            values = [f"{rng.choice(NOUNS)} {rng.choice(ADJECTIVES)} {rng.choice(BRANDS)}",
+                      " ".join(rng.choice(NOUNS + ADJECTIVES) for _ in range(12)),
+                      1, round(rng.uniform(1, 500), 2), rng.randint(0, 100), None, rng.randint(1, 8)]
+            if fmt == "csv":
+                writer.writerow(values)
+            else:
+                file.write(json.dumps(dict(zip(FIELDS, values)), ensure_ascii=False) + "\n")
+
+
+async def read_file(path: str):
+    with open(path, "rb") as file:
+        while block := file.read(BLOCK_SIZE):
+            yield block
+
+
+async def measure(label: str, rows: int, run):
+    start = time.perf_counter()
+    result = await run()
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{label:<22} {rows / elapsed:9.0f} linhas/s   {elapsed:6.1f} s   RSS máximo {peak:6.0f} MiB")
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    for fmt in ("ndjson", "csv"):
+        source = os.path.join(directory, f"catalog.{fmt}")
+        write_source(source, fmt, args.rows)
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, f'{fmt}.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        async with AsyncSession(engine) as db:
+            db.add_all(Category(categoryName=f"Categoria {i}") for i in range(8))
+            await db.commit()
+
+            report = await measure(f"importação {fmt}", args.rows,
+                                   lambda: import_products(db, read_records(read_file(source), fmt)))
+            assert report["imported"] == args.rows, report["errors"][:3]
+
+            async def export():
+                columns = [column.name for column in Product.__table__.columns]
+                size = 0
+                async for chunk in encode_rows(await db.stream(export_query(Product)), columns, fmt):
+                    size += len(chunk)
+                return size
+
+            size = await measure(f"exportação {fmt}", args.rows, export)
+            print(f"{'':<22} {size / 2 ** 20:9.0f} MiB exportados")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
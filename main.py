@@ -1,38 +1,35 @@
 import os
 from src.utils.seed import initialize_tables
-from shared.security import init_db, get_session, engine
+from src.utils.ratingSummary import backfill_product_summaries, backfill_seller_summaries
+from src.utils.sales import backfill_sales
+from src.utils.searchIndex import rebuild_search_index
+from src.utils.suggestIndex import suggest_index
+from shared.security import init_db, get_session, get_async_session, engine
+from shared.database import pool_status
+from shared.pagination import NEXT_CURSOR_HEADER
+from shared.websocket import ConnectionManager
+from shared.uploads import IMAGE_FOLDERS, UPLOAD_ROOT, UploadLimitMiddleware
+from shared.cache import ResponseCacheMiddleware, response_cache
+from shared.broker import MessageTooLarge, create_broker
+from shared.mail import mailer
+from src.utils.outbox import OUTBOX_ENABLED, outbox_dispatcher
+from src.utils.likes import like_counter
+from src.utils.reservations import reservation_reaper
+from src.utils.groupCommit import GROUP_COMMIT_ENABLED, order_queue, post_queue
 import uvicorn
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends
 from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from src.routers import user, address, category, email, productReview, sellerReview, auth, comment
+from src.routers import user, address, category, email, productReview, sellerReview, auth, comment, image, search, bulk, transfer, checkout, analytics
 from sqlmodel import Session, select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class ConnectionManager:
-    def __init__(self):
-         self.active_connections: list[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
-
-
-manager = ConnectionManager()
+manager = ConnectionManager(broker=create_broker())
 
 description = """
 *   A plataforma de marketing para empreendedores utilizada neste exemplo é a **ProcuraAqui**.
@@ -47,27 +44,26 @@ app = FastAPI(title="API para plataforma de marketing para empreendedores",
               },)
 
 
-if not os.path.exists("buyer_images"):
-    os.makedirs("buyer_images")
-if not os.path.exists("seller_images"):
-    os.makedirs("seller_images")
-if not os.path.exists("admin_images"):
-    os.makedirs("admin_images")
+# As imagens são servidas por src/routers/image.py (ETag, Cache-Control, Range)
+for folder in IMAGE_FOLDERS:
+    os.makedirs(os.path.join(UPLOAD_ROOT, folder), exist_ok=True)
 
-app.mount("/seller_images", StaticFiles(directory="seller_images"), name="seller_images")
-app.mount("/buyer_images", StaticFiles(directory="buyer_images"), name="buyer_images")
-app.mount("/admin_images", StaticFiles(directory="admin_images"), name="admin_images")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
 
+# Fica dentro do CORS (middlewares adicionados depois envolvem os anteriores)
+app.add_middleware(ResponseCacheMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
     allow_methods=['*'],
     allow_headers=['*'],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+app.add_middleware(UploadLimitMiddleware)
 
 @app.on_event("startup")
 async def on_startup():
@@ -77,15 +73,48 @@ async def on_startup():
 
         db = next(get_session())
         initialize_tables(db)
+        backfill_seller_summaries(db)
+        backfill_product_summaries(db)
+        backfill_sales(db)
+        rebuild_search_index(db)
+        suggest_index.rebuild(db)
 
         logger.info("Aplicação iniciada com sucesso!")
     except Exception as e:
         logger.error(f"Erro ao inicializar aplicação: {e}")
 
+    try:
+        await manager.start()
+    except Exception as e:
+        logger.error(f"Erro ao ligar o broker do chat: {e}")
+
+    if OUTBOX_ENABLED:
+        outbox_dispatcher.start()
+
+    suggest_index.start(engine)
+    like_counter.start()
+    reservation_reaper.start()
+    if GROUP_COMMIT_ENABLED:
+        order_queue.start()
+        post_queue.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await manager.stop()
+    await outbox_dispatcher.stop()
+    await suggest_index.stop()
+    # Escreve os likes ainda em memória antes de sair
+    await like_counter.stop()
+    await reservation_reaper.stop()
+    # Grava os pedidos/posts ainda na fila do group commit
+    await order_queue.stop()
+    await post_queue.stop()
+    mailer.close(timeout=5)
+
 @app.get('/health', tags=["Health"], response_class=JSONResponse)
-async def health_check(db: Session = Depends(get_session)):
+async def health_check(db: AsyncSession = Depends(get_async_session)):
     try:
-        db.exec(text("SELECT 1"))
+        await db.exec(text("SELECT 1"))
         return {
             "status": "healthy",
             "database": "connected",
@@ -102,6 +131,38 @@ async def health_check(db: Session = Depends(get_session)):
             }
         )
 
+@app.get('/health/pool', tags=["Health"], response_class=JSONResponse)
+async def pool_metrics():
+    return pool_status()
+
+@app.get('/health/chat', tags=["Health"], response_class=JSONResponse)
+async def chat_metrics():
+    return manager.stats()
+
+@app.get('/health/cache', tags=["Health"], response_class=JSONResponse)
+async def cache_metrics():
+    return response_cache.stats()
+
+@app.get('/health/suggest', tags=["Health"], response_class=JSONResponse)
+async def suggest_metrics():
+    return suggest_index.stats()
+
+@app.get('/health/likes', tags=["Health"], response_class=JSONResponse)
+async def like_metrics():
+    return like_counter.stats()
+
+@app.get('/health/reservations', tags=["Health"], response_class=JSONResponse)
+async def reservation_metrics():
+    return await reservation_reaper.stats()
+
+@app.get('/health/group-commit', tags=["Health"], response_class=JSONResponse)
+async def group_commit_metrics():
+    return {"enabled": GROUP_COMMIT_ENABLED, "orders": order_queue.stats(), "posts": post_queue.stats()}
+
+@app.get('/health/mail', tags=["Health"], response_class=JSONResponse)
+async def mail_metrics():
+    return {**mailer.stats(), "outbox": await outbox_dispatcher.stats()}
+
 @app.get('/', tags=["Default"], response_class=FileResponse)
 async def get_home():
     return FileResponse('static/index.html')
@@ -117,7 +178,10 @@ async def websocket_endpoint(websocket: WebSocket, client_id: int):
         while True:
             data = await websocket.receive_text()
             await manager.send_personal_message(f"You wrote: {data}", websocket)
-            await manager.broadcast(f"Client #{client_id} says: {data}")
+            try:
+                await manager.broadcast(f"Client #{client_id} says: {data}")
+            except MessageTooLarge:
+                await manager.send_personal_message("Message too long, it was not sent", websocket)
     except WebSocketDisconnect:
         manager.disconnect(websocket)
         await manager.broadcast(f"Client #{client_id} has left the chat")
@@ -131,6 +195,12 @@ app.include_router(productReview.router, tags=["Product Review"])
 app.include_router(email.router, tags=["Email"])
 app.include_router(auth.router, tags=["Authentication"])
 app.include_router(comment.router, tags=["Comment"])
+app.include_router(image.router, tags=["Image"])
+app.include_router(search.router, tags=["Search"])
+app.include_router(bulk.router, tags=["Bulk"])
+app.include_router(transfer.router, tags=["Transfer"])
+app.include_router(checkout.router, tags=["Checkout"])
+app.include_router(analytics.router, tags=["Analytics"])
 
 if __name__ == '__main__':
     uvicorn.run('main:app', port=5000, reload=True, host='localhost')
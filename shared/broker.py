@@ -0,0 +1,254 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# memory: um único processo (e testes); postgres: LISTEN/NOTIFY na base de dados da aplicação
+CHAT_BROKER = os.getenv('CHAT_BROKER', 'memory')
+CHAT_CHANNEL = os.getenv('CHAT_CHANNEL', 'chat')
+CHAT_BATCH_INTERVAL_MS = float(os.getenv('CHAT_BATCH_INTERVAL_MS', '10'))
+CHAT_RECONNECT_SECONDS = float(os.getenv('CHAT_RECONNECT_SECONDS', '2'))
+
+# O Postgres rejeita payloads de NOTIFY com 8000 bytes ou mais
+NOTIFY_PAYLOAD_LIMIT = 7900
+# {"origin": "<32 hex>", "messages": [...]} à volta das mensagens de um NOTIFY
+NOTIFY_ENVELOPE_SIZE = 64
+# Tamanho máximo de uma mensagem, medido como JSON (o que segue no NOTIFY); igual em todos os brokers
+CHAT_MAX_MESSAGE_SIZE = min(int(os.getenv('CHAT_MAX_MESSAGE_SIZE', '4000')),
+                            NOTIFY_PAYLOAD_LIMIT - NOTIFY_ENVELOPE_SIZE)
+
+Deliver = Callable[[str], Awaitable[None]]
+
+
+class MessageTooLarge(ValueError):
+    pass
+
+
+def message_size(message: str) -> int:
+    return len(json.dumps(message))
+
+
+class Broker(ABC):
+    """Publica mensagens de chat para todos os processos ligados ao mesmo canal.
+
+    `publish` recusa (MessageTooLarge) mensagens acima de `max_message_size` antes de
+    as entregar a alguém, para que os clientes locais e os dos outros workers vejam
+    sempre as mesmas mensagens.
+    """
+
+    def __init__(self, max_message_size: int = CHAT_MAX_MESSAGE_SIZE):
+        self._subscribers: List[Deliver] = []
+        self.max_message_size = max_message_size
+        self.published = 0
+        self.rejected = 0
+
+    def subscribe(self, deliver: Deliver):
+        self._subscribers.append(deliver)
+
+    async def _deliver(self, message: str):
+        for deliver in self._subscribers:
+            await deliver(message)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def _check_size(self, message: str):
+        if message_size(message) > self.max_message_size:
+            self.rejected += 1
+            raise MessageTooLarge(f"Mensagem de chat acima de {self.max_message_size} bytes")
+
+    @abstractmethod
+    async def publish(self, message: str):
+        """Entrega a mensagem aos subscritores deste processo e dos restantes."""
+
+    def stats(self) -> Dict[str, int]:
+        return {"broker": type(self).__name__, "published": self.published, "rejected": self.rejected}
+
+
+class InMemoryBroker(Broker):
+    """Entrega direta a todos os subscritores do processo atual."""
+
+    async def publish(self, message: str):
+        self._check_size(message)
+        self.published += 1
+        await self._deliver(message)
+
+
+def pack_batches(messages: List[str], limit: int = NOTIFY_PAYLOAD_LIMIT) -> List[List[str]]:
+    """Agrupa mensagens em lotes cujo JSON cabe num único NOTIFY."""
+    batches, current, size = [], [], 2
+    for message in messages:
+        encoded = len(json.dumps(message).encode()) + 1
+        if current and size + encoded > limit:
+            batches.append(current)
+            current, size = [], 2
+        current.append(message)
+        size += encoded
+    if current:
+        batches.append(current)
+    return batches
+
+
+def get_listen_dsn(url: str) -> str:
+    # O asyncpg recebe um DSN libpq simples, sem o sufixo do driver do SQLAlchemy
+    return make_url(url).set(drivername='postgresql').render_as_string(hide_password=False)
+
+
+class PostgresBroker(Broker):
+    """Distribui mensagens entre workers com LISTEN/NOTIFY.
+
+    As mensagens publicadas no mesmo tick (CHAT_BATCH_INTERVAL_MS) seguem num único
+    NOTIFY com um array JSON. Os clientes locais recebem logo a mensagem; as
+    notificações com a origem deste processo são ignoradas ao chegar. As notificações
+    recebidas são entregues por uma só tarefa, pela ordem de chegada. Se a ligação
+    LISTEN ou a de publicação cair, ambas são fechadas e restabelecidas.
+    """
+
+    def __init__(self, dsn: str, channel: str = CHAT_CHANNEL, batch_interval: float = CHAT_BATCH_INTERVAL_MS / 1000,
+                 max_message_size: int = CHAT_MAX_MESSAGE_SIZE):
+        super().__init__(min(max_message_size, NOTIFY_PAYLOAD_LIMIT - NOTIFY_ENVELOPE_SIZE))
+        self.dsn = dsn
+        self.channel = channel
+        self.batch_interval = batch_interval
+        self.origin = uuid.uuid4().hex
+        self.batches = 0
+        self._pending: List[str] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._listener = None
+        self._publisher = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self._lost = asyncio.Event()
+        self._incoming: asyncio.Queue = asyncio.Queue()
+        self._receiver: Optional[asyncio.Task] = None
+        self.reconnects = 0
+
+    async def start(self):
+        await self._connect()
+        self._supervisor = asyncio.create_task(self._reconnect_forever())
+        self._receiver = asyncio.create_task(self._receive_forever())
+
+    async def stop(self):
+        for task in (self._supervisor, self._receiver):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._supervisor = self._receiver = None
+        if self._flush_task:
+            await self._flush_task
+        await self._close_connections()
+
+    def _on_terminate(self, connection):
+        self._lost.set()
+
+    async def _close_connections(self):
+        for connection in (self._listener, self._publisher):
+            if connection is None:
+                continue
+            # Sem o listener, fechar de propósito não conta como ligação perdida
+            connection.remove_termination_listener(self._on_terminate)
+            if not connection.is_closed():
+                try:
+                    await asyncio.wait_for(connection.close(), CHAT_RECONNECT_SECONDS)
+                except Exception:
+                    connection.terminate()
+        self._listener = self._publisher = None
+
+    async def _connect(self):
+        import asyncpg
+
+        await self._close_connections()
+        self._lost.clear()
+        self._listener = await asyncpg.connect(self.dsn)
+        self._listener.add_termination_listener(self._on_terminate)
+        await self._listener.add_listener(self.channel, self._on_notify)
+        self._publisher = await asyncpg.connect(self.dsn)
+        self._publisher.add_termination_listener(self._on_terminate)
+
+    async def _reconnect_forever(self):
+        while True:
+            await self._lost.wait()
+            logger.warning("Ligação do chat ao Postgres perdida, a restabelecer...")
+            try:
+                await self._connect()
+                self.reconnects += 1
+            except Exception as e:
+                logger.error(f"Falha ao restabelecer ligação do chat: {e}")
+                self._lost.set()
+                await asyncio.sleep(CHAT_RECONNECT_SECONDS)
+
+    async def publish(self, message: str):
+        self._check_size(message)
+        self.published += 1
+        await self._deliver(message)
+        self._pending.append(message)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.batch_interval)
+        # Um só flush de cada vez, para os lotes seguirem pela ordem de publicação
+        while self._pending:
+            messages, self._pending = self._pending, []
+            for batch in pack_batches(messages):
+                try:
+                    await self._notify(json.dumps({"origin": self.origin, "messages": batch}))
+                    self.batches += 1
+                except Exception as e:
+                    logger.error(f"Falha ao publicar {len(batch)} mensagens de chat: {e}")
+        self._flush_task = None
+
+    async def _notify(self, payload: str):
+        if self._publisher is None or self._publisher.is_closed():
+            self._lost.set()
+            raise ConnectionError("Ligação de publicação do chat fechada")
+        await self._publisher.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._incoming.put_nowait(payload)
+
+    async def _receive_forever(self):
+        while True:
+            payload = await self._incoming.get()
+            try:
+                await self._receive(payload)
+            except Exception as e:
+                logger.error(f"Falha ao entregar notificação de chat: {e}")
+
+    async def _receive(self, payload: str):
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            logger.warning("Notificação de chat inválida ignorada")
+            return
+        if data.get("origin") == self.origin:
+            return
+        for message in data.get("messages", []):
+            await self._deliver(message)
+
+    def stats(self) -> Dict[str, int]:
+        return {**super().stats(), "batches": self.batches, "pending": len(self._pending),
+                "incoming": self._incoming.qsize(), "reconnects": self.reconnects}
+
+
+def create_broker(kind: str = CHAT_BROKER) -> Broker:
+    if kind == 'memory':
+        return InMemoryBroker()
+    if kind == 'postgres':
+        from shared.database import DATABASE_URL
+        return PostgresBroker(get_listen_dsn(os.getenv('CHAT_BROKER_URL', DATABASE_URL)))
+    raise ValueError(f"Broker de chat desconhecido: {kind}. Use 'memory' ou 'postgres'.")
@@ -0,0 +1,346 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# memory: cache local a cada worker; redis: partilhada entre workers/nós
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+CACHE_TTL_SECONDS = float(os.getenv('CACHE_TTL_SECONDS', '300'))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '2048'))
+# Tempo de vida das gerações das tags no Redis (muito superior ao de qualquer pedido)
+CACHE_GENERATION_TTL_SECONDS = int(os.getenv('CACHE_GENERATION_TTL_SECONDS', '86400'))
+
+# (status, cabeçalhos, corpo) de uma resposta guardada
+Entry = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+
+
+class MemoryBackend:
+    """LRU com expiração por entrada, índice tag -> chaves e geração de cada tag.
+
+    A geração de uma tag aumenta a cada invalidação; `set` só guarda a resposta se as
+    gerações lidas antes de a calcular (`generations`) ainda forem as atuais.
+    """
+
+    blocking = False
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Entry, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, entry, tags = item
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def generations(self, tags: Iterable[str]) -> Dict[str, int]:
+        with self._lock:
+            return {tag: self._generations.get(tag, 0) for tag in tags}
+
+    def set(self, key: str, entry: Entry, ttl: float, tags: Iterable[str],
+            generations: Optional[Dict[str, int]] = None) -> bool:
+        tags = tuple(tags)
+        with self._lock:
+            if generations and any(self._generations.get(tag, 0) != value for tag, value in generations.items()):
+                return False
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, entry, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            return True
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        tags = tuple(tags)
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            keys = set().union(*(self._tags.pop(tag, set()) for tag in tags))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def _remove(self, key: str):
+        item = self._entries.pop(key, None)
+        if item is None:
+            return
+        for tag in item[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._generations.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Cache partilhada em Redis; cada tag é um SET com as chaves que a usam e um contador de geração."""
+
+    blocking = True
+
+    def __init__(self, url: str = CACHE_REDIS_URL, prefix: str = "cache:", client=None):
+        import redis
+
+        self.client = client if client is not None else redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._watch_error = redis.WatchError
+
+    def _generation_keys(self, tags: Iterable[str]) -> List[str]:
+        return [f"{self.prefix}gen:{tag}" for tag in tags]
+
+    def generations(self, tags: Iterable[str]) -> Dict[str, int]:
+        tags = tuple(tags)
+        if not tags:
+            return {}
+        return {tag: int(value or 0) for tag, value in zip(tags, self.client.mget(self._generation_keys(tags)))}
+
+    def get(self, key: str) -> Optional[Entry]:
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        status, headers, body = json.loads(raw)
+        return status, [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers], body.encode("utf-8")
+
+    def set(self, key: str, entry: Entry, ttl: float, tags: Iterable[str],
+            generations: Optional[Dict[str, int]] = None) -> bool:
+        tags = tuple(tags)
+        status, headers, body = entry
+        raw = json.dumps([status, [(n.decode("latin-1"), v.decode("latin-1")) for n, v in headers], body.decode("utf-8")])
+        with self.client.pipeline() as pipe:
+            try:
+                # WATCH: uma invalidação entre a leitura das gerações e o EXEC anula a escrita
+                if generations:
+                    generation_keys = self._generation_keys(generations)
+                    pipe.watch(*generation_keys)
+                    current = [int(value or 0) for value in pipe.mget(generation_keys)]
+                    if current != list(generations.values()):
+                        return False
+                pipe.multi()
+                pipe.set(self.prefix + key, raw, px=int(ttl * 1000))
+                for tag in tags:
+                    pipe.sadd(f"{self.prefix}tag:{tag}", key)
+                    pipe.pexpire(f"{self.prefix}tag:{tag}", int(ttl * 1000))
+                pipe.execute()
+            except self._watch_error:
+                return False
+        return True
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        tags = tuple(tags)
+        tag_keys = [f"{self.prefix}tag:{tag}" for tag in tags]
+        with self.client.pipeline() as pipe:
+            for generation_key in self._generation_keys(tags):
+                pipe.incr(generation_key)
+                pipe.expire(generation_key, CACHE_GENERATION_TTL_SECONDS)
+            pipe.execute()
+        keys = set()
+        for tag_key in tag_keys:
+            keys.update(member.decode() for member in self.client.smembers(tag_key))
+        if keys or tag_keys:
+            self.client.delete(*[self.prefix + key for key in keys], *tag_keys)
+        return len(keys)
+
+    def clear(self):
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+    def __len__(self) -> int:
+        return sum(1 for key in self.client.scan_iter(f"{self.prefix}*") if b":tag:" not in key and b":gen:" not in key)
+
+
+class ResponseCache:
+    """Fachada usada pelo middleware e pelas rotas de escrita, com contadores de hits/misses."""
+
+    def __init__(self, backend, ttl: float = CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.discarded = 0
+        self.invalidations = 0
+
+    async def _call(self, fn, *args):
+        if self.backend.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    async def get(self, key: str) -> Optional[Entry]:
+        try:
+            entry = await self._call(self.backend.get, key)
+        except Exception as e:
+            logger.warning(f"Cache indisponível: {e}")
+            entry = None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    async def generations(self, tags: Iterable[str]) -> Optional[Dict[str, int]]:
+        """Gerações atuais das tags; ler antes de calcular a resposta a guardar."""
+        try:
+            return await self._call(self.backend.generations, tuple(tags))
+        except Exception as e:
+            logger.warning(f"Cache indisponível: {e}")
+            return None
+
+    async def set(self, key: str, entry: Entry, tags: Iterable[str], generations: Dict[str, int]):
+        """Guarda a resposta, exceto se alguma tag foi invalidada depois de lidas as `generations`."""
+        try:
+            if await self._call(self.backend.set, key, entry, self.ttl, tuple(tags), generations):
+                self.stores += 1
+            else:
+                self.discarded += 1
+        except Exception as e:
+            logger.warning(f"Cache indisponível: {e}")
+
+    def invalidate(self, *tags: str):
+        """Remove as respostas marcadas com estas tags (usar depois do commit da escrita)."""
+        self.invalidations += 1
+        try:
+            self.backend.invalidate(tags)
+        except Exception as e:
+            logger.error(f"Falha ao invalidar cache {tags}: {e}")
+
+    async def ainvalidate(self, *tags: str):
+        if self.backend.blocking:
+            await run_in_threadpool(self.invalidate, *tags)
+        else:
+            self.invalidate(*tags)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        try:
+            entries = len(self.backend)
+        except Exception:
+            entries = None
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+            "discarded": self.discarded,
+            "invalidations": self.invalidations,
+        }
+
+
+def create_backend(kind: str = CACHE_BACKEND):
+    if kind == 'memory':
+        return MemoryBackend()
+    if kind == 'redis':
+        return RedisBackend()
+    raise ValueError(f"Backend de cache desconhecido: {kind}. Use 'memory' ou 'redis'.")
+
+
+response_cache = ResponseCache(create_backend())
+
+
+def cached(*tags: str):
+    """Marca uma rota GET como cacheável; as tags podem usar parâmetros do caminho ("category:{id}")."""
+    def decorate(endpoint):
+        endpoint.__cache_tags__ = tags
+        return endpoint
+    return decorate
+
+
+def cache_key(scope) -> str:
+    query = urlencode(sorted(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)))
+    return f"{scope['path']}?{query}"
+
+
+class ResponseCacheMiddleware:
+    """Serve da cache as rotas marcadas com `@cached` e guarda as respostas 200 de corpo único.
+
+    As rotas cacheáveis são conhecidas no primeiro pedido que as atinge (pelo
+    `scope["route"]` preenchido pelo router); a partir daí só os caminhos que lhes
+    correspondem consultam o backend. As gerações das tags são lidas antes de chamar a
+    rota: uma invalidação feita enquanto a resposta é calculada impede que ela seja
+    guardada (por isso a primeira resposta de cada rota, cujas tags ainda não eram
+    conhecidas, não é guardada). Respostas em streaming (`stream=true`) não são
+    guardadas. Deve ficar dentro do CORSMiddleware para não reaproveitar cabeçalhos de
+    outra origem.
+    """
+
+    def __init__(self, app, cache: Optional[ResponseCache] = None):
+        self.app = app
+        self.cache = cache
+        # id(rota) -> (rota, tags); as rotas do FastAPI não são hashable
+        self._routes: Dict[int, Tuple[Any, Tuple[str, ...]]] = {}
+
+    def _match(self, scope) -> Optional[Tuple[str, ...]]:
+        for route, tags in self._routes.values():
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                path_params = child_scope.get("path_params", {})
+                return tuple(tag.format(**path_params) for tag in tags)
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or b"stream=true" in scope.get("query_string", b"").lower():
+            await self.app(scope, receive, send)
+            return
+        cache = self.cache or response_cache
+        key = cache_key(scope)
+        tags = self._match(scope)
+        generations = None
+        if tags is not None:
+            entry = await cache.get(key)
+            if entry is not None:
+                status, headers, body = entry
+                await send({"type": "http.response.start", "status": status, "headers": headers})
+                await send({"type": "http.response.body", "body": body})
+                return
+            # Lidas antes de a rota consultar a base de dados (ver docstring)
+            generations = await cache.generations(tags)
+
+        start: Dict[str, Any] = {}
+        first_body = [True]
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body" and first_body[0]:
+                first_body[0] = False
+                route_tags = getattr(scope.get("endpoint"), "__cache_tags__", None)
+                if route_tags is not None and tags is None:
+                    cache.misses += 1
+                    self._routes[id(scope["route"])] = (scope["route"], route_tags)
+                elif (generations is not None and start.get("status") == 200
+                      and not message.get("more_body", False)):
+                    await cache.set(key, (200, list(start["headers"]), message.get("body", b"")), tags, generations)
+            await send(message)
+
+        await self.app(scope, receive, capture)
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PBKDF2_ROUNDS = int(os.getenv('PBKDF2_ROUNDS', '29000'))
+HASH_WORKERS = int(os.getenv('HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_LIMIT = int(os.getenv('HASH_QUEUE_LIMIT', '64'))
+
+
+def build_context(rounds: int = PBKDF2_ROUNDS) -> CryptContext:
+    # min_rounds = rounds: hashes antigos com menos iterações são marcados para atualização
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        pbkdf2_sha256__default_rounds=rounds,
+        pbkdf2_sha256__min_rounds=rounds,
+    )
+
+
+class PasswordHasher:
+    """Executa o pbkdf2 num pool de threads limitado, fora do event loop.
+
+    O hashlib liberta o GIL durante o pbkdf2, por isso as threads correm em paralelo.
+    Quando há mais de `queue_limit` operações pendentes, novos pedidos recebem 503
+    em vez de se acumularem sem limite.
+    """
+
+    def __init__(self, context: CryptContext, workers: int = HASH_WORKERS, queue_limit: int = HASH_QUEUE_LIMIT):
+        self.context = context
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.queue_limit:
+                raise HTTPException(status_code=503, detail="Serviço ocupado, tente novamente.")
+            self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Devolve (válida, novo_hash). novo_hash vem preenchido quando o hash guardado usa parâmetros antigos."""
+        if not password or not hashed:
+            return False, None
+        try:
+            return await self._submit(self.context.verify_and_update, password, hashed)
+        except ValueError:
+            # Hash guardado em formato desconhecido
+            return False, None
+
+    def hash_sync(self, password: str) -> str:
+        return self.context.hash(password)
+
+    def verify_sync(self, password: str, hashed: str) -> bool:
+        return self.context.verify(password, hashed)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher(build_context())
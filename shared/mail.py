@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import os
+import queue
+import smtplib
+import threading
+from concurrent.futures import Future
+from email.message import Message
+from email.mime.text import MIMEText
+from typing import Dict, List, Optional
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+EMAIL_ADDRESS = os.getenv('EMAIL_ADDRESS', 'fakedalprogram@gmail.com')
+EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD', '')
+SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', 'true').lower() in ('1', 'true', 'yes')
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', '30'))
+
+# Ligações persistentes e autenticadas; cada uma é servida por uma thread própria
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', '2'))
+SMTP_QUEUE_SIZE = int(os.getenv('SMTP_QUEUE_SIZE', '1000'))
+# Mensagens enviadas de seguida na mesma sessão antes de voltar a consultar a fila
+SMTP_BATCH_SIZE = int(os.getenv('SMTP_BATCH_SIZE', '50'))
+# Ligações sem uso durante este tempo são fechadas (os servidores cortam sessões inativas)
+SMTP_IDLE_SECONDS = float(os.getenv('SMTP_IDLE_SECONDS', '60'))
+SMTP_SEND_ATTEMPTS = 2
+
+_STOP = object()
+
+
+def compose_message(recipients: str, subject: str, body: str, sender: str = EMAIL_ADDRESS) -> MIMEText:
+    msg = MIMEText(body, 'plain')
+    msg['From'] = sender
+    msg['To'] = recipients
+    msg['Subject'] = subject
+    return msg
+
+
+class SMTPPool:
+    """Envia emails por um pequeno conjunto de ligações SMTP de longa duração.
+
+    `submit` apenas coloca a mensagem na fila e devolve um Future; `send` é a
+    versão assíncrona para as rotas. As threads de envio mantêm a sessão aberta
+    (STARTTLS e login só uma vez), esvaziam a fila em lotes na mesma sessão e
+    voltam a ligar-se quando o servidor fecha a ligação.
+    """
+
+    def __init__(self, host: str = SMTP_SERVER, port: int = SMTP_PORT, username: str = EMAIL_ADDRESS,
+                 password: str = EMAIL_PASSWORD, starttls: bool = SMTP_STARTTLS, size: int = SMTP_POOL_SIZE,
+                 queue_size: int = SMTP_QUEUE_SIZE, batch_size: int = SMTP_BATCH_SIZE,
+                 idle_seconds: float = SMTP_IDLE_SECONDS, timeout: float = SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.batch_size = batch_size
+        self.idle_seconds = idle_seconds
+        self.timeout = timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.connections_opened = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.size):
+                thread = threading.Thread(target=self._worker, name=f"smtp-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def close(self, timeout: Optional[float] = None):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(_STOP)
+        for thread in threads:
+            thread.join(timeout)
+
+    def submit(self, message: Message) -> Future:
+        self.start()
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((message, future))
+        except queue.Full:
+            raise HTTPException(status_code=503, detail="Serviço de email ocupado, tente novamente.")
+        return future
+
+    async def send(self, message: Message):
+        await asyncio.wrap_future(self.submit(message))
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            connection.starttls()
+        if self.password:
+            connection.login(self.username, self.password)
+        self.connections_opened += 1
+        return connection
+
+    @staticmethod
+    def _quit(connection: Optional[smtplib.SMTP]):
+        if connection is None:
+            return
+        try:
+            connection.quit()
+        except Exception:
+            connection.close()
+
+    def _next_batch(self, block_for: float) -> list:
+        batch = [self._queue.get(timeout=block_for)]
+        while len(batch) < self.batch_size and batch[-1] is not _STOP:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        connection = None
+        while True:
+            try:
+                batch = self._next_batch(self.idle_seconds)
+            except queue.Empty:
+                self._quit(connection)
+                connection = None
+                continue
+            for item in batch:
+                if item is _STOP:
+                    self._quit(connection)
+                    return
+                connection = self._deliver(connection, *item)
+
+    def _deliver(self, connection: Optional[smtplib.SMTP], message: Message, future: Future) -> Optional[smtplib.SMTP]:
+        if not future.set_running_or_notify_cancel():
+            return connection
+        recipients = [address.strip() for address in message['To'].split(',')]
+        for attempt in range(SMTP_SEND_ATTEMPTS):
+            try:
+                if connection is None:
+                    connection = self._connect()
+                connection.sendmail(message['From'] or self.username, recipients, message.as_string())
+                self.sent += 1
+                future.set_result(None)
+                return connection
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError) as e:
+                # Ligação caída (timeout de inatividade, reinício do servidor): volta a ligar uma vez
+                logger.warning(f"Ligação SMTP perdida ({e!r}), a restabelecer...")
+                self._quit(connection)
+                connection = None
+                if attempt + 1 == SMTP_SEND_ATTEMPTS:
+                    self.failed += 1
+                    future.set_exception(e)
+            except Exception as e:
+                # Recusa do servidor (destinatário, autenticação, ...): não adianta repetir
+                self.failed += 1
+                future.set_exception(e)
+                return connection
+        return connection
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": len(self._threads),
+            "queued": self._queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "connectionsOpened": self.connections_opened,
+        }
+
+
+mailer = SMTPPool()
@@ -0,0 +1,135 @@
+import base64
+import binascii
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+from fastapi import HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = int(os.getenv('PAGE_SIZE', '50'))
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '500'))
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', '500'))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """Parâmetros comuns das rotas de listagem (usar com `page: PageParams = Depends()`)."""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Cursor opaco devolvido no cabeçalho X-Next-Cursor."),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        stream: bool = Query(False, description="Devolve todas as linhas em streaming, sem paginação."),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.stream = stream
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(jsonable_encoder(list(values)), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return [_coerce(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+
+
+def _coerce(column, value):
+    if value is None:
+        return None
+    # Tipos decorados (ex.: datetime com fuso do SQLModel) expõem o tipo real em impl_instance
+    column_type = getattr(column.type, "impl_instance", column.type)
+    try:
+        python_type = column_type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    return python_type(value)
+
+
+def _after(columns: Sequence, values: Sequence, descending: bool):
+    # Comparação lexicográfica (a, b) > (va, vb) escrita de forma portátil entre dialetos
+    clauses = []
+    for position, column in enumerate(columns):
+        equal_prefix = [columns[i] == values[i] for i in range(position)]
+        beyond = column < values[position] if descending else column > values[position]
+        clauses.append(and_(*equal_prefix, beyond))
+    return or_(*clauses)
+
+
+def keyset(query, columns: Sequence, page: PageParams, descending: bool = False):
+    """Aplica o cursor, a ordenação pelas colunas-chave e o limite (+1 para detetar a página seguinte).
+
+    As colunas devem formar uma chave única e estar indexadas (chave primária ou
+    `createdAt` seguido da chave primária).
+    """
+    if page.cursor:
+        query = query.where(_after(columns, decode_cursor(page.cursor, columns), descending))
+    query = query.order_by(None).order_by(*[column.desc() if descending else column.asc() for column in columns])
+    if page.stream:
+        return query.execution_options(yield_per=STREAM_CHUNK_SIZE)
+    return query.limit(page.limit + 1)
+
+
+def finish_page(rows: Iterable, page: PageParams, response: Response, key: Callable[[Any], Sequence]) -> list:
+    """Corta a linha extra e publica o cursor da página seguinte no cabeçalho X-Next-Cursor."""
+    rows = list(rows)
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(rows[-1]))
+    return rows
+
+
+def stream_json(rows, serialize: Callable[[Any], Any] = lambda row: row, trailer: Sequence[Any] = ()) -> StreamingResponse:
+    """Serializa as linhas como um array JSON, em blocos de STREAM_CHUNK_SIZE itens.
+
+    Aceita um iterável síncrono ou um resultado assíncrono (`AsyncSession.stream`).
+    Usado com `keyset(..., page)` em modo stream, que ativa `yield_per` (cursor do
+    lado do servidor), pelo que a memória não cresce com o tamanho da tabela.
+    Os itens de `trailer` fecham o array, se houver pelo menos uma linha.
+    """
+    def encode(chunk: List[Any], first: bool) -> bytes:
+        return (b"" if first else b",") + ",".join(chunk).encode()
+
+    def generate():
+        yield b"["
+        chunk, first = [], True
+        for row in rows:
+            chunk.append(json.dumps(jsonable_encoder(serialize(row))))
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                yield encode(chunk, first)
+                chunk, first = [], False
+        if chunk or not first:
+            chunk.extend(json.dumps(jsonable_encoder(item)) for item in trailer)
+        if chunk:
+            yield encode(chunk, first)
+        yield b"]"
+
+    async def agenerate():
+        yield b"["
+        chunk, first = [], True
+        async for row in rows:
+            chunk.append(json.dumps(jsonable_encoder(serialize(row))))
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                yield encode(chunk, first)
+                chunk, first = [], False
+        if chunk or not first:
+            chunk.extend(json.dumps(jsonable_encoder(item)) for item in trailer)
+        if chunk:
+            yield encode(chunk, first)
+        yield b"]"
+
+    body = agenerate() if hasattr(rows, "__aiter__") else generate()
+    return StreamingResponse(body, media_type="application/json")
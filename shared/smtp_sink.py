@@ -0,0 +1,88 @@
+"""Servidor SMTP local que guarda as mensagens em memória, para testes e benchmarks.
+
+Uso em desenvolvimento (com SMTP_SERVER=127.0.0.1, SMTP_PORT=8025, SMTP_STARTTLS=false):
+    python -m shared.smtp_sink
+"""
+import asyncio
+import logging
+import socket
+from email import message_from_bytes
+from email.message import Message
+from typing import List
+from aiosmtpd.controller import Controller
+
+logger = logging.getLogger(__name__)
+
+
+class MemorySink:
+    """Handler do aiosmtpd; `latency` simula o custo do handshake (TLS + AUTH) de um servidor real."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.messages: List[Message] = []
+        self.sessions = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        message = message_from_bytes(envelope.content)
+        self.messages.append(message)
+        logger.info(f"Email recebido para {envelope.rcpt_tos}: {message['Subject']}")
+        return '250 Message accepted for delivery'
+
+
+def _free_port(hostname: str) -> int:
+    with socket.socket() as probe:
+        probe.bind((hostname, 0))
+        return probe.getsockname()[1]
+
+
+class SMTPSink:
+    """Arranca um MemorySink numa thread própria (`with SMTPSink() as sink: ...`).
+
+    Com `port=0` escolhe uma porta livre.
+    """
+
+    def __init__(self, hostname: str = '127.0.0.1', port: int = 0, latency: float = 0.0):
+        self.handler = MemorySink(latency)
+        self.controller = Controller(self.handler, hostname=hostname, port=port or _free_port(hostname))
+
+    @property
+    def hostname(self) -> str:
+        return self.controller.hostname
+
+    @property
+    def port(self) -> int:
+        return self.controller.port
+
+    @property
+    def messages(self) -> List[Message]:
+        return self.handler.messages
+
+    def start(self):
+        self.controller.start()
+        return self
+
+    def stop(self):
+        self.controller.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    with SMTPSink(port=8025) as sink:
+        logger.info(f"SMTP local em {sink.hostname}:{sink.port} (Ctrl+C para sair)")
+        try:
+            asyncio.run(asyncio.Event().wait())
+        except KeyboardInterrupt:
+            pass
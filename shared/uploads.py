@@ -0,0 +1,115 @@
+import hashlib
+import os
+import uuid
+from typing import Optional
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Diretório onde ficam buyer_images, seller_images e admin_images
+UPLOAD_ROOT = os.getenv('UPLOAD_ROOT', '.')
+IMAGE_FOLDERS = ("buyer_images", "seller_images", "admin_images")
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', str(5 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', str(64 * 1024)))
+# Margem para os cabeçalhos multipart ao limitar o corpo do pedido
+MULTIPART_OVERHEAD = 16 * 1024
+TOO_LARGE_DETAIL = "Imagem excede o tamanho máximo permitido."
+
+
+class UploadLimitMiddleware:
+    """Limita o corpo dos pedidos multipart antes de o Starlette o guardar.
+
+    O FastAPI lê o formulário completo antes de chamar a rota, por isso o limite tem de
+    ser aplicado aqui: pedidos com Content-Length acima do limite recebem 413 sem ler o
+    corpo, e pedidos em chunked são interrompidos assim que passam o limite.
+    """
+
+    def __init__(self, app, limit: int = IMAGE_MAX_BYTES + MULTIPART_OVERHEAD):
+        self.app = app
+        self.limit = limit
+
+    async def __call__(self, scope, receive, send):
+        headers = dict(scope.get("headers") or []) if scope["type"] == "http" else {}
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+        length = headers.get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.limit:
+            await JSONResponse({"detail": TOO_LARGE_DETAIL}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    raise HTTPException(status_code=413, detail=TOO_LARGE_DETAIL)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def content_path(folder: str, digest: str, extension: str) -> str:
+    # Subpastas pelo prefixo do hash (ab/cd/abcd...) para não acumular milhares de ficheiros numa só
+    return os.path.join(folder, digest[:2], digest[2:4], f"{digest}{extension}")
+
+
+def _open_temp(directory: str):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{uuid.uuid4().hex}.part")
+    return path, open(path, "wb")
+
+
+def _commit(temp_path: str, handle, final_path: str) -> bool:
+    handle.flush()
+    os.fsync(handle.fileno())
+    handle.close()
+    if os.path.exists(final_path):
+        # Conteúdo já guardado: reaproveita o ficheiro existente
+        os.remove(temp_path)
+        return False
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    os.replace(temp_path, final_path)
+    return True
+
+
+def _discard(temp_path: str, handle):
+    handle.close()
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+async def store_upload(file: UploadFile, folder: str, limit: Optional[int] = None,
+                       extension: Optional[str] = None) -> str:
+    """Guarda o upload em `folder` pelo seu sha256 e devolve o caminho relativo.
+
+    O ficheiro é lido e escrito em blocos (fora do event loop), com o hash calculado
+    durante a leitura; ultrapassar `limit` devolve 413. A escrita é feita num ficheiro
+    temporário na mesma pasta e movida para o destino com `os.replace` (atómico), pelo
+    que nunca se serve um ficheiro incompleto. Uploads idênticos partilham o ficheiro.
+    """
+    limit = IMAGE_MAX_BYTES if limit is None else limit
+    if extension is None:
+        extension = os.path.splitext(file.filename or "")[1].lower()
+    target_folder = os.path.join(UPLOAD_ROOT, folder)
+    temp_path, handle = await run_in_threadpool(_open_temp, os.path.join(target_folder, ".tmp"))
+    digest, size = hashlib.sha256(), 0
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > limit:
+                raise HTTPException(status_code=413, detail=TOO_LARGE_DETAIL)
+            digest.update(chunk)
+            await run_in_threadpool(handle.write, chunk)
+        relative_path = content_path(folder, digest.hexdigest(), extension)
+        await run_in_threadpool(_commit, temp_path, handle, os.path.join(UPLOAD_ROOT, relative_path))
+    except BaseException:
+        await run_in_threadpool(_discard, temp_path, handle)
+        raise
+    return relative_path.replace(os.sep, "/")
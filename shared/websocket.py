@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+from fastapi import WebSocket
+from dotenv import load_dotenv
+from shared.broker import Broker, InMemoryBroker
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CHAT_QUEUE_SIZE = int(os.getenv('CHAT_QUEUE_SIZE', '100'))
+CHAT_SEND_TIMEOUT = float(os.getenv('CHAT_SEND_TIMEOUT', '10'))
+# drop_oldest: descarta a mensagem mais antiga da fila do cliente lento
+# disconnect: fecha a ligação do cliente lento
+CHAT_SLOW_CONSUMER_POLICY = os.getenv('CHAT_SLOW_CONSUMER_POLICY', 'drop_oldest')
+
+SLOW_CONSUMER_POLICIES = ('drop_oldest', 'disconnect')
+# 1013 "Try Again Later": o cliente pode voltar a ligar-se
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class Subscriber:
+    __slots__ = ('websocket', 'queue', 'task', 'dropped')
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+        self.dropped = 0
+
+
+class ConnectionManager:
+    """Distribui mensagens por websockets sem que um cliente lento atrase os restantes.
+
+    Cada ligação tem uma fila limitada e uma tarefa de escrita própria; `broadcast`
+    apenas coloca a mensagem nas filas (O(n) sem esperar pela rede). Quando a fila de
+    um cliente enche aplica-se a política configurada (`drop_oldest` ou `disconnect`).
+    As difusões passam pelo `broker`, que as entrega aos gestores de todos os workers.
+    """
+
+    def __init__(self, queue_size: int = CHAT_QUEUE_SIZE, policy: str = CHAT_SLOW_CONSUMER_POLICY,
+                 send_timeout: float = CHAT_SEND_TIMEOUT, broker: Optional[Broker] = None):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Política inválida: {policy}. Use uma de {SLOW_CONSUMER_POLICIES}.")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.active_connections: Dict[WebSocket, Subscriber] = {}
+        self.dropped_messages = 0
+        self.evicted_connections = 0
+        self.broker = broker or InMemoryBroker()
+        self.broker.subscribe(self.fanout)
+
+    async def start(self):
+        await self.broker.start()
+
+    async def stop(self):
+        await self.broker.stop()
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        self.register(websocket)
+
+    def register(self, websocket: WebSocket) -> Subscriber:
+        subscriber = Subscriber(websocket, self.queue_size)
+        subscriber.task = asyncio.create_task(self._writer(subscriber))
+        self.active_connections[websocket] = subscriber
+        return subscriber
+
+    def disconnect(self, websocket: WebSocket):
+        subscriber = self.active_connections.pop(websocket, None)
+        if subscriber and subscriber.task and subscriber.task is not asyncio.current_task():
+            subscriber.task.cancel()
+
+    async def send_personal_message(self, message: str, websocket: WebSocket):
+        subscriber = self.active_connections.get(websocket)
+        if subscriber:
+            self._enqueue(subscriber, message)
+
+    async def broadcast(self, message: str):
+        await self.broker.publish(message)
+
+    async def fanout(self, message: str):
+        """Entrega a mensagem aos clientes ligados a este processo."""
+        for subscriber in list(self.active_connections.values()):
+            self._enqueue(subscriber, message)
+
+    def _enqueue(self, subscriber: Subscriber, message: str):
+        try:
+            subscriber.queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            pass
+        if self.policy == 'disconnect':
+            self._evict(subscriber)
+            return
+        subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(message)
+        subscriber.dropped += 1
+        self.dropped_messages += 1
+
+    def _evict(self, subscriber: Subscriber):
+        logger.warning("A desligar cliente de websocket lento")
+        self.evicted_connections += 1
+        self.disconnect(subscriber.websocket)
+        asyncio.create_task(self._close(subscriber.websocket))
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=SLOW_CONSUMER_CLOSE_CODE), self.send_timeout)
+        except Exception:
+            pass
+
+    async def _writer(self, subscriber: Subscriber):
+        try:
+            while True:
+                message = await subscriber.queue.get()
+                await asyncio.wait_for(subscriber.websocket.send_text(message), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Cliente morto ou a bloquear para além de send_timeout
+            logger.info(f"Ligação de websocket terminada: {e!r}")
+            self.disconnect(subscriber.websocket)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "connections": len(self.active_connections),
+            "queuedMessages": sum(s.queue.qsize() for s in self.active_connections.values()),
+            "droppedMessages": self.dropped_messages,
+            "evictedConnections": self.evicted_connections,
+            **self.broker.stats(),
+        }
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
+from sqlmodel import select
 from ..utils.models import Address, AddressBase
 from shared.security import get_session
+from shared.pagination import PageParams, finish_page, keyset, stream_json
+from shared.cache import cached, response_cache
 from datetime import datetime
 from typing import List
 
@@ -9,8 +12,12 @@ router = APIRouter(prefix='/api')
 
 
 @router.get("/see/addresses", response_model=List[Address])
-def get_addresses(db: Session = Depends(get_session)):
-    return db.query(Address).all()
+@cached("address")
+def get_addresses(response: Response, page: PageParams = Depends(), db: Session = Depends(get_session)):
+    query = keyset(select(Address), [Address.adressId], page)
+    if page.stream:
+        return stream_json(db.execute(query).scalars())
+    return finish_page(db.execute(query).scalars(), page, response, key=lambda a: (a.adressId,))
 
 
 @router.post("/add/address", status_code=201)
@@ -18,10 +25,12 @@ def create_address(address: AddressBase, db: Session = Depends(get_session)):
     db_address = Address(**address.dict(), createdAt=datetime.now())
     db.add(db_address)
     db.commit()
+    response_cache.invalidate("address")
     db.refresh(db_address)
     return db_address
 
 @router.get("/see/address/{address_id}", response_model=Address)
+@cached("address")
 def get_address(address_id: int, db: Session = Depends(get_session)):
     address = db.query(Address).filter(Address.adressId == address_id).first()
     if not address:
@@ -36,6 +45,7 @@ def update_address(address_id: int, address: AddressBase, db: Session = Depends(
     for attr, value in address.dict().items():
         setattr(db_address, attr, value)
     db.commit()
+    response_cache.invalidate("address")
     return db_address
 
 @router.delete("/delete/address/{address_id}", status_code=204)
@@ -45,3 +55,4 @@ def delete_address(address_id: int, db: Session = Depends(get_session)):
         raise HTTPException(status_code=404, detail="Address not found")
     db.delete(db_address)
     db.commit()
+    response_cache.invalidate("address")
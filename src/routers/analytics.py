@@ -0,0 +1,29 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+from shared.security import get_async_session
+from ..utils.sales import MEASURES, format_sales_row, sales_query
+
+router = APIRouter(prefix='/api')
+
+SALES_DEFAULT_DAYS = 30
+
+
+# Receita, unidades e pedidos de um vendedor por dia, produto ou categoria, lidos das agregações diárias
+@router.get('/analytics/sales/{seller_id}')
+async def seller_sales(
+    seller_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    group_by: Literal["day", "product", "category"] = "day",
+    db: AsyncSession = Depends(get_async_session),
+):
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=SALES_DEFAULT_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="A data inicial tem de ser anterior à final.")
+    rows = [format_sales_row(row) for row in (await db.execute(sales_query(seller_id, start, end, group_by))).all()]
+    totals = {name: sum(row[name] for row in rows) for name in MEASURES}
+    totals["revenue"] = round(totals["revenue"], 2)
+    return {"sellerId": seller_id, "start": start, "end": end, "groupBy": group_by, "totals": totals, "rows": rows}
@@ -1,10 +1,10 @@
-import jwt
 import logging
 from fastapi import APIRouter, Depends, HTTPException
-from shared.security import JWTBearer, create_access_token, get_session, verifyPassword, ALGORITHM, JWT_SECRET_KEY
+from shared.security import JWTBearer, Principal, create_access_token, get_async_session, password_hasher, token_cache
 from ..utils.interfacesModel import Login, Token
 from passlib.context import CryptContext
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from ..utils.models import User
 
 router = APIRouter(prefix='/api')
@@ -13,20 +13,24 @@ logger = logging.getLogger(__name__)
 
 
 @router.post('/user/login')
-async def login(dto: Login, db: Session = Depends(get_session)):
-    user = db.exec(select(User).where(User.userEmail == dto.userEmail)).first()
+async def login(dto: Login, db: AsyncSession = Depends(get_async_session)):
+    user = (await db.exec(select(User).where(User.userEmail == dto.userEmail))).first()
     
     if user is None:
         raise HTTPException(status_code=400, detail="E-mail incorreto.")
     
-    if not verifyPassword(dto.password, user.password):
+    password_ok, new_hash = await password_hasher.verify(dto.password, user.password)
+    if not password_ok:
         logger.warning(f"Tentativa de login falhada para o email: {dto.userEmail}")
         raise HTTPException(status_code=400, detail="Senha incorreta.")
     
     access_token = create_access_token(subject=str(user.userId))
     
+    # Hash antigo (parâmetros desatualizados): guarda o novo no mesmo commit
+    if new_hash:
+        user.password = new_hash
     user.accessToken = access_token
-    db.commit()
+    await db.commit()
     
     logger.info(f"Login bem-sucedido para o usuário: {dto.userEmail}")
     return {"accessToken": access_token}
@@ -34,15 +38,14 @@ async def login(dto: Login, db: Session = Depends(get_session)):
 
 
 @router.post('/user/logout')
-async def logout(dependencies=Depends(JWTBearer()), db: Session = Depends(get_session)):
-    token = dependencies
-    payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM])
-    user_id = payload.get('sub')
+async def logout(principal: Principal = Depends(JWTBearer()), db: AsyncSession = Depends(get_async_session)):
+    user_id = principal.userId
     
-    user = db.get(User, user_id)
+    user = await db.get(User, user_id)
     if user:
         user.accessToken = ''
-        db.commit()
+        await db.commit()
+        token_cache.discard(principal.token)
         logger.info(f"Logout bem-sucedido para o usuário ID: {user_id}")
         return {"message": "Logout Successfully"}
     else:
@@ -0,0 +1,75 @@
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Body, Depends
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from shared.security import get_async_session
+from shared.cache import response_cache
+from ..utils.bulk import bulk_upsert
+from ..utils.ratingSummary import arefresh_product_categories
+from ..utils.models import (Category, CategoryBase, Order, OrderBase, Post, PostBase, Product, ProductBase,
+                            StockReservation)
+from ..utils.searchIndex import aindex_products
+from ..utils.sales import arecord_sales, aunrecord_sales
+from ..utils.suggestIndex import suggest_index
+
+router = APIRouter(prefix='/api')
+
+
+# Com o id, o item atualiza a linha existente (um id inexistente é um erro); sem id é criado
+class ProductBulkItem(ProductBase):
+    productId: Optional[int] = None
+
+class PostBulkItem(PostBase):
+    postId: Optional[int] = None
+
+class OrderBulkItem(OrderBase):
+    orderId: Optional[int] = None
+
+
+def _saved(report: Dict[str, Any], items: List[Dict[str, Any]]):
+    for result in report["results"]:
+        if result["status"] in ("created", "updated"):
+            yield result["id"], items[result["index"]]
+
+
+async def _products_written(db, product_ids: List[int]):
+    # Um produto pode mudar de categoria: atualiza a pesquisa e a cópia nos agregados de avaliações
+    await aindex_products(db, product_ids)
+    await arefresh_product_categories(db, product_ids)
+
+
+# Cria/atualiza vários produtos; o resultado de cada item vem em "results", pela ordem enviada
+@router.post('/add/bulk/products')
+async def bulk_products(items: List[Dict[str, Any]] = Body(...), db: AsyncSession = Depends(get_async_session)):
+    report = await bulk_upsert(db, Product, ProductBulkItem, items, on_chunk=_products_written)
+    for product_id, item in _saved(report, items):
+        suggest_index.put("product", product_id, item.get("productName"))
+    return report
+
+# Categorias identificadas pelo nome: as que já existem ficam como estão e devolvem o id
+@router.post('/add/bulk/categories')
+async def bulk_categories(items: List[Dict[str, Any]] = Body(...), db: AsyncSession = Depends(get_async_session)):
+    report = await bulk_upsert(db, Category, CategoryBase, items, key="categoryName")
+    await response_cache.ainvalidate("category")
+    for category_id, item in _saved(report, items):
+        suggest_index.put("category", category_id, item.get("categoryName"))
+    return report
+
+@router.post('/add/bulk/posts')
+async def bulk_posts(items: List[Dict[str, Any]] = Body(...), db: AsyncSession = Depends(get_async_session)):
+    return await bulk_upsert(db, Post, PostBulkItem, items)
+
+async def _reserved_orders(db, order_ids: List[int]) -> Dict[int, str]:
+    reserved = (await db.execute(
+        select(StockReservation.orderId).where(StockReservation.orderId.in_(order_ids)).distinct()
+    )).scalars()
+    return {order_id: f"O pedido tem stock reservado: use /api/checkout/{order_id}/confirm ou /cancel."
+            for order_id in reserved}
+
+# Só atualiza pedidos existentes: criar pedidos passa por /api/checkout, que reserva o stock, e os
+# pedidos com reservas ativas só mudam pelo checkout. As vendas diárias (SalesDaily) dos pedidos
+# atualizados são retiradas antes da escrita e somadas depois
+@router.post('/add/bulk/orders')
+async def bulk_orders(items: List[Dict[str, Any]] = Body(...), db: AsyncSession = Depends(get_async_session)):
+    return await bulk_upsert(db, Order, OrderBulkItem, items, on_chunk=arecord_sales, before_write=aunrecord_sales,
+                             locked=_reserved_orders, create=False)
@@ -1,10 +1,14 @@
 from datetime import datetime
-from shared.security import get_session
+from shared.security import get_async_session
 from typing import List
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Response
 from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from ..utils.models import Category, CategoryBase
+from shared.pagination import PageParams, finish_page, keyset, stream_json
+from shared.cache import cached, response_cache
+from ..utils.searchIndex import aremove_category, arename_category
+from ..utils.suggestIndex import suggest_index
 
 
 router = APIRouter(prefix='/api')
@@ -12,42 +16,56 @@ router = APIRouter(prefix='/api')
 
 
 @router.post('/add/category', status_code=201)
-async def create_category(dto: CategoryBase, db: Session = Depends(get_session)):
+async def create_category(dto: CategoryBase, db: AsyncSession = Depends(get_async_session)):
     db_ctg = Category(**dto.dict(), createdAt=datetime.now())
     db.add(db_ctg)
-    db.commit()
-    db.refresh(db_ctg)
+    await db.commit()
+    await response_cache.ainvalidate("category")
+    await db.refresh(db_ctg)
+    suggest_index.put("category", db_ctg.categoryId, db_ctg.categoryName)
     return db_ctg
 
 @router.get('/see/categories', response_model=List[Category])
-async def list_categories(db: Session = Depends(get_session)):
-    return db.exec(select(Category)).all()
+@cached("category")
+async def list_categories(response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_session)):
+    query = keyset(select(Category), [Category.categoryId], page)
+    if page.stream:
+        return stream_json(await db.stream_scalars(query))
+    return finish_page(await db.exec(query), page, response, key=lambda c: (c.categoryId,))
 
 @router.get('/see/category/{id}', response_model=Category)
-async def list_one_category(id: int, db: Session = Depends(get_session)):
-    category = db.exec(select(Category).where(Category.categoryId == id)).first()
+@cached("category")
+async def list_one_category(id: int, db: AsyncSession = Depends(get_async_session)):
+    category = (await db.exec(select(Category).where(Category.categoryId == id))).first()
     if not category:
         raise HTTPException(status_code=404, detail="Categoria não encontrada")
     return category
 
 @router.put('/update/category/{id}', status_code=200)
-async def update_category(id: int, dto: CategoryBase, db: Session = Depends(get_session)):
-    category = db.get(Category, id)
+async def update_category(id: int, dto: CategoryBase, db: AsyncSession = Depends(get_async_session)):
+    category = await db.get(Category, id)
     if not category:
         raise HTTPException(status_code=404, detail="Categoria não encontrada")
     for attr, value in dto.dict(exclude_unset=True).items():
         setattr(category, attr, value)
-    db.commit()
-    db.refresh(category)
+    await arename_category(db, id, category.categoryName)
+    await db.commit()
+    await response_cache.ainvalidate("category")
+    await db.refresh(category)
+    suggest_index.put("category", id, category.categoryName)
     return category
 
 @router.delete('/delete/category/{id}', status_code=204)
-async def delete_category(id: int, db: Session = Depends(get_session)):
-    category = db.get(Category, id)
+async def delete_category(id: int, db: AsyncSession = Depends(get_async_session)):
+    category = await db.get(Category, id)
     if not category:
         raise HTTPException(status_code=404, detail="Categoria não encontrada")
-    db.delete(category)
-    db.commit()
+    await aremove_category(db, id)
+    await db.delete(category)
+    await db.commit()
+    # categoryId dos utilizadores passa a NULL
+    await response_cache.ainvalidate("category", "user")
+    suggest_index.remove("category", id)
     return None
 
 
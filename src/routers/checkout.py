@@ -0,0 +1,45 @@
+from typing import List
+from fastapi import APIRouter, Depends
+from sqlmodel import Field, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from shared.security import get_async_session
+from ..utils.reservations import cancel_order, confirm_order, place_order
+
+router = APIRouter(prefix='/api')
+
+CART_MAX_LINES = 100
+
+
+class CheckoutRequest(SQLModel):
+    buyerId: int
+    productId: int
+    quantity: int = Field(ge=1)
+
+class CartLine(SQLModel):
+    productId: int
+    quantity: int = Field(ge=1)
+
+class CartCheckoutRequest(SQLModel):
+    buyerId: int
+    lines: List[CartLine] = Field(min_length=1, max_length=CART_MAX_LINES)
+
+
+# Cria o pedido reservando o stock; as unidades voltam ao stock se não for pago até "reservedUntil"
+@router.post('/checkout')
+async def checkout(request: CheckoutRequest, db: AsyncSession = Depends(get_async_session)):
+    return await place_order(db, request.buyerId, [(request.productId, request.quantity)])
+
+# Checkout de um carrinho: os preços vêm de Product.unitPrice e os totais são calculados no servidor
+@router.post('/checkout/cart')
+async def checkout_cart(request: CartCheckoutRequest, db: AsyncSession = Depends(get_async_session)):
+    return await place_order(db, request.buyerId, [(line.productId, line.quantity) for line in request.lines])
+
+# Confirma o pagamento de um pedido reservado
+@router.post('/checkout/{order_id}/confirm')
+async def confirm_checkout(order_id: int, db: AsyncSession = Depends(get_async_session)):
+    return await confirm_order(db, order_id)
+
+# Cancela um pedido reservado e devolve as unidades ao stock
+@router.post('/checkout/{order_id}/cancel')
+async def cancel_checkout(order_id: int, db: AsyncSession = Depends(get_async_session)):
+    return await cancel_order(db, order_id)
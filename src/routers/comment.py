@@ -1,12 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+import os
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import Dict, List
+from sqlalchemy import func
 from sqlmodel import Session, select
-from shared.security import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from shared.security import JWTBearer, Principal, get_session, get_async_session
+from shared.pagination import PageParams, encode_cursor, finish_page, keyset, stream_json
 from ..utils.models import Comment, CommentReply, CommentBase, CommentReplyBase, User
+from ..utils.likes import add_like, like_counter, remove_like
 
 
 router = APIRouter(prefix='/api')
 
+# Respostas incluídas por comentário no fio; as restantes vêm de /see/comment/{id}/replies
+THREAD_REPLIES = int(os.getenv('THREAD_REPLIES', '3'))
+MAX_THREAD_REPLIES = int(os.getenv('MAX_THREAD_REPLIES', '20'))
+
 ##############Comment#############
 
 @router.post("/add/comments/", response_model=Comment)
@@ -18,24 +27,134 @@ def create_comment(comment: CommentBase, db: Session = Depends(get_session)):
     return db_comment
 
 @router.get("/see/comments")
-def read_comments(db: Session = Depends(get_session)):
-    comments = db.exec(select(Comment).join(User).where(Comment.userId == User.userId)).all()
-    formatted_comments = []
-    for comment in comments:
-        formatted_comment = {
+def read_comments(response: Response, page: PageParams = Depends(), db: Session = Depends(get_session)):
+    # Comentário e autor na mesma linha, paginados pelo índice idx_comment_created
+    query = keyset(
+        select(Comment, User).join(User, Comment.userId == User.userId),
+        [Comment.createdAt, Comment.commentId],
+        page,
+    )
+    if page.stream:
+        return stream_json(db.execute(query), _format_comment)
+    rows = finish_page(db.execute(query), page, response, key=lambda row: (row[0].createdAt, row[0].commentId))
+    return [_format_comment(row) for row in rows]
+
+def _format_comment(row):
+    comment, user = row
+    return {
+        "commentId": comment.commentId,
+        "userId": comment.userId,
+        "userFirstName": user.userFirstName,
+        "userLastName": user.userLastName,
+        "userEmail": user.userEmail,
+        "userImage": user.userImage,
+        "commentDescription": comment.commentDescription,
+        "totalLikes": comment.totalLikes + like_counter.pending("comment", comment.commentId),
+        "createdAt": comment.createdAt
+    }
+
+def _format_author(user):
+    return {
+        "userFirstName": user.userFirstName if user else None,
+        "userLastName": user.userLastName if user else None,
+        "userEmail": user.userEmail if user else None,
+        "userImage": user.userImage if user else None,
+    }
+
+def _format_reply(reply, user):
+    return {
+        "commentReplyId": reply.commentReplyId,
+        "commentId": reply.commentId,
+        "userId": reply.userId,
+        **_format_author(user),
+        "commentDescription": reply.commentDescription,
+        "totalLikes": reply.totalLikes + like_counter.pending("reply", reply.commentReplyId),
+        "createdAt": reply.createdAt
+    }
+
+def _reply_cursor(reply):
+    return encode_cursor((reply.createdAt, reply.commentReplyId))
+
+# Página de comentários com autores e as primeiras respostas de cada um, em duas consultas
+@router.get("/see/comments/thread")
+async def read_comment_threads(
+    response: Response,
+    page: PageParams = Depends(),
+    replies: int = Query(THREAD_REPLIES, ge=1, le=MAX_THREAD_REPLIES),
+    db: AsyncSession = Depends(get_async_session),
+):
+    if page.stream:
+        raise HTTPException(status_code=400, detail="O fio de comentários não suporta stream.")
+    query = keyset(
+        select(Comment, User).outerjoin(User, Comment.userId == User.userId),
+        [Comment.createdAt, Comment.commentId],
+        page,
+    )
+    rows = finish_page((await db.execute(query)).all(), page, response,
+                       key=lambda row: (row[0].createdAt, row[0].commentId))
+    if not rows:
+        return []
+
+    # Numera as respostas de cada comentário e traz só as primeiras `replies` (+1 para saber se há mais)
+    ranked = (
+        select(
+            CommentReply.commentReplyId.label("replyId"),
+            func.row_number().over(
+                partition_by=CommentReply.commentId,
+                order_by=(CommentReply.createdAt, CommentReply.commentReplyId),
+            ).label("position"),
+            func.count().over(partition_by=CommentReply.commentId).label("total"),
+        )
+        .where(CommentReply.commentId.in_([comment.commentId for comment, _ in rows]))
+        .subquery()
+    )
+    reply_rows = (await db.execute(
+        select(CommentReply, User, ranked.c.total)
+        .join(ranked, ranked.c.replyId == CommentReply.commentReplyId)
+        .outerjoin(User, CommentReply.userId == User.userId)
+        .where(ranked.c.position <= replies + 1)
+        .order_by(CommentReply.commentId, CommentReply.createdAt, CommentReply.commentReplyId)
+    )).all()
+
+    threads: Dict[int, list] = {}
+    totals: Dict[int, int] = {}
+    for reply, user, total in reply_rows:
+        threads.setdefault(reply.commentId, []).append((reply, user))
+        totals[reply.commentId] = total
+
+    result = []
+    for comment, user in rows:
+        thread = threads.get(comment.commentId, [])
+        shown = thread[:replies]
+        result.append({
             "commentId": comment.commentId,
             "userId": comment.userId,
-            "userFirstName": comment.user.userFirstName,
-            "userLastName": comment.user.userLastName,
-            "userEmail": comment.user.userEmail,
-            "userImage": comment.user.userImage,
+            **_format_author(user),
             "commentDescription": comment.commentDescription,
-            "totalLikes": comment.totalLikes,
-            "createdAt": comment.createdAt
-        }
-        formatted_comments.append(formatted_comment)
+            "totalLikes": comment.totalLikes + like_counter.pending("comment", comment.commentId),
+            "createdAt": comment.createdAt,
+            "replyCount": totals.get(comment.commentId, 0),
+            "replies": [_format_reply(reply, reply_user) for reply, reply_user in shown],
+            # Cursor para /see/comment/{id}/replies quando há mais respostas do que as mostradas
+            "moreRepliesCursor": _reply_cursor(shown[-1][0]) if len(thread) > replies else None,
+        })
+    return result
 
-    return formatted_comments
+# Respostas de um comentário, por ordem de criação
+@router.get("/see/comment/{commentId}/replies")
+async def read_comment_replies(commentId: int, response: Response, page: PageParams = Depends(),
+                               db: AsyncSession = Depends(get_async_session)):
+    query = keyset(
+        select(CommentReply, User).outerjoin(User, CommentReply.userId == User.userId)
+        .where(CommentReply.commentId == commentId),
+        [CommentReply.createdAt, CommentReply.commentReplyId],
+        page,
+    )
+    if page.stream:
+        return stream_json(await db.stream(query), lambda row: _format_reply(*row))
+    rows = finish_page((await db.execute(query)).all(), page, response,
+                       key=lambda row: (row[0].createdAt, row[0].commentReplyId))
+    return [_format_reply(reply, user) for reply, user in rows]
 
 @router.get("/see/comment/{commentId}")
 def read_comment(commentId: int, db: Session = Depends(get_session)):
@@ -57,7 +176,7 @@ def read_comment(commentId: int, db: Session = Depends(get_session)):
         "userEmail": user.userEmail,
         "userImage": user.userImage,
         "commentDescription": comment.commentDescription,
-        "totalLikes": comment.totalLikes,
+        "totalLikes": comment.totalLikes + like_counter.pending("comment", comment.commentId),
         "createdAt": comment.createdAt
     }
 
@@ -65,14 +184,14 @@ def read_comment(commentId: int, db: Session = Depends(get_session)):
 
 # Atualiza um comentário
 @router.put("/update/comments/{commentId}")
-async def update_comment(commentId: int, dto: CommentBase, session: Session = Depends(get_session)):
-    comment = session.get(Comment, commentId)
+async def update_comment(commentId: int, dto: CommentBase, session: AsyncSession = Depends(get_async_session)):
+    comment = await session.get(Comment, commentId)
     if comment is None:
         raise HTTPException(status_code=404, detail="Comentário não encontrado.")
     comment.commentDescription = dto.commentDescription
     session.add(comment)
-    session.commit()
-    session.refresh(comment)
+    await session.commit()
+    await session.refresh(comment)
     return comment
 
 @router.delete("/delete/comments/{commentId}", response_model=Comment)
@@ -84,68 +203,76 @@ def delete_comment(commentId: int, db: Session = Depends(get_session)):
     db.commit()
     return {"Reponse": "Comentário apagado."}
 
-# Curtir uma resposta de comentário
+# Curtir um comentário como o utilizador do token (um like por utilizador; totalLikes é atualizado em lote, ver utils/likes.py)
 @router.post("/add/comment/{commentId}/like")
-async def like_comment_reply(commentId: int, session: Session = Depends(get_session)):
-    comment = session.get(Comment, commentId)
-    comment.totalLikes = comment.totalLikes + 1
-    session.add(comment)
-    session.commit()
-    session.refresh(comment)
+async def like_comment(commentId: int, principal: Principal = Depends(JWTBearer()), session: AsyncSession = Depends(get_async_session)):
+    if not await add_like(session, "comment", commentId, principal.userId):
+        return {"Response": "Like já existente"}
     return {"Response": "Like adicionado"}
 
+# Retirar o like de um comentário
+@router.delete("/delete/comment/{commentId}/like")
+async def unlike_comment(commentId: int, principal: Principal = Depends(JWTBearer()), session: AsyncSession = Depends(get_async_session)):
+    if not await remove_like(session, "comment", commentId, principal.userId):
+        raise HTTPException(status_code=404, detail="Like não encontrado.")
+    return {"Response": "Like removido"}
+
 ######################ComentReply######################
 
 # Atualiza uma resposta de comentário
 @router.put("/update/commentReply/{commentReplyId}")
-async def update_comment_reply(commentReplyId: int, dto: CommentReplyBase, session: Session = Depends(get_session)):
-    reply = session.get(Comment, commentReplyId)
+async def update_comment_reply(commentReplyId: int, dto: CommentReplyBase, session: AsyncSession = Depends(get_async_session)):
+    reply = await session.get(Comment, commentReplyId)
     if reply is None:
         raise HTTPException(status_code=404, detail="Resposta do comentário não encontrada.")
     reply.commentDescription = dto.commentDescription
     session.add(reply)
-    session.commit()
-    session.refresh(reply)
+    await session.commit()
+    await session.refresh(reply)
     return reply
 
 # Curtir uma resposta de comentário
 @router.post("/add/commentReply/{commentReplyId}/like")
-async def like_comment_reply(commentReplyId: int, session: Session = Depends(get_session)):
-    reply = session.get(CommentReply, commentReplyId)
-    reply.totalLikes = reply.totalLikes + 1
-    session.add(reply)
-    session.commit()
-    session.refresh(reply)
+async def like_comment_reply(commentReplyId: int, principal: Principal = Depends(JWTBearer()), session: AsyncSession = Depends(get_async_session)):
+    if not await add_like(session, "reply", commentReplyId, principal.userId):
+        return {"Response": "Like já existente"}
     return {"Response": "Like adicionado"}
 
+# Retirar o like de uma resposta de comentário
+@router.delete("/delete/commentReply/{commentReplyId}/like")
+async def unlike_comment_reply(commentReplyId: int, principal: Principal = Depends(JWTBearer()), session: AsyncSession = Depends(get_async_session)):
+    if not await remove_like(session, "reply", commentReplyId, principal.userId):
+        raise HTTPException(status_code=404, detail="Like não encontrado.")
+    return {"Response": "Like removido"}
+
 # Exclui uma resposta de comentário
 @router.delete("/delete/commentReply/{commentReplyId}")
-async def delete_comment_reply(commentReplyId: int, session: Session = Depends(get_session)):
-    reply = session.get(CommentReply, commentReplyId)
+async def delete_comment_reply(commentReplyId: int, session: AsyncSession = Depends(get_async_session)):
+    reply = await session.get(CommentReply, commentReplyId)
     if reply is None:
         raise HTTPException(status_code=404, detail="Resposta do comentário não encontrada.")
-    session.delete(reply)
-    session.commit()
+    await session.delete(reply)
+    await session.commit()
     return {"Response": "Resposta do comentário apagada"}
 
 # Responde a um comentário
 @router.post("/add/commentReply/{commentId}")
-async def reply_to_comment(commentId: int, dto: CommentReplyBase, session: Session = Depends(get_session)):
-    parent_comment = session.get(Comment, commentId)
+async def reply_to_comment(commentId: int, dto: CommentReplyBase, session: AsyncSession = Depends(get_async_session)):
+    parent_comment = await session.get(Comment, commentId)
     if parent_comment is None:
         raise HTTPException(status_code=404, detail="Comentário a ser respondido não encontrado.")
     reply = CommentReply(commentId=commentId, userId=dto.userId, commentDescription=dto.commentDescription)
     session.add(reply)
-    session.commit()
-    session.refresh(reply)
+    await session.commit()
+    await session.refresh(reply)
     return reply
 
 #################Outras##################
 
 # Obtém respostas de comentários de um usuário específico
 @router.get("/see/user/{userId}/commentReplied")
-async def get_user_comment_replies(userId: int, session: Session = Depends(get_session)):
-    replies = session.exec(select(CommentReply).filter(CommentReply.userId == userId)).all()
+async def get_user_comment_replies(userId: int, session: AsyncSession = Depends(get_async_session)):
+    replies = (await session.exec(select(CommentReply).filter(CommentReply.userId == userId))).all()
     return replies
 
 # Obtém comentários em um post específico
@@ -157,6 +284,6 @@ async def get_user_comment_replies(userId: int, session: Session = Depends(get_s
 
 # Obtém comentários de um usuário específico
 @router.get("/users/{userId}/comments")
-async def get_user_comments(userId: int, session: Session = Depends(get_session)):
-    comments = session.exec(select(Comment).filter(Comment.userId == userId)).all()
+async def get_user_comments(userId: int, session: AsyncSession = Depends(get_async_session)):
+    comments = (await session.exec(select(Comment).filter(Comment.userId == userId))).all()
     return comments
\ No newline at end of file
@@ -0,0 +1,100 @@
+import os
+import re
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+from shared import uploads
+from shared.uploads import IMAGE_FOLDERS
+
+load_dotenv()
+
+router = APIRouter()
+
+# Endereço público da API, usado para montar os URLs guardados em userImage
+PUBLIC_BASE_URL = os.getenv('PUBLIC_BASE_URL', 'http://localhost:5000').rstrip('/')
+IMAGE_MAX_AGE = int(os.getenv('IMAGE_MAX_AGE', str(365 * 24 * 3600)))
+CONTENT_HASH = re.compile(r'^[0-9a-f]{64}$')
+
+
+def _is_content_addressed(path: str) -> bool:
+    return bool(CONTENT_HASH.match(os.path.splitext(os.path.basename(path))[0]))
+
+
+def image_version(path: str, stat_result: os.stat_result) -> str:
+    """Versão do ficheiro: o sha256 do nome (uploads novos) ou mtime+tamanho (ficheiros antigos)."""
+    if _is_content_addressed(path):
+        return os.path.splitext(os.path.basename(path))[0]
+    return f"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"
+
+
+def image_url(relative_path: str) -> str:
+    """URL imutável da imagem: o conteúdo faz parte do nome, ou da query `v` nos ficheiros antigos."""
+    url = f"{PUBLIC_BASE_URL}/images/{relative_path}"
+    if _is_content_addressed(relative_path):
+        return url
+    full_path = os.path.join(uploads.UPLOAD_ROOT, relative_path)
+    return f"{url}?v={image_version(full_path, os.stat(full_path))}"
+
+
+def _resolve(folder: str, file_path: str) -> str:
+    if folder not in IMAGE_FOLDERS or ".tmp" in file_path.split("/"):
+        raise HTTPException(status_code=404, detail="Imagem não encontrada.")
+    base = os.path.realpath(os.path.join(uploads.UPLOAD_ROOT, folder))
+    full_path = os.path.realpath(os.path.join(base, file_path))
+    if os.path.commonpath([base, full_path]) != base:
+        raise HTTPException(status_code=404, detail="Imagem não encontrada.")
+    return full_path
+
+
+def _stat(path: str) -> Optional[os.stat_result]:
+    try:
+        stat_result = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return stat_result if os.path.isfile(path) else None
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+async def serve_image(folder: str, file_path: str, request: Request) -> Response:
+    full_path = _resolve(folder, file_path)
+    stat_result = await run_in_threadpool(_stat, full_path)
+    if stat_result is None:
+        raise HTTPException(status_code=404, detail="Imagem não encontrada.")
+
+    version = image_version(full_path, stat_result)
+    etag = f'"{version}"'
+    # Com a versão no URL a resposta nunca muda; sem ela o cliente revalida com o ETag
+    if _is_content_addressed(full_path) or request.query_params.get("v") == version:
+        cache_control = f"public, max-age={IMAGE_MAX_AGE}, immutable"
+    else:
+        cache_control = "public, no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    # FileResponse trata Range/If-Range e usa http.response.pathsend (sem cópia) quando o servidor o suporta
+    return FileResponse(full_path, headers=headers, stat_result=stat_result)
+
+
+@router.api_route('/images/{folder}/{file_path:path}', methods=["GET", "HEAD"], tags=["Image"])
+async def get_image(folder: str, file_path: str, request: Request):
+    return await serve_image(folder, file_path, request)
+
+
+def _legacy_route(folder: str):
+    async def get_legacy_image(file_path: str, request: Request):
+        return await serve_image(folder, file_path, request)
+    return get_legacy_image
+
+
+# URLs antigos (/seller_images/...) continuam válidos, mas sem versão são sempre revalidados
+for _folder in IMAGE_FOLDERS:
+    router.add_api_route(f"/{_folder}/{{file_path:path}}", _legacy_route(_folder),
+                         methods=["GET", "HEAD"], include_in_schema=False)
@@ -1,8 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlmodel import Session, select
-from typing import List
-from shared.security import get_session
-from ..utils.models import Post, Order, Product, PostBase, ProductBase, OrderBase
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from sqlmodel import Session, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
+from shared.security import get_session, get_async_session
+from shared.pagination import PageParams, finish_page, keyset, stream_json
+from ..utils.searchIndex import index_product
+from ..utils.suggestIndex import suggest_index
+from ..utils.reservations import settle_statements, take_reservations
+from ..utils.groupCommit import GROUP_COMMIT_ENABLED, order_queue, post_queue
+from ..utils.sales import arecord_sales, record_sales
+from ..utils.ratingSummary import format_rating_summary, format_top_product, product_summary_upsert, top_rated_products_query
+from ..utils.models import (Post, Order, Product, PostBase, ProductBase, OrderBase, OrderLine, StockReservation,
+                            ProductRatingSummary, ProductReview, ProductReviewBase)
 
 router = APIRouter(prefix='/api')
 
@@ -17,9 +26,11 @@ def get_posts_by_product(product_id: int, session: Session = Depends(get_session
 
 # Rota para obter todos os posts de um vendedor específico
 @router.get("/see/posts/seller/{seller_id}")
-def get_posts_by_seller(seller_id: int, session: Session = Depends(get_session)):
-    posts = session.exec(select(Post).where(Post.sellerId == seller_id)).all()
-    return posts
+def get_posts_by_seller(seller_id: int, response: Response, page: PageParams = Depends(), session: Session = Depends(get_session)):
+    query = keyset(select(Post).where(Post.sellerId == seller_id), [Post.postId], page)
+    if page.stream:
+        return stream_json(session.exec(query))
+    return finish_page(session.exec(query), page, response, key=lambda p: (p.postId,))
 
 # Rota para atualizar um post de produto existente
 @router.put("/update/post/{post_id}")
@@ -46,12 +57,15 @@ def delete_post(post_id: int, session: Session = Depends(get_session)):
     return {"message": "Post deleted successfully"}
 
 # Endpoint para lidar com posts de produtos
+# Com GROUP_COMMIT_ENABLED, os posts que chegam em simultâneo são gravados na mesma transação
 @router.post("/add/posts/")
-def create_post(post: PostBase, session: Session = Depends(get_session)):
+async def create_post(post: PostBase, session: AsyncSession = Depends(get_async_session)):
     db_post = Post(**post.dict())
+    if GROUP_COMMIT_ENABLED:
+        return await post_queue.add(db_post)
     session.add(db_post)
-    session.commit()
-    session.refresh(db_post)
+    await session.commit()
+    await session.refresh(db_post)
     return db_post
 
 
@@ -63,7 +77,10 @@ def create_post(post: PostBase, session: Session = Depends(get_session)):
 def create_product(product: ProductBase, session: Session = Depends(get_session)):
         db_product = Product(**product.dict())
         session.add(db_product)
+        session.flush()
+        index_product(session, db_product.productId)
         session.commit()
+        suggest_index.put("product", db_product.productId, db_product.productName)
         session.refresh(db_product)
         return db_product
 
@@ -72,6 +89,26 @@ def create_product(product: ProductBase, session: Session = Depends(get_session)
 def list_products_by_seller(seller_id: int, session: Session = Depends(get_session)):
     products = session.exec(select(Product).where(Product.sellerId == seller_id)).all()
     return products
+
+# Produtos mais bem avaliados (opcionalmente de uma categoria), lidos dos agregados de avaliações
+@router.get("/see/products/top")
+async def list_top_rated_products(response: Response, category_id: Optional[int] = None,
+                                  min_ratings: int = Query(1, ge=1), page: PageParams = Depends(),
+                                  db: AsyncSession = Depends(get_async_session)):
+    columns = [ProductRatingSummary.ratingAverage, ProductRatingSummary.ratingCount, ProductRatingSummary.productId]
+    query = keyset(top_rated_products_query(category_id, min_ratings), columns, page, descending=True)
+    if page.stream:
+        return stream_json(await db.stream(query), format_top_product)
+    rows = finish_page(await db.execute(query), page, response,
+                       key=lambda row: (row[0].ratingAverage, row[0].ratingCount, row[0].productId))
+    return [format_top_product(row) for row in rows]
+
+# Média, número de avaliações e histograma 1–5 de um produto
+@router.get("/see/products/{product_id}/rating")
+async def get_product_rating(product_id: int, db: AsyncSession = Depends(get_async_session)):
+    if await db.get(Product, product_id) is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return {"productId": product_id, **format_rating_summary(await db.get(ProductRatingSummary, product_id))}
     
 
 #################Order###################
@@ -84,13 +121,23 @@ def get_order_details(order_id: int, session: Session = Depends(get_session)):
         raise HTTPException(status_code=404, detail="Order not found")
     return db_order
 
+# Rota para obter as linhas de um pedido (checkout de carrinho)
+@router.get("/see/orders/{order_id}/lines")
+def get_order_lines(order_id: int, session: Session = Depends(get_session)):
+    return session.exec(select(OrderLine).where(OrderLine.orderId == order_id).order_by(OrderLine.orderLineId)).all()
+
 # Rota para criar um novo pedido de produto
+# Com GROUP_COMMIT_ENABLED, os pedidos que chegam em simultâneo são gravados na mesma transação
 @router.post("/add/orders")
-def create_order(order: OrderBase, session: Session = Depends(get_session)):
+async def create_order(order: OrderBase, session: AsyncSession = Depends(get_async_session)):
     db_order = Order(**order.dict())
+    if GROUP_COMMIT_ENABLED:
+        return await order_queue.add(db_order)
     session.add(db_order)
-    session.commit()
-    session.refresh(db_order)
+    await session.flush()
+    await arecord_sales(session, [db_order.orderId])
+    await session.commit()
+    await session.refresh(db_order)
     return db_order
 
 # Rota para excluir um pedido de produto existente
@@ -99,15 +146,23 @@ def delete_order(order_id: int, session: Session = Depends(get_session)):
     db_order = session.get(Order, order_id)
     if db_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
+    record_sales(session, [order_id], -1)
+    # Devolve ao stock as unidades ainda reservadas para o pedido
+    reservations = session.execute(take_reservations(StockReservation.orderId == order_id)).all()
+    for stmt, params in settle_statements(reservations, restock=True):
+        session.execute(stmt, params)
+    session.execute(delete(OrderLine).where(OrderLine.orderId == order_id))
     session.delete(db_order)
     session.commit()
     return {"message": "Order deleted successfully"}
 
 # Rota para obter todos os pedidos de um comprador específico
 @router.get("/see/orders/buyer/{buyer_id}")
-def get_orders_by_buyer(buyer_id: int, session: Session = Depends(get_session)):
-    orders = session.exec(select(Order).where(Order.buyerId == buyer_id)).all()
-    return orders
+def get_orders_by_buyer(buyer_id: int, response: Response, page: PageParams = Depends(), session: Session = Depends(get_session)):
+    query = keyset(select(Order).where(Order.buyerId == buyer_id), [Order.orderId], page)
+    if page.stream:
+        return stream_json(session.exec(query))
+    return finish_page(session.exec(query), page, response, key=lambda o: (o.orderId,))
 
 # Rota para atualizar um pedido de produto existente
 @router.put("/update/orders/{order_id}")
@@ -115,9 +170,75 @@ def update_order(order_id: int, order_update: OrderBase, session: Session = Depe
     db_order = session.get(Order, order_id)
     if db_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
-    for key, value in order_update.dict(exclude_unset=True).items():
+    changes = order_update.dict(exclude_unset=True)
+    # Um pedido com stock reservado só muda de estado pelo checkout, que liberta ou consome as reservas
+    if changes.get("transactStatus", db_order.transactStatus) != db_order.transactStatus and session.exec(
+        select(StockReservation.id).where(StockReservation.orderId == order_id).limit(1)
+    ).first() is not None:
+        raise HTTPException(status_code=409, detail=f"O pedido tem stock reservado: use /api/checkout/{order_id}/confirm "
+                                                    f"ou /api/checkout/{order_id}/cancel para mudar o estado.")
+    # Retira as vendas do pedido antes da alteração e volta a somá-las depois (produto, data ou estado podem mudar)
+    record_sales(session, [order_id], -1)
+    for key, value in changes.items():
         setattr(db_order, key, value)
     session.add(db_order)
+    session.flush()
+    record_sales(session, [order_id])
     session.commit()
     session.refresh(db_order)
-    return db_order
\ No newline at end of file
+    return db_order
+
+
+#################ProductReview###################
+
+async def _reviewed_product(db: AsyncSession, product_id: Optional[int]) -> Product:
+    product = await db.get(Product, product_id) if product_id is not None else None
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
+
+# Avaliação de um produto por um comprador; os agregados do produto são atualizados na mesma transação
+@router.post("/add/productReviews", status_code=201)
+async def create_product_review(review: ProductReviewBase, db: AsyncSession = Depends(get_async_session)):
+    product = await _reviewed_product(db, review.productId)
+    existing = (await db.exec(
+        select(ProductReview.productReviewId)
+        .where((ProductReview.productId == review.productId) & (ProductReview.customerId == review.customerId)
+               & (ProductReview.hasRating == True))  # noqa: E712
+        .limit(1)
+    )).first()
+    if existing is not None:
+        raise HTTPException(status_code=400, detail="O comprador já avaliou este produto anteriormente.")
+    db_review = ProductReview(**review.dict(), hasRating=True)
+    db.add(db_review)
+    await db.execute(product_summary_upsert(db, product.productId, product.categoryId, new_rating=db_review.rating))
+    await db.commit()
+    await db.refresh(db_review)
+    return db_review
+
+@router.put("/update/productReview/{id}")
+async def update_product_review(id: int, rating: int = Query(ge=1, le=5), customerReview: Optional[int] = None,
+                                db: AsyncSession = Depends(get_async_session)):
+    db_review = await db.get(ProductReview, id)
+    if db_review is None:
+        raise HTTPException(status_code=404, detail="Avaliação de produto não encontrada.")
+    product = await _reviewed_product(db, db_review.productId)
+    old_rating = db_review.rating
+    db_review.rating = rating
+    if customerReview is not None:
+        db_review.customerReview = customerReview
+    await db.execute(product_summary_upsert(db, product.productId, product.categoryId, old_rating, rating))
+    await db.commit()
+    await db.refresh(db_review)
+    return db_review
+
+@router.delete("/delete/productReview/{id}", status_code=204)
+async def delete_product_review(id: int, db: AsyncSession = Depends(get_async_session)):
+    db_review = await db.get(ProductReview, id)
+    if db_review is None:
+        raise HTTPException(status_code=404, detail="Avaliação de produto não encontrada.")
+    product = await db.get(Product, db_review.productId) if db_review.productId is not None else None
+    if product is not None:
+        await db.execute(product_summary_upsert(db, product.productId, product.categoryId, old_rating=db_review.rating))
+    await db.delete(db_review)
+    await db.commit()
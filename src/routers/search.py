@@ -0,0 +1,44 @@
+import time
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Query, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+from shared.security import get_async_session
+from shared.pagination import PageParams, finish_page, keyset, stream_json
+from ..utils.models import SearchDocument
+from ..utils.searchIndex import format_search_result, search_query
+from ..utils.suggestIndex import SUGGEST_MAX_LIMIT, suggest_index
+
+router = APIRouter(prefix='/api')
+
+
+# Pesquisa de produtos e vendedores por relevância (nome, descrição, empresa e categoria)
+@router.get('/search')
+async def search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[Literal["product", "seller"]] = None,
+    category_id: Optional[int] = None,
+    user_type: Optional[str] = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_session),
+):
+    query, score = search_query(db.get_bind().dialect.name, q, kind, category_id, user_type)
+    query = keyset(query, [score, SearchDocument.id], page, descending=True)
+    if page.stream:
+        return stream_json(await db.stream(query), format_search_result)
+    rows = finish_page((await db.execute(query)).all(), page, response, key=lambda row: (row.score, row[0].id))
+    return [format_search_result(row) for row in rows]
+
+
+# Sugestões enquanto se escreve (nomes de produtos, categorias e empresas), servidas da memória
+@router.get('/suggest')
+async def suggest(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=SUGGEST_MAX_LIMIT),
+    kind: Optional[Literal["product", "category", "seller"]] = None,
+):
+    start = time.perf_counter()
+    results = suggest_index.suggest(q, limit, kind)
+    response.headers["Server-Timing"] = f"suggest;dur={(time.perf_counter() - start) * 1000:.3f}"
+    return results
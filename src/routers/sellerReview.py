@@ -1,8 +1,12 @@
 from typing import Any, Dict, List, Optional
-from src.utils.models import Address, Category, SellerReview, User, Country
-from fastapi import APIRouter, Depends, HTTPException
-from shared.security import JWTBearer, get_session
-from sqlmodel import select, Session
+from src.utils.models import Address, Category, SellerCustomer, SellerReview, SellerSummary, User, Country
+from src.utils.ratingSummary import aadd_seller_customer, aremove_seller_customer, seller_summary_upsert
+from fastapi import APIRouter, Depends, HTTPException, Response
+from shared.security import JWTBearer, get_async_session
+from shared.pagination import NEXT_CURSOR_HEADER, PageParams, finish_page, keyset, stream_json
+from sqlmodel import delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import aliased
 from pydantic import BaseModel
 
 
@@ -95,156 +99,175 @@ def convert_to_seller_review(dto: SellerReviewBase) -> SellerReview:
 #     reviews = await get_seller_reviews(db, sellerId)
 #     return reviews
 
-async def get_seller_reviews(db: Session, sellerId: Optional[int] = None) -> List[Dict[str, Any]]:
-    sql_query = db.execute(select(SellerReview))
-    if sellerId:
-        sql_query = db.execute(
-            select(SellerReview)
-            .join(User, User.userId == SellerReview.sellerId)
-            .filter(SellerReview.sellerId == sellerId)
+# Aliases para juntar vendedor e comprador (e respetivas moradas) numa única consulta
+Seller = aliased(User, name="seller")
+Customer = aliased(User, name="customer")
+SellerAddress = aliased(Address, name="seller_address")
+CustomerAddress = aliased(Address, name="customer_address")
+SellerCountry = aliased(Country, name="seller_country")
+CustomerCountry = aliased(Country, name="customer_country")
+
+def _user_columns(alias, prefix: str) -> list:
+    return [
+        alias.userId.label(f"{prefix}Id"),
+        alias.userFirstName.label(f"{prefix}FirstName"),
+        alias.userLastName.label(f"{prefix}LastName"),
+        alias.userEmail.label(f"{prefix}Email"),
+        alias.userType.label(f"{prefix}Type"),
+        alias.userGender.label(f"{prefix}Gender"),
+        alias.userPhoneNumber.label(f"{prefix}PhoneNumber"),
+        alias.userImage.label(f"{prefix}Image"),
+        alias.companyName.label(f"{prefix}CompanyName"),
+        alias.dateOfBirth.label(f"{prefix}DataOfBirth"),
+        alias.adressId.label(f"{prefix}UserAdressId"),
+        alias.createdAt.label(f"{prefix}CreatedAt"),
+    ]
+
+def review_feed_query():
+    """Projeção de avaliações com vendedor, comprador, categoria, moradas e países.
+
+    Substitui as sete consultas por avaliação por um único SELECT com joins.
+    """
+    return (
+        select(
+            SellerReview.sellerReviewId,
+            SellerReview.customerReview,
+            SellerReview.hasRating,
+            SellerReview.rating,
+            *_user_columns(Seller, "seller"),
+            Category.categoryId.label("sellerCategoryId"),
+            Category.categoryName.label("sellerCategory"),
+            SellerAddress.adressId.label("sellerAdressId"),
+            SellerAddress.distrit.label("sellerDistrict"),
+            SellerCountry.countryName.label("sellerCountry"),
+            *_user_columns(Customer, "costumer"),
+            CustomerAddress.distrit.label("costumerDistrict"),
+            CustomerCountry.countryName.label("costumerCountry"),
         )
+        .join(Seller, Seller.userId == SellerReview.sellerId)
+        .join(Customer, Customer.userId == SellerReview.customerId)
+        .outerjoin(Category, Category.categoryId == Seller.categoryId)
+        .outerjoin(SellerAddress, SellerAddress.adressId == Seller.adressId)
+        .outerjoin(SellerCountry, SellerCountry.countryId == SellerAddress.countryId)
+        .outerjoin(CustomerAddress, CustomerAddress.adressId == Customer.adressId)
+        .outerjoin(CustomerCountry, CustomerCountry.countryId == CustomerAddress.countryId)
+        .order_by(SellerReview.sellerReviewId)
+    )
+
+def _format_seller_part(row) -> Dict[str, Any]:
+    return {
+        "sellerId": row.sellerId,
+        "sellerFirstName": row.sellerFirstName,
+        "sellerLastName": row.sellerLastName,
+        "sellerEmail": row.sellerEmail,
+        "sellerType": row.sellerType,
+        "sellerGender": row.sellerGender,
+        "sellerPhoneNumber": row.sellerPhoneNumber,
+        "sellerImage": row.sellerImage,
+        "sellerCompanyName": row.sellerCompanyName,
+        "sellerDataOfBirth": row.sellerDataOfBirth,
+        "sellerCategoryId": row.sellerCategoryId,
+        "sellerCategory": row.sellerCategory,
+        "sellerAdressId": row.sellerAdressId,
+        "sellerCountry": row.sellerCountry,
+        "sellerDistrict": row.sellerDistrict,
+        "sellerCreatedAt": row.sellerCreatedAt.isoformat(),
+    }
+
+def _format_customer_part(row) -> Dict[str, Any]:
+    return {
+        "costumerId": row.costumerId,
+        "costumerFirstName": row.costumerFirstName,
+        "costumerLastName": row.costumerLastName,
+        "costumerEmail": row.costumerEmail,
+        "costumerType": row.costumerType,
+        "costumerGender": row.costumerGender,
+        "costumerPhoneNumber": row.costumerPhoneNumber,
+        "costumerImage": row.costumerImage,
+        "costumerDataOfBirth": row.costumerDataOfBirth,
+        "costumerAdressId": row.costumerUserAdressId,
+        "costumerCountry": row.costumerCountry,
+        "costumerDistrict": row.costumerDistrict,
+        "costumerCreatedAt": row.costumerCreatedAt.isoformat(),
+    }
+
+def _format_review_head(row) -> Dict[str, Any]:
+    return {
+        "sellerReviewId": row.sellerReviewId,
+        "customerReview": row.customerReview,
+        "hasRating": row.hasRating,
+        "rating": row.rating,
+    }
+
+def format_seller_review(row) -> Dict[str, Any]:
+    return {
+        **_format_review_head(row),
+        "#################": "###################",
+        **_format_seller_part(row),
+        "*#######*#########*": "*#########*#########*",
+        **_format_customer_part(row),
+    }
+
+def format_customer_review(row) -> Dict[str, Any]:
+    return {
+        **_format_review_head(row),
+        "#################": "###################",
+        **_format_customer_part(row),
+        "*#######*#########*": "*#########*#########*",
+        **_format_seller_part(row),
+    }
+
+def _seller_reviews_query(sellerId: Optional[int] = None):
+    query = review_feed_query()
+    if sellerId:
+        query = query.where(SellerReview.sellerId == sellerId)
+    return query
 
-    seller_reviews = sql_query.scalars().all()
-    total_customers_reviewed = db.execute(
-        select(SellerReview.customerId)
-        .distinct()
-        .where(SellerReview.sellerId == sellerId)
-    ).scalars().all()
-    
-    # Calcular o total de clientes únicos
-    totalCustomers = len(total_customers_reviewed)
-
-    formatted_reviews = []
-
-    for review in seller_reviews:
-        seller_data = db.execute(select(User).where(User.userId == review.sellerId)).scalars().first()
-        customer_data = db.execute(select(User).where(User.userId == review.customerId)).scalars().first()
-        category_data = db.execute(select(Category).join(User, User.categoryId == Category.categoryId).where(Category.categoryId == seller_data.categoryId)).scalars().first()
-        seller_address = db.execute(select(Address).join(User).where(Address.adressId == seller_data.adressId)).scalars().first()
-        customer_address = db.execute(select(Address).join(User).where(Address.adressId == customer_data.adressId)).scalars().first()
-        my_data = db.execute(select(Country).join(Address).where(Address.countryId == customer_data.adressId)).scalars().first()
-        my_data2 = db.execute(select(Country).join(Address).where(Address.countryId == seller_data.adressId)).scalars().first()
-
-        formatted_review = {
-            "sellerReviewId": review.sellerReviewId,
-            "customerReview": review.customerReview,
-            "hasRating": review.hasRating,
-            "rating": review.rating,
-            "#################": "###################",
-            "sellerId": seller_data.userId,
-            "sellerFirstName": seller_data.userFirstName,
-            "sellerLastName": seller_data.userLastName,
-            "sellerEmail": seller_data.userEmail,
-            "sellerType": seller_data.userType,
-            "sellerGender": seller_data.userGender,
-            "sellerPhoneNumber": seller_data.userPhoneNumber,
-            "sellerImage": seller_data.userImage,
-            "sellerCompanyName": seller_data.companyName,
-            "sellerDataOfBirth": seller_data.dateOfBirth,
-            "sellerCategoryId": category_data.categoryId if category_data else None,
-            "sellerCategory": category_data.categoryName if category_data else None,
-            "sellerAdressId": seller_address.adressId if seller_address else None,
-            "sellerCountry": my_data2.countryName if my_data2 else None,
-            "sellerDistrict": seller_address.distrit if seller_address else None,
-            "sellerCreatedAt": seller_data.createdAt.isoformat(),
-            "*#######*#########*": "*#########*#########*",
-            "costumerId": customer_data.userId,
-            "costumerFirstName": customer_data.userFirstName,
-            "costumerLastName": customer_data.userLastName,
-            "costumerEmail": customer_data.userEmail,
-            "costumerType": customer_data.userType,
-            "costumerGender": customer_data.userGender,
-            "costumerPhoneNumber": customer_data.userPhoneNumber,
-            "costumerImage": customer_data.userImage,
-            "costumerDataOfBirth": customer_data.dateOfBirth,
-            "costumerAdressId": customer_data.adressId,
-            "costumerCountry": my_data.countryName if my_data else None,
-            "costumerDistrict": customer_address.distrit if customer_address else None,
-            "costumerCreatedAt": customer_data.createdAt.isoformat(),
-        }
-
-        formatted_reviews.append(formatted_review)
+def _customer_reviews_query(customerId: Optional[int] = None):
+    query = review_feed_query()
+    if customerId:
+        query = query.where(SellerReview.customerId == customerId)
+    return query
+
+async def _total_customers(db: AsyncSession, sellerId: Optional[int]) -> int:
+    # Total de clientes únicos, mantido em SellerSummary pelas escritas de avaliações
+    total = (await db.execute(
+        select(SellerSummary.totalCustomers).where(SellerSummary.sellerId == sellerId)
+    )).scalar_one_or_none()
+    return total or 0
+
+async def get_seller_reviews(db: AsyncSession, sellerId: Optional[int] = None) -> List[Dict[str, Any]]:
+    formatted_reviews = [format_seller_review(row) for row in await db.execute(_seller_reviews_query(sellerId))]
 
     # Adicionar o total de clientes apenas uma vez ao final da lista
     if formatted_reviews:
-        formatted_reviews.append({"totalCustomers": totalCustomers})
+        formatted_reviews.append({"totalCustomers": await _total_customers(db, sellerId)})
 
     return formatted_reviews
 
 @router.get("/see/sellerReviews")
-async def list_seller_reviews(sellerId: Optional[int] = None, db: Session = Depends(get_session)):
-    reviews = await get_seller_reviews(db, sellerId)
+async def list_seller_reviews(response: Response, sellerId: Optional[int] = None, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_session)):
+    query = keyset(_seller_reviews_query(sellerId), [SellerReview.sellerReviewId], page)
+    if page.stream:
+        total = {"totalCustomers": await _total_customers(db, sellerId)}
+        return stream_json(await db.stream(query), format_seller_review, trailer=[total])
+    rows = finish_page(await db.execute(query), page, response, key=lambda row: (row.sellerReviewId,))
+    reviews = [format_seller_review(row) for row in rows]
+    # O total de clientes fecha a lista, como em get_seller_reviews: só na última página
+    if reviews and NEXT_CURSOR_HEADER not in response.headers:
+        reviews.append({"totalCustomers": await _total_customers(db, sellerId)})
     return reviews
 
-async def get_customer_reviews(db: Session, customerId: Optional[int] = None):
-
-    sql_query = db.exec(select(SellerReview))
-    if customerId:
-        sql_query = db.exec(
-            select(SellerReview)
-            .join(User, User.userId == SellerReview.customerId)
-            .filter(SellerReview.customerId == customerId)
-        )
-
-    customer_reviews = sql_query.all()
-
-    formatted_reviews = []
-
-    for review in customer_reviews:
-        seller_data = db.exec(select(User).where(User.userId == review.sellerId)).first()
-        customer_data = db.exec(select(User).where(User.userId == review.customerId)).first()
-        category_data = db.exec(select(Category).join(User, User.categoryId == Category.categoryId).where(Category.categoryId == seller_data.categoryId)).first()
-        seller_address = db.exec(select(Address).join(User).where(Address.adressId == seller_data.adressId)).first()
-        customer_address = db.exec(select(Address).join(User).where(Address.adressId == customer_data.adressId)).first()
-        my_data = db.exec(select(Country).join(Address).where(Address.countryId == customer_data.adressId)).first()
-        my_data2 = db.exec(select(Country).join(Address).where(Address.countryId == seller_data.adressId)).first()
-
-
-        formatted_review = {
-            "sellerReviewId": review.sellerReviewId,
-            "customerReview": review.customerReview,
-            "hasRating": review.hasRating,
-            "rating": review.rating,
-            "#################":"###################",
-            "costumerId": customer_data.userId,
-            "costumerFirstName": customer_data.userFirstName,
-            "costumerLastName": customer_data.userLastName,
-            "costumerEmail": customer_data.userEmail,
-            "costumerType": customer_data.userType,
-            "costumerGender": customer_data.userGender,
-            "costumerPhoneNumber": customer_data.userPhoneNumber,
-            "costumerImage": customer_data.userImage,
-            "costumerDataOfBirth": customer_data.dateOfBirth,
-            "costumerAdressId": customer_data.adressId,
-            "costumerCountry":  my_data.countryName if my_data else None,
-            "costumerDistrict":  customer_address.distrit if customer_address else None,
-            "costumerCreatedAt": customer_data.createdAt.isoformat(),
-            "*#######*#########*":"*#########*#########*",
-            "sellerId": seller_data.userId,
-            "sellerFirstName": seller_data.userFirstName,
-            "sellerLastName": seller_data.userLastName,
-            "sellerEmail": seller_data.userEmail,
-            "sellerType": seller_data.userType,
-            "sellerGender": seller_data.userGender,
-            "sellerPhoneNumber": seller_data.userPhoneNumber,
-            "sellerImage": seller_data.userImage,
-            "sellerCompanyName": seller_data.companyName,
-            "sellerDataOfBirth": seller_data.dateOfBirth,
-            "sellerCategoryId": category_data.categoryId if category_data else None,
-            "sellerCategory": category_data.categoryName if category_data else None,
-            "sellerAdressId": seller_address.adressId if seller_address else None,
-            "sellerCountry": my_data2.countryName if my_data2 else None,
-            "sellerDistrict": customer_address.distrit if customer_address else None,
-            "sellerCreatedAt": seller_data.createdAt.isoformat(),
-        }
-        formatted_reviews.append(formatted_review)
-
-    return formatted_reviews
+async def get_customer_reviews(db: AsyncSession, customerId: Optional[int] = None) -> List[Dict[str, Any]]:
+    return [format_customer_review(row) for row in await db.execute(_customer_reviews_query(customerId))]
 
 @router.get("/see/customerReviews")
-async def list_buyer_reviews(customerId: Optional[int] = None, db: Session = Depends(get_session)):
-    reviews = await get_customer_reviews(db, customerId)
-    return reviews
+async def list_buyer_reviews(response: Response, customerId: Optional[int] = None, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_session)):
+    query = keyset(_customer_reviews_query(customerId), [SellerReview.sellerReviewId], page)
+    if page.stream:
+        return stream_json(await db.stream(query), format_customer_review)
+    rows = finish_page(await db.execute(query), page, response, key=lambda row: (row.sellerReviewId,))
+    return [format_customer_review(row) for row in rows]
 
 # @router.post('/add/sellerReviews', status_code=201)
 # async def create_feedback(dto: SellerReviewBase, db=Depends(get_session)):
@@ -263,13 +286,29 @@ async def list_buyer_reviews(customerId: Optional[int] = None, db: Session = Dep
 
 #     return {'Resultado': 'Avaliação atribuída.'}
 
+async def remove_customer_reviews_from_summaries(db: AsyncSession, customerId: int):
+    """Desconta dos resumos as avaliações de um comprador que vai ser apagado (cascade na BD)."""
+    reviews = (await db.execute(
+        select(SellerReview.sellerId, SellerReview.rating)
+        .where((SellerReview.customerId == customerId) & SellerReview.sellerId.is_not(None))
+    )).all()
+    seen_sellers = set()
+    for sellerId, rating in reviews:
+        await db.execute(seller_summary_upsert(
+            db, sellerId, reviews=-1,
+            customers=0 if sellerId in seen_sellers else -1,
+            old_rating=rating,
+        ))
+        seen_sellers.add(sellerId)
+    await db.execute(delete(SellerCustomer).where(SellerCustomer.customerId == customerId))
+
 @router.post('/add/sellerReviews', status_code=201)
-async def create_feedback(dto: SellerReviewBase, db: Session = Depends(get_session)):
-    existing_feedback = db.execute(
+async def create_feedback(dto: SellerReviewBase, db: AsyncSession = Depends(get_async_session)):
+    existing_feedback = (await db.exec(
         select(SellerReview).where(
             (SellerReview.sellerId == dto.sellerId) & (SellerReview.customerId == dto.customerId)
         )
-    ).scalars().first()
+    )).first()
 
     if existing_feedback and existing_feedback.hasRating:
         raise HTTPException(status_code=400, detail="O comprador já avaliou este vendedor anteriormente.")
@@ -277,29 +316,45 @@ async def create_feedback(dto: SellerReviewBase, db: Session = Depends(get_sessi
         dto.hasRating = True
         new_review = convert_to_seller_review(dto)
         db.add(new_review)
-        db.commit()
-        db.refresh(new_review)
+        if new_review.sellerId is not None:
+            # O delta de totalCustomers vem do upsert do par, atómico mesmo com avaliações concorrentes
+            await db.execute(seller_summary_upsert(
+                db, new_review.sellerId, reviews=1,
+                customers=await aadd_seller_customer(db, new_review.sellerId, new_review.customerId),
+                new_rating=new_review.rating,
+            ))
+        await db.commit()
+        await db.refresh(new_review)
 
     return {'Resultado': 'Avaliação atribuída.'}
 
 @router.put('/update/sellerReview/{id}', status_code=200)
-async def update_feedback(id: int, customerReview: str, rating: int, db: Session = Depends(get_session)):
-    existing_feedback = db.get(SellerReview, id)
+async def update_feedback(id: int, customerReview: str, rating: int, db: AsyncSession = Depends(get_async_session)):
+    existing_feedback = await db.get(SellerReview, id)
     if existing_feedback:
+        old_rating = existing_feedback.rating
         existing_feedback.customerReview = customerReview
         existing_feedback.rating = rating
-        db.commit()
-        db.refresh(existing_feedback)
+        if existing_feedback.sellerId is not None:
+            await db.execute(seller_summary_upsert(db, existing_feedback.sellerId, old_rating=old_rating, new_rating=rating))
+        await db.commit()
+        await db.refresh(existing_feedback)
         return {"message": "Avaliação de vendedor atualizada com sucesso."}
     else:
         raise HTTPException(status_code=404, detail="Avaliação de vendedor não encontrada.")
 
 @router.delete('/delete/sellerReview/{id}', status_code=204)
-async def delete_feedback(id: int, db: Session = Depends(get_session)):
-    feedback = db.get(SellerReview, id)
+async def delete_feedback(id: int, db: AsyncSession = Depends(get_async_session)):
+    feedback = await db.get(SellerReview, id)
     if feedback:
-        db.delete(feedback)
-        db.commit()
+        if feedback.sellerId is not None:
+            await db.execute(seller_summary_upsert(
+                db, feedback.sellerId, reviews=-1,
+                customers=await aremove_seller_customer(db, feedback.sellerId, feedback.customerId),
+                old_rating=feedback.rating,
+            ))
+        await db.delete(feedback)
+        await db.commit()
     else:
         raise HTTPException(status_code=404, detail="Avaliação de vendedor não encontrada.")
 
@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from shared.security import get_async_session
+from ..utils.transfer import EXPORTS, FORMATS, encode_rows, export_query, import_products, read_records
+
+router = APIRouter(prefix='/api')
+
+
+# Exporta a tabela inteira (ou as linhas criadas desde `since`) em NDJSON ou CSV, sem a carregar em memória
+@router.get('/export/{entity}')
+async def export_entity(
+    entity: Literal["products", "orders", "sellerReviews"],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    since: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_session),
+):
+    model = EXPORTS[entity]
+    columns = [column.name for column in model.__table__.columns]
+    rows = await db.stream(export_query(model, since))
+    return StreamingResponse(
+        encode_rows(rows, columns, format),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{entity}.{format}"'},
+    )
+
+
+# Importa produtos de um corpo NDJSON ou CSV lido à medida que chega; devolve os totais e os erros por linha
+@router.post('/import/products')
+async def import_products_route(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await import_products(db, read_records(request.stream(), format))
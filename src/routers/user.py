@@ -1,13 +1,21 @@
 import os
 import re
-import jwt
 from typing import Optional
 from pathlib import Path
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, Form
-from shared.security import JWTBearer, ALGORITHM, JWT_SECRET_KEY, get_session, get_hash_password
-from sqlmodel import Session, select
-from ..utils.models import Address, Category, User, UserBase, Country
-from .sellerReview import get_seller_reviews
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, Form, Response
+from shared.security import JWTBearer, Principal, get_async_session, password_hasher
+from shared.pagination import PageParams, finish_page, keyset, stream_json
+from shared.uploads import store_upload
+from shared.cache import cached, response_cache
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..utils.models import Address, Category, User, UserBase, Country, SellerSummary
+from ..utils.ratingSummary import aremove_customer_product_ratings, format_seller_summary
+from ..utils.searchIndex import aindex_seller, aunindex_seller
+from ..utils.suggestIndex import suggest_index
+from ..utils.likes import aremove_user_likes, like_counter
+from .sellerReview import get_seller_reviews, remove_customer_reviews_from_summaries
+from .image import image_url
 
 router = APIRouter(prefix='/api')
 
@@ -16,15 +24,9 @@ EMAIL_REGEX = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
 ALLOWED_USER_TYPES = {"Buyer", "Seller", "Admin"}
 
 
-# Função para salvar a imagem em uma pasta
-def save_image(file: UploadFile, folder_name: str, user_id: int) -> str:
-    if not os.path.exists(folder_name):
-        os.makedirs(folder_name)
-    filename = f"{user_id}_{file.filename}"
-    file_path = os.path.join(folder_name, filename) # type: ignore
-    with open(file_path, "wb") as buffer:
-        buffer.write(file.file.read())
-    return file_path
+# Função para salvar a imagem em uma pasta (endereçada pelo conteúdo, ver shared/uploads.py)
+async def save_image(file: UploadFile, folder_name: str) -> str:
+    return await store_upload(file, folder_name)
 
 # Função para verificar se o tipo de arquivo é válido
 def is_valid_file_type(filename: str):
@@ -33,62 +35,69 @@ def is_valid_file_type(filename: str):
     return ext.lower() in valid_extensions
 
 @router.get('/see/users')
-async def list_users(user_id: Optional[int] = None, db: Session = Depends(get_session)):
+async def list_users(
+    response: Response,
+    user_id: Optional[int] = None,
+    include_reviews: bool = False,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_session),
+):
 
-    query = None
+    # Utilizador, categoria, morada, país e resumo de avaliações numa única consulta
+    query = (
+        select(User, Category.categoryName, Address.distrit, Country.countryName, SellerSummary)
+        .outerjoin(Category, Category.categoryId == User.categoryId)
+        .outerjoin(Address, Address.adressId == User.adressId)
+        .outerjoin(Country, Country.countryId == Address.countryId)
+        .outerjoin(SellerSummary, SellerSummary.sellerId == User.userId)
+    )
     if user_id:
-        query = select(User).where(User.userId == user_id)
-        # If querying by user_id, build a query to fetch a single user
-        user = db.exec(query).first()
-        # Execute the query and fetch the first result
-        users = [user] if user else []
-        # Convert the result to a list to iterate over later
-    else:
-        query = select(User)
-        # If not querying by user_id, build a query to fetch all users
-        users = db.exec(query).all()
-        # Execute the query and fetch all results
+        query = query.where(User.userId == user_id)
+    query = keyset(query, [User.userId], page)
+
+    if page.stream:
+        if include_reviews:
+            raise HTTPException(status_code=400, detail="include_reviews não pode ser usado com stream.")
+        return stream_json(await db.stream(query), _format_user)
 
     users_data = []
 
-    for user in users:
-        category_data = None
-        if user.categoryId:
-            category_data = db.exec(select(Category).where(Category.categoryId == user.categoryId)).first()
-
-        address_data = None
-        if user.adressId:
-            address_data = db.exec(select(Address).where(Address.adressId == user.adressId)).first()
-            my_data = db.exec(select(Country).join(Address).where(Address.adressId == address_data.adressId)).first()
-
-        formatted_user = {
-            "userId": user.userId,
-            "userFirstName": user.userFirstName,
-            "userLastName": user.userLastName,
-            "userEmail": user.userEmail,
-            "userType": user.userType,
-            "userGender": user.userGender,
-            "userPhoneNumber": user.userPhoneNumber,
-            "userImage": user.userImage,
-            "companyName": user.companyName,
-            "dateOfBirth": user.dateOfBirth,
-            "description": user.description,
-            "categoryId": user.categoryId,
-            "category": category_data.categoryName if category_data else "",
-            "addressId": user.adressId,
-            "country": my_data.countryName if my_data else "",
-            "district": address_data.distrit if address_data else "",
-            "createdAt": user.createdAt.isoformat() if user.createdAt else "",
-            "reviewsReceived": await get_seller_reviews(db, user.userId)
-        }
+    for row in finish_page(await db.exec(query), page, response, key=lambda row: (row[0].userId,)):
+        formatted_user = _format_user(row)
+        # As avaliações completas só são devolvidas quando pedidas explicitamente
+        if include_reviews:
+            formatted_user["reviewsReceived"] = await get_seller_reviews(db, formatted_user["userId"])
         users_data.append(formatted_user)
     
     return users_data
 
+def _format_user(row):
+    user, category_name, district, country_name, summary = row
+    return {
+        "userId": user.userId,
+        "userFirstName": user.userFirstName,
+        "userLastName": user.userLastName,
+        "userEmail": user.userEmail,
+        "userType": user.userType,
+        "userGender": user.userGender,
+        "userPhoneNumber": user.userPhoneNumber,
+        "userImage": user.userImage,
+        "companyName": user.companyName,
+        "dateOfBirth": user.dateOfBirth,
+        "description": user.description,
+        "categoryId": user.categoryId,
+        "category": category_name or "",
+        "addressId": user.adressId,
+        "country": country_name or "",
+        "district": district or "",
+        "createdAt": user.createdAt.isoformat() if user.createdAt else "",
+        "reviewSummary": format_seller_summary(summary),
+    }
+
 
 
 @router.post('/add/user', status_code=201)
-async def add_user(dto: UserBase,  db: Session = Depends(get_session)):
+async def add_user(dto: UserBase,  db: AsyncSession = Depends(get_async_session)):
 
     if not dto.userEmail or not EMAIL_REGEX.match(dto.userEmail):
         raise HTTPException(status_code=400, detail='O email fornecido não é válido.')
@@ -96,16 +105,21 @@ async def add_user(dto: UserBase,  db: Session = Depends(get_session)):
     if dto.userType not in ALLOWED_USER_TYPES:
         raise HTTPException(status_code=400, detail='O tipo de utilizador fornecido não é válido.')
 
-    email_exists = db.exec(select(User).where(User.userEmail == dto.userEmail)).first()
+    email_exists = (await db.exec(select(User).where(User.userEmail == dto.userEmail))).first()
     if email_exists:
         raise HTTPException(status_code=400, detail='O email já está registrado.')
-    hashed_password = get_hash_password(dto.password)
+    if not dto.password:
+        raise HTTPException(status_code=400, detail='A senha é obrigatória.')
     user_data = dto.dict()
-    user_data['password'] = hashed_password
+    user_data['password'] = await password_hasher.hash(dto.password)
     user = User(**user_data)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.flush()
+    await aindex_seller(db, user.userId)
+    await db.commit()
+    await response_cache.ainvalidate("user")
+    await db.refresh(user)
+    suggest_index.put("seller", user.userId, user.companyName)
     return {'Resultado': 'Utilizador adicionado.'}
 
 
@@ -113,9 +127,9 @@ async def add_user(dto: UserBase,  db: Session = Depends(get_session)):
 async def update_user(
     id: int,
     userImage: UploadFile = File(None),
-    db=Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
-    user1 = db.get(User, id)
+    user1 = await db.get(User, id)
 
     if not user1:
         raise HTTPException(status_code=404, detail="Utilizador não encontrado.")
@@ -126,17 +140,13 @@ async def update_user(
             raise HTTPException(status_code=400, detail="Tipo de arquivo inválido. Apenas arquivos de imagem são permitidos.")
         
         if user1.userType.lower():
-            file_path = save_image(userImage, f"{user1.userType.lower()}_images", id)
-
-        image_path = os.path.join(f'{current_directory}/', file_path)
-     
-        if not os.path.exists(image_path):
-            raise HTTPException(status_code=404, detail="Imagem não encontrada.")
+            file_path = await save_image(userImage, f"{user1.userType.lower()}_images")
 
-        user1.userImage = f"http://localhost:5000/{file_path}"
+        user1.userImage = image_url(file_path)
 
-    db.commit()
-    db.refresh(user1)
+    await db.commit()
+    await response_cache.ainvalidate("user")
+    await db.refresh(user1)
     return user1
 
 @router.put('/update/user/{id}', status_code=200)
@@ -154,9 +164,9 @@ async def update_user(
     # adressId: Optional[int] = Form(None),
     # categoryId: Optional[int] = Form(None),
     dto: UserBase,
-    db=Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
-    user1 = db.get(User, id)
+    user1 = await db.get(User, id)
     dto_dict = {
         "userFirstName": dto.userFirstName,
         "userLastName": dto.userLastName,
@@ -178,47 +188,56 @@ async def update_user(
     for key, value in dto_dict_filtered.items():
         setattr(user1, key, value)  # Atualiza os atributos do usuário com os valores fornecidos
     
-    db.commit()
-    db.refresh(user1)
+    await aindex_seller(db, id)
+    await db.commit()
+    await response_cache.ainvalidate("user")
+    await db.refresh(user1)
+    suggest_index.put("seller", id, user1.companyName)
     return user1
 
 
 @router.delete('/delete/user/{id}', status_code=204)
-async def delete_user(id: int,  db: Session = Depends(get_session)):
-    user = db.get(User, id)
+async def delete_user(id: int,  db: AsyncSession = Depends(get_async_session)):
+    user = await db.get(User, id)
     if not user:
         raise HTTPException(status_code=404, detail="Categoria não encontrada")
-    db.delete(user)
-    db.commit()
+    await remove_customer_reviews_from_summaries(db, id)
+    await aremove_customer_product_ratings(db, id)
+    likes = await aremove_user_likes(db, id)
+    await aunindex_seller(db, id)
+    await db.delete(user)
+    await db.commit()
+    # Só depois do commit: se a remoção falhar, os contadores não mudam
+    for kind, target_id in likes:
+        like_counter.add(kind, target_id, -1)
+    await response_cache.ainvalidate("user")
+    suggest_index.remove("seller", id)
     return None
 
 @router.get("/users/me")
-async def get_user_info(current_user_id: int = Depends(JWTBearer()),  db: Session = Depends(get_session)):
-    try:
-        payload = jwt.decode(current_user_id, JWT_SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        user = db.exec(select(User).where(User.userId == user_id)).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="Utilizado inexistente")
-    except jwt.PyJWKError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+async def get_user_info(principal: Principal = Depends(JWTBearer()),  db: AsyncSession = Depends(get_async_session)):
+    # O token já foi verificado pelo JWTBearer; procura pela chave primária
+    user = await db.get(User, principal.userId)
+    if not user:
+        raise HTTPException(status_code=404, detail="Utilizado inexistente")
     return user
 
 
 
 @router.get("/see/sellers_by_category/{category_name}")
-async def get_sellers_by_category(category_name: str, db = Depends(get_session)):
+@cached("user", "category")
+async def get_sellers_by_category(category_name: str, db: AsyncSession = Depends(get_async_session)):
     # Realiza um join entre as tabelas User e Category usando SQLModel
     query = select(User, Category).join(Category).where(Category.categoryName == category_name)
     
     # Executa a consulta e retorna o primeiro resultado
-    user_category = db.exec(query).first()
+    user_category = (await db.exec(query)).first()
     
     # Verifica se a categoria foi encontrada
     if not user_category:
         raise HTTPException(status_code=404, detail="Category not found")
     
     # Retorna os usuários que pertencem à categoria especificada
-    users_in_category = db.exec(select(User).where(User.categoryId == user_category.Category.categoryId)).all()
+    users_in_category = (await db.exec(select(User).where(User.categoryId == user_category.Category.categoryId))).all()
     
     return users_in_category
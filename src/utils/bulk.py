@@ -0,0 +1,141 @@
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import SQLModel
+from .upsert import dialect_insert
+
+# Linhas por instrução INSERT (e por transação); limita a memória e a duração dos locks
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', '500'))
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', '10000'))
+
+
+def _validation_detail(error: ValidationError) -> List[Dict[str, Any]]:
+    return [{"loc": list(e["loc"]), "msg": e["msg"]} for e in error.errors()]
+
+
+def _db_error_detail(error: DBAPIError) -> str:
+    return str(error.orig).splitlines()[0] if error.orig is not None else str(error)
+
+
+async def bulk_upsert(db, model: Type[SQLModel], schema: Type[SQLModel], items: List[Any], key: Optional[str] = None,
+                      on_chunk: Optional[Callable[[Any, List[int]], Awaitable[None]]] = None,
+                      before_write: Optional[Callable[[Any, List[Any]], Awaitable[None]]] = None,
+                      locked: Optional[Callable[[Any, List[Any]], Awaitable[Dict[Any, str]]]] = None,
+                      create: bool = True, chunk_size: int = BULK_CHUNK_SIZE) -> Dict[str, Any]:
+    """Valida `items` com `schema` e grava-os com um INSERT de várias linhas por bloco.
+
+    Itens com `key` (por omissão a chave primária) fazem upsert (`ON CONFLICT (key) DO
+    UPDATE` dos campos do schema); os restantes são inseridos. Um id só atualiza a linha
+    existente: criar linhas com id explícito passaria à frente da sequência da tabela,
+    pelo que ids inexistentes são indicados como `error`. Cada bloco de
+    `chunk_size` itens é uma transação; se a instrução do bloco falhar (chave
+    estrangeira inexistente, ...), o bloco é repetido item a item em savepoints para
+    indicar quais falharam. `on_chunk(db, ids)` corre dentro da transação de cada
+    bloco; `before_write(db, keys)` corre no mesmo savepoint que a escrita, antes dela,
+    com as chaves das linhas existentes que vão ser atualizadas. `locked(db, keys)`
+    devolve, para as linhas existentes que não podem ser escritas, o motivo do erro.
+    Com `create=False` os itens sem `key` são inválidos. Devolve os totais e o
+    resultado de cada item, pela ordem do pedido.
+    """
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {BULK_MAX_ITEMS} itens por pedido.")
+    table = model.__table__
+    primary_key = table.primary_key.columns[0].name
+    key = key or primary_key
+    update_columns = [name for name in schema.model_fields if name not in (key, primary_key)]
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+
+    # Agrupa por conjunto de colunas: cada INSERT de várias linhas precisa das mesmas colunas
+    groups: Dict[tuple, list] = {}
+    for index, raw in enumerate(items):
+        try:
+            item = schema.model_validate(raw)
+        except ValidationError as e:
+            results[index] = {"index": index, "status": "invalid", "detail": _validation_detail(e)}
+            continue
+        # O modelo de tabela aplica os valores por omissão (createdAt, disabled, ...)
+        row = model(**item.model_dump())
+        values = {column.name: getattr(row, column.name) for column in table.columns}
+        if values[primary_key] is None:
+            del values[primary_key]
+        if not create and values.get(key) is None:
+            results[index] = {"index": index, "status": "invalid",
+                              "detail": [{"loc": [key], "msg": "Só é possível atualizar linhas existentes."}]}
+            continue
+        groups.setdefault(tuple(values), []).append((index, values))
+
+    for columns, rows in groups.items():
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            await _write_chunk(db, table, primary_key, key if key in columns else None, update_columns,
+                               chunk, results, on_chunk, before_write, locked)
+
+    statuses = [result["status"] for result in results]
+    return {
+        "created": statuses.count("created"),
+        "updated": statuses.count("updated"),
+        "failed": len(statuses) - statuses.count("created") - statuses.count("updated"),
+        "results": results,
+    }
+
+
+async def _write_chunk(db, table, primary_key: str, key: Optional[str], update_columns: List[str],
+                       chunk: list, results: list, on_chunk, before_write=None, locked=None):
+    stmt = dialect_insert(db, table)
+    existing = set()
+    if key is not None:
+        keys = [values[key] for _, values in chunk]
+        existing = set((await db.execute(select(table.c[key]).where(table.c[key].in_(keys)))).scalars())
+        if key == primary_key:
+            for index, values in chunk:
+                if values[key] not in existing:
+                    results[index] = {"index": index, "status": "error",
+                                      "detail": f"Não existe {key}={values[key]}; o id só atualiza linhas existentes."}
+            chunk = [(index, values) for index, values in chunk if values[key] in existing]
+        if locked is not None and existing:
+            reasons = await locked(db, list(existing))
+            for index, values in chunk:
+                if values[key] in reasons:
+                    results[index] = {"index": index, "status": "error", "detail": reasons[values[key]]}
+            chunk = [(index, values) for index, values in chunk if values[key] not in reasons]
+        if not chunk:
+            return
+        set_ = {name: stmt.excluded[name] for name in update_columns if name in table.c}
+        stmt = stmt.on_conflict_do_update(index_elements=[key], set_=set_ or {key: stmt.excluded[key]})
+        # Os ids são associados aos itens pela chave, pelo que a ordem do RETURNING não importa
+        stmt = stmt.returning(table.c[key], table.c[primary_key])
+    else:
+        # Sem chave, o SQLAlchemy garante a ordem do RETURNING (no SQLite insere linha a linha)
+        stmt = stmt.returning(table.c[primary_key], sort_by_parameter_order=True)
+
+    async def execute(rows) -> List[int]:
+        async with db.begin_nested():
+            replaced = [values[key] for _, values in rows if key is not None and values[key] in existing]
+            if replaced and before_write is not None:
+                await before_write(db, replaced)
+            result = (await db.execute(stmt, [values for _, values in rows])).all()
+        if key is None:
+            return [row[0] for row in result]
+        ids = {row_key: row_id for row_key, row_id in result}
+        return [ids[values[key]] for _, values in rows]
+
+    written = []
+    try:
+        written = list(zip(chunk, await execute(chunk)))
+    except DBAPIError:
+        # Repete item a item para saber quais falharam; os restantes são gravados
+        for item in chunk:
+            try:
+                written.append((item, (await execute([item]))[0]))
+            except DBAPIError as e:
+                results[item[0]] = {"index": item[0], "status": "error", "detail": _db_error_detail(e)}
+
+    for (index, values), row_id in written:
+        status = "updated" if key is not None and values[key] in existing else "created"
+        results[index] = {"index": index, "status": status, "id": row_id}
+    if written and on_chunk is not None:
+        await on_chunk(db, [row_id for _, row_id in written])
+    await db.commit()
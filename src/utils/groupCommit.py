@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from shared.database import async_engine
+from .models import Order, Post
+from .sales import arecord_sales
+
+logger = logging.getLogger(__name__)
+
+# Opcional: com o modo ativo, /api/add/orders e /api/add/posts/ partilham transações
+GROUP_COMMIT_ENABLED = os.getenv('GROUP_COMMIT_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+# Uma transação junta os pedidos que chegam durante GROUP_COMMIT_DELAY_MS, até GROUP_COMMIT_MAX_ROWS linhas
+GROUP_COMMIT_DELAY_MS = float(os.getenv('GROUP_COMMIT_DELAY_MS', '2'))
+GROUP_COMMIT_MAX_ROWS = int(os.getenv('GROUP_COMMIT_MAX_ROWS', '200'))
+
+
+class GroupCommitQueue:
+    """Junta as inserções concorrentes de um modelo numa só transação (group commit).
+
+    `add` põe a linha na fila e espera pelo resultado. Uma tarefa grava a fila num
+    executemany com `RETURNING` quando chegam `max_rows` linhas ou passam `delay`
+    segundos desde a primeira, e faz um único commit (um fsync) para todas. Se o lote
+    falhar, é repetido linha a linha em savepoints: cada chamador recebe o seu id ou a
+    sua exceção. Enquanto um lote é gravado, os pedidos seguintes formam o próximo.
+    `on_batch(db, ids)` corre na transação do lote, antes do commit.
+    """
+
+    def __init__(self, model, engine=async_engine, delay: float = GROUP_COMMIT_DELAY_MS / 1000,
+                 max_rows: int = GROUP_COMMIT_MAX_ROWS,
+                 on_batch: Optional[Callable[[Any, List[int]], Awaitable[None]]] = None):
+        self.model = model
+        self.on_batch = on_batch
+        self.engine = engine
+        self.delay = delay
+        self.max_rows = max_rows
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._arrived: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.batches = 0
+        self.rows = 0
+        self.failed = 0
+
+    def start(self):
+        self._arrived, self._full = asyncio.Event(), asyncio.Event()
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Grava o que ainda está na fila e termina a tarefa (sem interromper um lote a meio)."""
+        if self._task:
+            self._closing = True
+            self._arrived.set()
+            self._full.set()
+            await self._task
+            self._task = None
+
+    async def add(self, row: SQLModel) -> SQLModel:
+        """Grava `row` (instância do modelo) e preenche a chave primária; com a fila parada grava de imediato."""
+        table = self.model.__table__
+        primary_key = table.primary_key.columns[0].name
+        values = {column.name: getattr(row, column.name) for column in table.columns}
+        if values[primary_key] is None:
+            del values[primary_key]
+        future = asyncio.get_running_loop().create_future()
+        if self._task is None:
+            await self._write([(values, future)])
+        else:
+            self._pending.append((values, future))
+            self._arrived.set()
+            if len(self._pending) >= self.max_rows:
+                self._full.set()
+        setattr(row, primary_key, await future)
+        return row
+
+    async def _run(self):
+        while True:
+            await self._arrived.wait()
+            if self._closing and not self._pending:
+                return
+            if len(self._pending) < self.max_rows and not self._closing:
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.delay)
+                except asyncio.TimeoutError:
+                    pass
+            batch, self._pending = self._pending[:self.max_rows], self._pending[self.max_rows:]
+            if not self._pending:
+                self._arrived.clear()
+            await self._write(batch)
+
+    async def _write(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        table = self.model.__table__
+        stmt = insert(table).returning(table.primary_key.columns[0], sort_by_parameter_order=True)
+        # Um executemany por conjunto de colunas (linhas com e sem chave primária explícita)
+        groups: Dict[tuple, List[int]] = {}
+        for index, (values, _) in enumerate(batch):
+            groups.setdefault(tuple(values), []).append(index)
+        results: List[Any] = [None] * len(batch)
+        try:
+            async with AsyncSession(self.engine) as db:
+                for indexes in groups.values():
+                    try:
+                        async with db.begin_nested():
+                            ids = (await db.execute(stmt, [batch[i][0] for i in indexes])).scalars().all()
+                        for index, row_id in zip(indexes, ids):
+                            results[index] = row_id
+                    except DBAPIError:
+                        # Repete linha a linha para devolver o erro só a quem o causou
+                        for index in indexes:
+                            try:
+                                async with db.begin_nested():
+                                    results[index] = (await db.execute(stmt, [batch[index][0]])).scalar_one()
+                            except DBAPIError as e:
+                                results[index] = e
+                written = [result for result in results if not isinstance(result, BaseException)]
+                if written and self.on_batch is not None:
+                    await self.on_batch(db, written)
+                await db.commit()
+        except Exception as e:
+            # Falhou o commit (ou a ligação): nenhuma linha do lote ficou gravada
+            logger.error(f"Erro no group commit de {self.model.__tablename__}: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                self.failed += 1
+                future.set_exception(result)
+            else:
+                self.rows += 1
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "rows": self.rows,
+            "failed": self.failed,
+            "rowsPerBatch": round(self.rows / self.batches, 1) if self.batches else 0,
+        }
+
+
+order_queue = GroupCommitQueue(Order, on_batch=arecord_sales)
+post_queue = GroupCommitQueue(Post)
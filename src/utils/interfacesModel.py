@@ -1,7 +1,6 @@
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel, Field, validator
-from shared.security import get_hash_password
+from pydantic import BaseModel, Field
 
 
 class Token(BaseModel):
@@ -26,10 +25,6 @@ class UserBase(BaseModel):
     adressId: Optional[int] = None
     categoryId: Optional[int] = None
 
-    @validator('password', pre=True)
-    def hash_the_password(cls, v):
-        return get_hash_password(v)
-    
 class UserWithoutPass(BaseModel):
     userFirstName: Optional[str] = None
     userLastName: Optional[str] = None
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import bindparam, delete, exists, insert, literal, or_, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from shared.database import async_engine
+from .models import Comment, CommentLike, CommentReply, LikeDelta, User
+from .upsert import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+# Atraso máximo (em segundos) entre um like e o totalLikes na base de dados
+LIKES_FLUSH_SECONDS = float(os.getenv('LIKES_FLUSH_SECONDS', '1'))
+# Número de alvos com likes pendentes que força uma escrita antes do intervalo
+LIKES_MAX_PENDING = int(os.getenv('LIKES_MAX_PENDING', '5000'))
+# Variações de likedelta mais antigas do que isto são de um worker que parou e são aplicadas por outro
+LIKES_ORPHAN_SECONDS = float(os.getenv('LIKES_ORPHAN_SECONDS', '60'))
+
+# tipo -> (modelo com totalLikes, chave primária, coluna em CommentLike)
+TARGETS = {
+    "comment": (Comment, Comment.commentId, CommentLike.commentId),
+    "reply": (CommentReply, CommentReply.commentReplyId, CommentLike.commentReplyId),
+}
+NOT_FOUND = {"comment": "Comentário não encontrado.", "reply": "Resposta do comentário não encontrada."}
+
+
+class LikeCounter:
+    """Acumula em memória as variações de totalLikes e escreve-as em lote.
+
+    Cada like conta como +1/-1 num dicionário; a cada LIKES_FLUSH_SECONDS (ou quando
+    há LIKES_MAX_PENDING alvos pendentes) é feito um único executemany de
+    `UPDATE ... SET totalLikes = totalLikes + :delta`. Um comentário muito popular
+    recebe assim uma escrita por intervalo, em vez de uma transação por like a
+    disputar o lock da linha. Os likes em si ficam em CommentLike no momento do
+    pedido; só o contador é adiado.
+
+    Cada variação é também gravada em LikeDelta na transação do like (`arecord`), e
+    é daí que o flush as lê e apaga (DELETE ... RETURNING), pelo que uma paragem do
+    processo não as perde: as variações de um worker que parou são aplicadas por
+    outro passado LIKES_ORPHAN_SECONDS. O dicionário em memória serve as leituras
+    deste processo (`pending`).
+    """
+
+    def __init__(self, engine=async_engine, interval: float = LIKES_FLUSH_SECONDS,
+                 max_pending: int = LIKES_MAX_PENDING, orphan_after: float = LIKES_ORPHAN_SECONDS):
+        self.engine = engine
+        self.interval = interval
+        self.max_pending = max_pending
+        self.orphan_after = orphan_after
+        self.worker = uuid.uuid4().hex
+        self._swept_at = float("-inf")
+        self._pending: Dict[Tuple[str, int], int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.flushes = 0
+        self.rows_updated = 0
+
+    def add(self, kind: str, target_id: int, delta: int):
+        key = (kind, target_id)
+        total = self._pending.get(key, 0) + delta
+        if total:
+            self._pending[key] = total
+        else:
+            self._pending.pop(key, None)
+        if len(self._pending) >= self.max_pending and self._wakeup is not None:
+            self._wakeup.set()
+
+    def pending(self, kind: str, target_id: int) -> int:
+        """Likes ainda não escritos, para somar ao totalLikes lido da base de dados."""
+        return self._pending.get((kind, target_id), 0)
+
+    async def arecord(self, db, deltas: List[Tuple[str, int, int]]):
+        """Grava as variações (tipo, alvo, delta) na transação de `db`; `add` só depois do commit."""
+        if deltas:
+            now = datetime.now(timezone.utc)
+            await db.execute(insert(LikeDelta.__table__), [
+                {"kind": kind, "targetId": target_id, "delta": delta, "worker": self.worker, "createdAt": now}
+                for kind, target_id, delta in deltas
+            ])
+
+    async def flush(self) -> int:
+        """Aplica as variações deste worker (e as órfãs) gravadas em LikeDelta; devolve os alvos atualizados."""
+        sweep = time.monotonic() - self._swept_at >= self.orphan_after
+        pending, self._pending = self._pending, {}
+        if not pending and not sweep:
+            return 0
+        try:
+            async with AsyncSession(self.engine) as db:
+                claim = LikeDelta.worker == self.worker
+                if sweep:
+                    cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.orphan_after)
+                    claim = or_(claim, LikeDelta.createdAt < cutoff)
+                totals: Dict[Tuple[str, int], int] = {}
+                for kind, target_id, delta in (await db.execute(
+                    delete(LikeDelta).where(claim).returning(LikeDelta.kind, LikeDelta.targetId, LikeDelta.delta)
+                )).all():
+                    totals[(kind, target_id)] = totals.get((kind, target_id), 0) + delta
+                for kind, (model, primary_key, _) in TARGETS.items():
+                    params = [{"target": target_id, "delta": delta}
+                              for (target_kind, target_id), delta in totals.items() if target_kind == kind and delta]
+                    if params:
+                        table = model.__table__
+                        await db.execute(
+                            update(table).where(table.c[primary_key.key] == bindparam("target"))
+                            .values(totalLikes=table.c.totalLikes + bindparam("delta")),
+                            params,
+                        )
+                await db.commit()
+        except BaseException:
+            # Devolve as variações para a próxima tentativa
+            for (kind, target_id), delta in pending.items():
+                self.add(kind, target_id, delta)
+            raise
+        if sweep:
+            self._swept_at = time.monotonic()
+        self.flushes += 1
+        self.rows_updated += len(totals)
+        return len(totals)
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Erro ao escrever os contadores de likes: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pendingTargets": len(self._pending),
+            "pendingLikes": sum(self._pending.values()),
+            "flushes": self.flushes,
+            "rowsUpdated": self.rows_updated,
+        }
+
+
+like_counter = LikeCounter()
+
+
+async def add_like(db, kind: str, target_id: int, user_id: int) -> bool:
+    """Regista o like do utilizador; devolve False se já existia.
+
+    Um só INSERT ... SELECT ... ON CONFLICT DO NOTHING: não insere se o alvo ou o
+    utilizador não existirem nem se o utilizador já tiver dado like.
+    """
+    model, primary_key, column = TARGETS[kind]
+    stmt = dialect_insert(db, CommentLike).from_select(
+        ["userId", column.key],
+        select(literal(user_id), primary_key).where(
+            primary_key == target_id, exists().where(User.userId == user_id)
+        ),
+    ).on_conflict_do_nothing()
+    inserted = (await db.execute(stmt)).rowcount
+    if inserted:
+        await like_counter.arecord(db, [(kind, target_id, 1)])
+    await db.commit()
+    if inserted:
+        like_counter.add(kind, target_id, 1)
+        return True
+    if await db.get(model, target_id) is None:
+        raise HTTPException(status_code=404, detail=NOT_FOUND[kind])
+    if await db.get(User, user_id) is None:
+        raise HTTPException(status_code=404, detail="Utilizador não encontrado.")
+    return False
+
+
+async def remove_like(db, kind: str, target_id: int, user_id: int) -> bool:
+    _, _, column = TARGETS[kind]
+    deleted = (await db.execute(
+        delete(CommentLike).where(CommentLike.userId == user_id, column == target_id)
+    )).rowcount
+    if deleted:
+        await like_counter.arecord(db, [(kind, target_id, -1)])
+    await db.commit()
+    if deleted:
+        like_counter.add(kind, target_id, -1)
+    return bool(deleted)
+
+
+async def aremove_user_likes(db, user_id: int) -> List[Tuple[str, int]]:
+    """Apaga os likes do utilizador e devolve os alvos, para descontar depois do commit.
+
+    O ON DELETE CASCADE de CommentLike apagaria as linhas sem tocar nos contadores.
+    """
+    likes = (await db.execute(
+        select(CommentLike.commentId, CommentLike.commentReplyId).where(CommentLike.userId == user_id)
+    )).all()
+    await db.execute(delete(CommentLike).where(CommentLike.userId == user_id))
+    targets = [("comment", comment_id) if comment_id is not None else ("reply", reply_id)
+               for comment_id, reply_id in likes]
+    await like_counter.arecord(db, [(kind, target_id, -1) for kind, target_id in targets])
+    return targets
@@ -1,6 +1,6 @@
 from sqlmodel import Field, SQLModel, Relationship, Column
-from sqlalchemy import Index, UniqueConstraint
-from datetime import datetime, timezone
+from sqlalchemy import DDL, Index, UniqueConstraint, event
+from datetime import date, datetime, timezone
 from typing import Optional, List
 from pydantic import EmailStr, field_validator
 
@@ -45,6 +45,7 @@ class ProductBase(SQLModel):
     unitInOrder: Optional[int] = Field(ge=0, default=0)
     picture: Optional[str] = Field(max_length=500)
     categoryId: int = Field(foreign_key="category.categoryId", ondelete="RESTRICT")
+    sellerId: Optional[int] = Field(default=None, foreign_key="user.userId", ondelete="SET NULL")
 
 class ProductReviewBase(SQLModel):
     productId: Optional[int] = Field(foreign_key="product.productId", ondelete="CASCADE")
@@ -125,19 +126,57 @@ class Order(OrderBase, table=True):
         Index('idx_order_buyer', 'buyerId'),
         Index('idx_order_product', 'productId'),
         Index('idx_order_date', 'orderDate'),
+        Index('idx_order_seller', 'sellerId'),
     )
     
     orderId: Optional[int] = Field(default=None, primary_key=True)
     orderDate: Optional[datetime] = Field(default_factory=lambda: datetime.now(timezone.utc))
     createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    person: Optional["User"] = Relationship(back_populates="orders")
+    # Vendedor a quem a venda foi atribuída em SalesDaily (ver utils/sales.py); não vem do cliente
+    sellerId: Optional[int] = Field(default=None, foreign_key="user.userId", ondelete="SET NULL")
+    person: Optional["User"] = Relationship(back_populates="orders",
+                                            sa_relationship_kwargs={"foreign_keys": "[Order.buyerId]"})
     product: Optional["Product"] = Relationship(back_populates="orders")
 
+class SalesDaily(SQLModel, table=True):
+    """Vendas de um produto de um vendedor num dia (UTC), mantidas pelas escritas de Order."""
+    __tablename__ = "salesdaily"
+    __table_args__ = (
+        Index('idx_sales_daily_product', 'productId', 'day'),
+    )
+
+    sellerId: int = Field(primary_key=True, foreign_key="user.userId", ondelete="CASCADE")
+    day: date = Field(primary_key=True)
+    productId: int = Field(primary_key=True, foreign_key="product.productId", ondelete="CASCADE")
+    # Pedidos que incluem o produto (um carrinho com dois produtos conta em ambos)
+    orderCount: int = Field(default=0)
+    units: int = Field(default=0)
+    revenue: float = Field(default=0)
+    updatedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class OrderLine(SQLModel, table=True):
+    """Linha de um pedido; o preço unitário é o do produto no momento do checkout."""
+    __tablename__ = "orderline"
+    __table_args__ = (
+        Index('idx_order_line_order', 'orderId'),
+        Index('idx_order_line_product', 'productId'),
+        Index('idx_order_line_seller', 'sellerId'),
+    )
+
+    orderLineId: Optional[int] = Field(default=None, primary_key=True)
+    orderId: int = Field(foreign_key="order.orderId", ondelete="CASCADE")
+    productId: int = Field(foreign_key="product.productId", ondelete="CASCADE")
+    quantity: int = Field(ge=1)
+    unitPrice: float = Field(ge=0)
+    lineTotal: float = Field(ge=0)
+    sellerId: Optional[int] = Field(default=None, foreign_key="user.userId", ondelete="SET NULL")
+
 class Product(ProductBase, table=True):
     __tablename__ = "product"
     __table_args__ = (
         Index('idx_product_category', 'categoryId'),
         Index('idx_product_name', 'productName'),
+        Index('idx_product_seller', 'sellerId'),
     )
     
     productId: Optional[int] = Field(default=None, primary_key=True)
@@ -164,6 +203,117 @@ class SellerReview(SQLModel, table=True):
     createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+class SellerSummary(SQLModel, table=True):
+    __tablename__ = "sellersummary"
+    __table_args__ = (
+        Index('idx_seller_summary_average', 'ratingAverage'),
+    )
+
+    sellerId: int = Field(primary_key=True, foreign_key="user.userId", ondelete="CASCADE")
+    reviewCount: int = Field(default=0)
+    ratingCount: int = Field(default=0)
+    ratingSum: int = Field(default=0)
+    ratingAverage: float = Field(default=0)
+    rating1: int = Field(default=0)
+    rating2: int = Field(default=0)
+    rating3: int = Field(default=0)
+    rating4: int = Field(default=0)
+    rating5: int = Field(default=0)
+    totalCustomers: int = Field(default=0)
+    updatedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class SellerCustomer(SQLModel, table=True):
+    """Número de avaliações de cada comprador a cada vendedor; a linha existe enquanto houver alguma.
+
+    Conta cada comprador uma só vez em SellerSummary.totalCustomers: o upsert que a
+    incrementa devolve 1 apenas na primeira avaliação do par.
+    """
+    __tablename__ = "sellercustomer"
+
+    sellerId: int = Field(primary_key=True, foreign_key="user.userId", ondelete="CASCADE")
+    customerId: int = Field(primary_key=True, foreign_key="user.userId", ondelete="CASCADE")
+    reviewCount: int = Field(default=0)
+
+
+class ProductRatingSummary(SQLModel, table=True):
+    """Agregados das avaliações de um produto, mantidos pelas escritas de ProductReview.
+
+    categoryId é uma cópia do Product para que a listagem de mais bem avaliados por
+    categoria leia apenas o índice desta tabela.
+    """
+    __tablename__ = "productratingsummary"
+    __table_args__ = (
+        Index('idx_product_rating_top', 'ratingAverage', 'ratingCount', 'productId'),
+        Index('idx_product_rating_category_top', 'categoryId', 'ratingAverage', 'ratingCount', 'productId'),
+    )
+
+    productId: int = Field(primary_key=True, foreign_key="product.productId", ondelete="CASCADE")
+    categoryId: Optional[int] = Field(default=None)
+    ratingCount: int = Field(default=0)
+    ratingSum: int = Field(default=0)
+    ratingAverage: float = Field(default=0)
+    rating1: int = Field(default=0)
+    rating2: int = Field(default=0)
+    rating3: int = Field(default=0)
+    rating4: int = Field(default=0)
+    rating5: int = Field(default=0)
+    updatedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class SearchDocument(SQLModel, table=True):
+    """Documento de pesquisa derivado de Product/User (ver utils/searchIndex.py)."""
+    __tablename__ = "searchdocument"
+    __table_args__ = (
+        UniqueConstraint('kind', 'refId', name='uq_search_document'),
+        Index('idx_search_category', 'categoryId'),
+        Index('idx_search_user_type', 'userType'),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # product | seller
+    kind: str = Field(nullable=False, max_length=20)
+    refId: int = Field(nullable=False)
+    title: str = Field(nullable=False, max_length=300)
+    body: Optional[str] = Field(default=None, max_length=2000)
+    categoryId: Optional[int] = Field(default=None)
+    categoryName: Optional[str] = Field(default=None, max_length=100)
+    userType: Optional[str] = Field(default=None, max_length=20)
+
+
+# Índices de texto: tsvector gerado + trigramas no Postgres, tabela FTS5 sincronizada por triggers no SQLite
+for _statement in (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """ALTER TABLE searchdocument ADD COLUMN "searchVector" tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('portuguese', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('portuguese', coalesce("categoryName", '')), 'B') ||
+        setweight(to_tsvector('portuguese', coalesce(body, '')), 'C')) STORED""",
+    'CREATE INDEX idx_search_vector ON searchdocument USING GIN ("searchVector")',
+    "CREATE INDEX idx_search_title_trgm ON searchdocument USING GIN (title gin_trgm_ops)",
+):
+    event.listen(SearchDocument.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+
+for _statement in (
+    """CREATE VIRTUAL TABLE searchdocument_fts USING fts5(
+        title, "categoryName", body, content='searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER searchdocument_ai AFTER INSERT ON searchdocument BEGIN
+        INSERT INTO searchdocument_fts(rowid, title, "categoryName", body)
+        VALUES (new.id, new.title, new."categoryName", new.body); END""",
+    """CREATE TRIGGER searchdocument_ad AFTER DELETE ON searchdocument BEGIN
+        INSERT INTO searchdocument_fts(searchdocument_fts, rowid, title, "categoryName", body)
+        VALUES ('delete', old.id, old.title, old."categoryName", old.body); END""",
+    """CREATE TRIGGER searchdocument_au AFTER UPDATE ON searchdocument BEGIN
+        INSERT INTO searchdocument_fts(searchdocument_fts, rowid, title, "categoryName", body)
+        VALUES ('delete', old.id, old.title, old."categoryName", old.body);
+        INSERT INTO searchdocument_fts(rowid, title, "categoryName", body)
+        VALUES (new.id, new.title, new."categoryName", new.body); END""",
+):
+    event.listen(SearchDocument.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(SearchDocument.__table__, "before_drop",
+             DDL("DROP TABLE IF EXISTS searchdocument_fts").execute_if(dialect="sqlite"))
+
+
 class ProductReview(ProductReviewBase, table=True):
     __tablename__ = "productreview"
     __table_args__ = (
@@ -196,7 +346,8 @@ class User(UserBase, table=True):
     productReview: List["ProductReview"] = Relationship(back_populates="person")
     comments: List["Comment"] = Relationship(back_populates="user")
     commentsRpl: List["CommentReply"] = Relationship(back_populates="user")
-    orders: List["Order"] = Relationship(back_populates="person")
+    orders: List["Order"] = Relationship(back_populates="person",
+                                         sa_relationship_kwargs={"foreign_keys": "[Order.buyerId]"})
 
 
 class VerificationCode(VerificationCodeBase, table=True):
@@ -210,6 +361,39 @@ class VerificationCode(VerificationCodeBase, table=True):
     expirationTime: datetime = Field(nullable=False)
     createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class EmailOutbox(SQLModel, table=True):
+    __tablename__ = "emailoutbox"
+    __table_args__ = (
+        Index('idx_email_outbox_due', 'status', 'nextAttemptAt'),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    recipients: str = Field(nullable=False, max_length=2000)
+    subject: str = Field(nullable=False, max_length=500)
+    body: str = Field(nullable=False, max_length=10000)
+    # pending -> sent | failed (esgotadas as tentativas)
+    status: str = Field(default="pending", max_length=20)
+    attempts: int = Field(default=0)
+    nextAttemptAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    lastError: Optional[str] = Field(default=None, max_length=1000)
+    sentAt: Optional[datetime] = Field(default=None)
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class StockReservation(SQLModel, table=True):
+    """Unidades retiradas de Product.unitInStock para um pedido ainda não pago."""
+    __tablename__ = "stockreservation"
+    __table_args__ = (
+        UniqueConstraint('orderId', 'productId', name='uq_stock_reservation'),
+        Index('idx_stock_reservation_expires', 'expiresAt'),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    orderId: int = Field(foreign_key="order.orderId", ondelete="CASCADE")
+    productId: int = Field(foreign_key="product.productId", ondelete="CASCADE")
+    quantity: int = Field(ge=1)
+    expiresAt: datetime = Field(nullable=False)
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
 class Comment(CommentBase, table=True):
     __tablename__ = "comment"
     __table_args__ = (
@@ -227,7 +411,8 @@ class CommentReply(CommentReplyBase, table=True):
     __tablename__ = "commentreply"
     __table_args__ = (
         Index('idx_comment_reply_user', 'userId'),
-        Index('idx_comment_reply_comment', 'commentId'),
+        # Respostas de um comentário por ordem de criação (fio e paginação das respostas)
+        Index('idx_comment_reply_comment', 'commentId', 'createdAt'),
     )
     
     commentReplyId: Optional[int] = Field(default=None, primary_key=True)
@@ -236,3 +421,37 @@ class CommentReply(CommentReplyBase, table=True):
     createdAt: Optional[datetime] = Field(default_factory=lambda: datetime.now(timezone.utc))
     user: Optional["User"] = Relationship(back_populates="commentsRpl")
     comment: Optional["Comment"] = Relationship(back_populates="commentReplies")
+
+class CommentLike(SQLModel, table=True):
+    """Like de um utilizador num comentário ou numa resposta (uma das duas colunas preenchida)."""
+    __tablename__ = "commentlike"
+    __table_args__ = (
+        UniqueConstraint('userId', 'commentId', name='uq_comment_like'),
+        UniqueConstraint('userId', 'commentReplyId', name='uq_comment_reply_like'),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    userId: int = Field(foreign_key="user.userId", ondelete="CASCADE")
+    commentId: Optional[int] = Field(default=None, foreign_key="comment.commentId", ondelete="CASCADE")
+    commentReplyId: Optional[int] = Field(default=None, foreign_key="commentreply.commentReplyId", ondelete="CASCADE")
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class LikeDelta(SQLModel, table=True):
+    """Variação de totalLikes ainda por aplicar, gravada na mesma transação que o like.
+
+    O LikeCounter do worker que a gravou aplica-a e apaga-a; se esse worker parar antes,
+    qualquer outro apanha-a passado LIKES_ORPHAN_SECONDS.
+    """
+    __tablename__ = "likedelta"
+    __table_args__ = (
+        Index('idx_like_delta_worker', 'worker'),
+        Index('idx_like_delta_created', 'createdAt'),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str = Field(max_length=10)
+    targetId: int
+    delta: int
+    worker: str = Field(max_length=32)
+    createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
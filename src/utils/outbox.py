@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import func, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from shared.database import async_engine
+from shared.mail import SMTPPool, compose_message, mailer
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_ENABLED = os.getenv('OUTBOX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))
+OUTBOX_POLL_SECONDS = float(os.getenv('OUTBOX_POLL_SECONDS', '2'))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '8'))
+OUTBOX_BACKOFF_SECONDS = float(os.getenv('OUTBOX_BACKOFF_SECONDS', '30'))
+OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv('OUTBOX_MAX_BACKOFF_SECONDS', '3600'))
+# Tempo durante o qual uma linha reclamada fica reservada; se o worker morrer a meio
+# do envio, a linha volta a ficar disponível quando a reserva expira
+OUTBOX_LEASE_SECONDS = float(os.getenv('OUTBOX_LEASE_SECONDS', '300'))
+
+
+def enqueue_email(db, recipients: List[str], subject: str, body: str) -> EmailOutbox:
+    """Regista o email na outbox; é enviado quando a transação do chamador fizer commit."""
+    entry = EmailOutbox(recipients=", ".join(recipients), subject=subject, body=body)
+    db.add(entry)
+    return entry
+
+
+def backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_MAX_BACKOFF_SECONDS))
+
+
+class OutboxDispatcher:
+    """Envia os emails pendentes da outbox em lotes.
+
+    Cada lote é reclamado com `SELECT ... FOR UPDATE SKIP LOCKED` e reservado
+    (nextAttemptAt = agora + OUTBOX_LEASE_SECONDS) na mesma transação, pelo que
+    vários workers podem esvaziar a fila em paralelo sem enviar o mesmo email
+    duas vezes. Os envios falhados são repetidos com backoff exponencial.
+    """
+
+    def __init__(self, engine=async_engine, sender: SMTPPool = mailer, batch_size: int = OUTBOX_BATCH_SIZE,
+                 poll_seconds: float = OUTBOX_POLL_SECONDS, max_attempts: int = OUTBOX_MAX_ATTEMPTS):
+        self.engine = engine
+        self.sender = sender
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self):
+        """Acorda o dispatcher deste processo logo após um commit com emails novos."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                while await self.run_once() == self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro no dispatcher da outbox: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def claim(self, db: AsyncSession) -> List[EmailOutbox]:
+        now = datetime.now(timezone.utc)
+        query = (
+            select(EmailOutbox)
+            .where(EmailOutbox.status == "pending", EmailOutbox.nextAttemptAt <= now)
+            .order_by(EmailOutbox.nextAttemptAt)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        rows = (await db.exec(query)).all()
+        if rows:
+            await db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id.in_([row.id for row in rows]))
+                .values(nextAttemptAt=now + timedelta(seconds=OUTBOX_LEASE_SECONDS))
+            )
+        await db.commit()
+        return rows
+
+    async def run_once(self) -> int:
+        """Reclama e envia um lote; devolve o número de emails processados."""
+        async with AsyncSession(self.engine, expire_on_commit=False) as db:
+            rows = await self.claim(db)
+            if not rows:
+                return 0
+            results = await asyncio.gather(
+                *(self.sender.send(compose_message(row.recipients, row.subject, row.body)) for row in rows),
+                return_exceptions=True,
+            )
+            now = datetime.now(timezone.utc)
+            sent = [row.id for row, result in zip(rows, results) if not isinstance(result, BaseException)]
+            if sent:
+                await db.execute(
+                    update(EmailOutbox).where(EmailOutbox.id.in_(sent)).values(status="sent", sentAt=now)
+                )
+            for row, result in zip(rows, results):
+                if isinstance(result, BaseException):
+                    self._record_failure(db, row, result, now)
+            await db.commit()
+            logger.info(f"Outbox: {len(sent)} enviados, {len(rows) - len(sent)} com erro")
+            return len(rows)
+
+    def _record_failure(self, db: AsyncSession, row: EmailOutbox, error: BaseException, now: datetime):
+        row.attempts += 1
+        row.lastError = repr(error)[:1000]
+        if row.attempts >= self.max_attempts:
+            row.status = "failed"
+            logger.error(f"Email {row.id} descartado após {row.attempts} tentativas: {error!r}")
+        else:
+            row.nextAttemptAt = now + backoff(row.attempts)
+        db.add(row)
+
+    async def stats(self) -> Dict[str, int]:
+        async with AsyncSession(self.engine) as db:
+            counts = (await db.exec(select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status))).all()
+        return {status: count for status, count in counts}
+
+
+outbox_dispatcher = OutboxDispatcher()
+
+
+if __name__ == '__main__':
+    # Worker dedicado: `python -m src.utils.outbox`
+    logging.basicConfig(level=logging.INFO)
+
+    async def main():
+        outbox_dispatcher.start()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
@@ -0,0 +1,232 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from sqlalchemy import Float, case, cast, delete, distinct, func, update
+from sqlmodel import Session, select
+from .models import Product, ProductRatingSummary, ProductReview, SellerCustomer, SellerReview, SellerSummary
+from .upsert import dialect_insert
+
+RATING_VALUES = range(1, 6)
+EMPTY_HISTOGRAM = {str(value): 0 for value in RATING_VALUES}
+
+
+def rating_delta(old_rating: Optional[int] = None, new_rating: Optional[int] = None) -> Dict[str, int]:
+    delta = {"ratingCount": 0, "ratingSum": 0, **{f"rating{value}": 0 for value in RATING_VALUES}}
+    if old_rating in RATING_VALUES:
+        delta["ratingCount"] -= 1
+        delta["ratingSum"] -= old_rating
+        delta[f"rating{old_rating}"] -= 1
+    if new_rating in RATING_VALUES:
+        delta["ratingCount"] += 1
+        delta["ratingSum"] += new_rating
+        delta[f"rating{new_rating}"] += 1
+    return delta
+
+
+def summary_upsert(db, model, key: Dict[str, Any], delta: Dict[str, int], values: Optional[Dict[str, Any]] = None):
+    """Aplica um delta de contadores a uma linha de agregados com um único INSERT ... ON CONFLICT.
+
+    Os incrementos são feitos pela base de dados (coluna = coluna + delta), pelo que
+    escritas concorrentes não perdem atualizações. Deve ser executado na mesma
+    transação que a escrita que originou o delta. `values` são colunas copiadas
+    (não somadas) para a linha.
+    """
+    table = model.__table__
+    values = values or {}
+    average = delta["ratingSum"] / delta["ratingCount"] if delta["ratingCount"] > 0 else 0.0
+    stmt = dialect_insert(db, model).values(
+        **key, **delta, **values, ratingAverage=average, updatedAt=datetime.now(timezone.utc)
+    )
+    excluded = stmt.excluded
+    count = table.c.ratingCount + excluded.ratingCount
+    total = table.c.ratingSum + excluded.ratingSum
+    set_ = {name: table.c[name] + excluded[name] for name in delta}
+    set_.update({name: excluded[name] for name in values})
+    set_["ratingAverage"] = case((count > 0, cast(total, Float) / count), else_=0.0)
+    set_["updatedAt"] = excluded.updatedAt
+    return stmt.on_conflict_do_update(index_elements=list(key), set_=set_)
+
+
+def seller_summary_upsert(db, sellerId: int, reviews: int = 0, customers: int = 0,
+                          old_rating: Optional[int] = None, new_rating: Optional[int] = None):
+    delta = {"reviewCount": reviews, "totalCustomers": customers, **rating_delta(old_rating, new_rating)}
+    return summary_upsert(db, SellerSummary, {"sellerId": sellerId}, delta)
+
+
+async def aadd_seller_customer(db, sellerId: int, customerId: Optional[int]) -> int:
+    """Conta mais uma avaliação do par; devolve o delta de totalCustomers (1 na primeira)."""
+    if customerId is None:
+        return 0
+    table = SellerCustomer.__table__
+    stmt = dialect_insert(db, SellerCustomer).values(sellerId=sellerId, customerId=customerId, reviewCount=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["sellerId", "customerId"], set_={"reviewCount": table.c.reviewCount + 1}
+    ).returning(table.c.reviewCount)
+    return 1 if (await db.execute(stmt)).scalar_one() == 1 else 0
+
+
+async def aremove_seller_customer(db, sellerId: int, customerId: Optional[int]) -> int:
+    """Desconta uma avaliação do par; devolve o delta de totalCustomers (-1 na última).
+
+    O UPDATE bloqueia a linha do par, pelo que remoções concorrentes veem contagens distintas.
+    """
+    if customerId is None:
+        return 0
+    table = SellerCustomer.__table__
+    pair = (table.c.sellerId == sellerId) & (table.c.customerId == customerId)
+    remaining = (await db.execute(
+        update(table).where(pair).values(reviewCount=table.c.reviewCount - 1).returning(table.c.reviewCount)
+    )).scalar_one_or_none()
+    if remaining is None or remaining > 0:
+        return 0
+    await db.execute(delete(table).where(pair & (table.c.reviewCount <= 0)))
+    return -1
+
+
+def product_summary_upsert(db, productId: int, categoryId: Optional[int],
+                           old_rating: Optional[int] = None, new_rating: Optional[int] = None):
+    return summary_upsert(db, ProductRatingSummary, {"productId": productId}, rating_delta(old_rating, new_rating),
+                          {"categoryId": categoryId})
+
+
+async def aremove_customer_product_ratings(db, customerId: int):
+    """Desconta dos agregados as avaliações de produtos de um comprador que vai ser apagado (cascade na BD)."""
+    reviews = (await db.execute(
+        select(ProductReview.productId, Product.categoryId, ProductReview.rating)
+        .join(Product, Product.productId == ProductReview.productId)
+        .where(ProductReview.customerId == customerId, ProductReview.rating.is_not(None))
+    )).all()
+    for productId, categoryId, rating in reviews:
+        await db.execute(product_summary_upsert(db, productId, categoryId, old_rating=rating))
+
+
+async def arefresh_product_categories(db, product_ids: List[int]):
+    """Copia o categoryId dos produtos para os agregados (produtos alterados em massa)."""
+    await db.execute(
+        update(ProductRatingSummary)
+        .where(ProductRatingSummary.productId.in_(product_ids))
+        .values(categoryId=select(Product.categoryId)
+                .where(Product.productId == ProductRatingSummary.productId)
+                .scalar_subquery())
+    )
+
+
+def format_rating_summary(summary) -> Dict[str, Any]:
+    if summary is None:
+        return {"ratingCount": 0, "ratingSum": 0, "ratingAverage": 0.0, "histogram": dict(EMPTY_HISTOGRAM)}
+    return {
+        "ratingCount": summary.ratingCount,
+        "ratingSum": summary.ratingSum,
+        "ratingAverage": round(summary.ratingAverage, 2),
+        "histogram": {str(value): getattr(summary, f"rating{value}") for value in RATING_VALUES},
+    }
+
+
+def format_seller_summary(summary: Optional[SellerSummary]) -> Dict[str, Any]:
+    return {
+        "reviewCount": summary.reviewCount if summary else 0,
+        **format_rating_summary(summary),
+        "totalCustomers": summary.totalCustomers if summary else 0,
+    }
+
+
+def backfill_seller_customers(db: Session, force: bool = False) -> int:
+    """Recalcula SellerCustomer a partir de SellerReview (no arranque, quando a tabela está vazia)."""
+    if not force and db.exec(select(SellerCustomer).limit(1)).first() is not None:
+        return 0
+    rows = db.execute(
+        select(SellerReview.sellerId, SellerReview.customerId, func.count().label("reviewCount"))
+        .where(SellerReview.sellerId.is_not(None), SellerReview.customerId.is_not(None))
+        .group_by(SellerReview.sellerId, SellerReview.customerId)
+    ).all()
+    db.execute(delete(SellerCustomer))
+    db.add_all(SellerCustomer(**row._mapping) for row in rows)
+    db.commit()
+    return len(rows)
+
+
+def backfill_seller_summaries(db: Session, force: bool = False) -> int:
+    """Recalcula os resumos a partir de SellerReview (usado no arranque quando a tabela está vazia)."""
+    backfill_seller_customers(db, force)
+    if not force and db.exec(select(SellerSummary).limit(1)).first() is not None:
+        return 0
+
+    rating_valid = SellerReview.rating.between(1, 5)
+    rows = db.execute(
+        select(
+            SellerReview.sellerId,
+            func.count().label("reviewCount"),
+            func.count(case((rating_valid, 1))).label("ratingCount"),
+            func.coalesce(func.sum(case((rating_valid, SellerReview.rating), else_=0)), 0).label("ratingSum"),
+            *[func.count(case((SellerReview.rating == value, 1))).label(f"rating{value}") for value in RATING_VALUES],
+            func.count(distinct(SellerReview.customerId)).label("totalCustomers"),
+        )
+        .where(SellerReview.sellerId.is_not(None))
+        .group_by(SellerReview.sellerId)
+    ).all()
+
+    for existing in db.exec(select(SellerSummary)).all():
+        db.delete(existing)
+    db.flush()
+    for row in rows:
+        data = dict(row._mapping)
+        data["ratingAverage"] = data["ratingSum"] / data["ratingCount"] if data["ratingCount"] else 0.0
+        db.add(SellerSummary(**data))
+    db.commit()
+    return len(rows)
+
+
+def top_rated_products_query(category_id: Optional[int] = None, min_ratings: int = 1):
+    """Produtos ativos por média de avaliação (e número de avaliações), a partir de ProductRatingSummary.
+
+    A ordenação segue o índice idx_product_rating_top (ou o de categoria, com
+    `category_id`); o join com Product é feito só para as linhas da página.
+    """
+    query = (
+        select(ProductRatingSummary, Product.productName, Product.unitPrice, Product.picture, Product.sellerId)
+        .join(Product, Product.productId == ProductRatingSummary.productId)
+        .where(ProductRatingSummary.ratingCount >= min_ratings, Product.disabled == False)  # noqa: E712
+    )
+    if category_id is not None:
+        query = query.where(ProductRatingSummary.categoryId == category_id)
+    return query
+
+
+def format_top_product(row) -> Dict[str, Any]:
+    summary, productName, unitPrice, picture, sellerId = row
+    return {
+        "productId": summary.productId,
+        "productName": productName,
+        "unitPrice": unitPrice,
+        "picture": picture,
+        "categoryId": summary.categoryId,
+        "sellerId": sellerId,
+        **format_rating_summary(summary),
+    }
+
+
+def backfill_product_summaries(db: Session, force: bool = False) -> int:
+    """Recalcula ProductRatingSummary a partir de ProductReview (no arranque, quando a tabela está vazia)."""
+    if not force and db.exec(select(ProductRatingSummary).limit(1)).first() is not None:
+        return 0
+
+    rating_valid = ProductReview.rating.between(1, 5)
+    rows = db.execute(
+        select(
+            ProductReview.productId,
+            Product.categoryId,
+            func.count().label("ratingCount"),
+            func.sum(ProductReview.rating).label("ratingSum"),
+            *[func.count(case((ProductReview.rating == value, 1))).label(f"rating{value}") for value in RATING_VALUES],
+        )
+        .join(Product, Product.productId == ProductReview.productId)
+        .where(rating_valid)
+        .group_by(ProductReview.productId, Product.categoryId)
+    ).all()
+
+    db.execute(delete(ProductRatingSummary))
+    for row in rows:
+        data = dict(row._mapping)
+        data["ratingAverage"] = data["ratingSum"] / data["ratingCount"]
+        db.add(ProductRatingSummary(**data))
+    db.commit()
+    return len(rows)
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import bindparam, case, delete, func, insert, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from shared.database import async_engine
+from .models import Order, OrderLine, Product, StockReservation
+from .sales import UNCOUNTED_STATUSES, arecord_sales, aunrecord_sales
+
+logger = logging.getLogger(__name__)
+
+# Tempo que o comprador tem para pagar antes de as unidades voltarem ao stock
+RESERVATION_TTL_SECONDS = float(os.getenv('RESERVATION_TTL_SECONDS', '900'))
+RESERVATION_SWEEP_SECONDS = float(os.getenv('RESERVATION_SWEEP_SECONDS', '30'))
+RESERVATION_SWEEP_BATCH = int(os.getenv('RESERVATION_SWEEP_BATCH', '500'))
+
+# Estados do pedido (Order.transactStatus) no fluxo de checkout
+RESERVED, PAID, CANCELLED, EXPIRED = "reserved", "paid", "cancelled", "expired"
+
+products = Product.__table__
+
+
+def reserve_statement(quantities: Dict[int, int]):
+    """Retira as unidades de cada produto ({productId: quantidade}) e devolve (productId, preço, vendedor).
+
+    Um só UPDATE para o carrinho inteiro: a condição `unitInStock >= quantidade` é
+    avaliada com cada linha bloqueada pelo próprio UPDATE, pelo que compradores em
+    simultâneo nunca vendem mais do que o stock e os locks só duram até ao commit do
+    pedido. Produtos sem stock, sem preço ou desativados não são devolvidos.
+    """
+    quantity = case(quantities, value=products.c.productId)
+    # Ids ordenados: carrinhos concorrentes bloqueiam os produtos pela mesma ordem
+    return (
+        update(products)
+        .where(products.c.productId.in_(sorted(quantities)), products.c.disabled == False,  # noqa: E712
+               products.c.unitPrice.is_not(None), products.c.unitInStock >= quantity)
+        .values(unitInStock=products.c.unitInStock - quantity,
+                unitInOrder=func.coalesce(products.c.unitInOrder, 0) + quantity)
+        .returning(products.c.productId, products.c.unitPrice, products.c.sellerId)
+    )
+
+
+def take_reservations(*where):
+    """Apaga as reservas e devolve-as: cada reserva só é libertada/confirmada uma vez."""
+    return (
+        delete(StockReservation).where(*where)
+        .returning(StockReservation.orderId, StockReservation.productId, StockReservation.quantity)
+    )
+
+
+def settle_statements(reservations, restock: bool, status: Optional[str] = None,
+                      **order_values) -> List[Tuple[Any, Optional[list]]]:
+    """(instrução, parâmetros) que fecham as reservas devolvidas por `take_reservations`.
+
+    Com `restock` as unidades voltam a unitInStock (cancelamento, expiração); sem, saem
+    apenas de unitInOrder (venda). Com `status` os pedidos passam a esse estado.
+    """
+    units: Dict[int, int] = defaultdict(int)
+    for _, product_id, quantity in reservations:
+        units[product_id] += quantity
+    if not units:
+        return []
+    values = {"unitInOrder": func.coalesce(products.c.unitInOrder, 0) - bindparam("units")}
+    if restock:
+        values["unitInStock"] = products.c.unitInStock + bindparam("units")
+    statements = [(
+        update(products).where(products.c.productId == bindparam("product")).values(**values),
+        [{"product": product_id, "units": quantity} for product_id, quantity in units.items()],
+    )]
+    if status is not None:
+        order_ids = sorted({order_id for order_id, _, _ in reservations})
+        statements.append((
+            update(Order).where(Order.orderId.in_(order_ids)).values(transactStatus=status, **order_values), None,
+        ))
+    return statements
+
+
+async def _settle(db, reservations, restock: bool, status: Optional[str] = None, **order_values):
+    for stmt, params in settle_statements(reservations, restock, status, **order_values):
+        await db.execute(stmt, params)
+
+
+def merge_lines(lines: List[Tuple[int, int]]) -> Dict[int, int]:
+    """Soma as quantidades de linhas repetidas do mesmo produto, mantendo a ordem do carrinho."""
+    quantities: Dict[int, int] = {}
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+
+async def place_order(db, buyer_id: int, lines: List[Tuple[int, int]]) -> Dict[str, Any]:
+    """Cria o pedido com as linhas [(productId, quantidade)] e reserva o stock, numa transação.
+
+    O número de instruções não depende do tamanho do carrinho: o UPDATE que reserva e
+    devolve os preços, o INSERT do pedido e um INSERT de várias linhas para OrderLine e
+    outro para StockReservation. 404 se algum produto não existir e 409 se não tiver
+    unidades suficientes (nada é reservado).
+    """
+    quantities = merge_lines(lines)
+    if not quantities:
+        raise HTTPException(status_code=400, detail="O carrinho está vazio.")
+    reserved = {product_id: (price, seller_id)
+                for product_id, price, seller_id in (await db.execute(reserve_statement(quantities))).all()}
+    if len(reserved) < len(quantities):
+        await db.rollback()
+        missing = [product_id for product_id in quantities if product_id not in reserved]
+        existing = set((await db.exec(select(Product.productId).where(Product.productId.in_(missing)))).all())
+        if len(existing) < len(missing):
+            unknown = [product_id for product_id in missing if product_id not in existing]
+            raise HTTPException(status_code=404, detail=f"Produto não encontrado: {unknown}.")
+        raise HTTPException(status_code=409, detail=f"Stock insuficiente ou produto indisponível: {missing}.")
+
+    # O vendedor de cada linha é o do produto no momento da reserva (linha bloqueada pelo UPDATE)
+    order_lines = [
+        {"productId": product_id, "quantity": quantity, "unitPrice": reserved[product_id][0],
+         "lineTotal": round(reserved[product_id][0] * quantity, 2), "sellerId": reserved[product_id][1]}
+        for product_id, quantity in quantities.items()
+    ]
+    total_quantity = sum(quantities.values())
+    single = next(iter(quantities)) if len(quantities) == 1 else None
+    order = Order(buyerId=buyer_id, productId=single, sellerId=reserved[single][1] if single else None,
+                  itemQuantity=str(total_quantity), transactStatus=RESERVED,
+                  invoiceAmount=round(sum(line["lineTotal"] for line in order_lines), 2))
+    db.add(order)
+    await db.flush()
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=RESERVATION_TTL_SECONDS)
+    # executemany de um INSERT em cache: o SQLAlchemy envia-o como INSERT de várias linhas (insertmanyvalues)
+    await db.execute(insert(OrderLine.__table__), [{**line, "orderId": order.orderId} for line in order_lines])
+    await db.execute(insert(StockReservation.__table__), [
+        {"orderId": order.orderId, "productId": product_id, "quantity": quantity, "expiresAt": expires_at,
+         "createdAt": order.createdAt}
+        for product_id, quantity in quantities.items()
+    ])
+    await arecord_sales(db, [order.orderId], stamp=False)
+    await db.commit()
+    return {**order.model_dump(), "lines": order_lines, "totalQuantity": total_quantity,
+            "reservedUntil": expires_at}
+
+
+async def _close_order(db, order_id: int, restock: bool, status: str, **order_values) -> Order:
+    reservations = (await db.execute(take_reservations(StockReservation.orderId == order_id))).all()
+    if not reservations:
+        await db.rollback()
+        if await db.get(Order, order_id) is None:
+            raise HTTPException(status_code=404, detail="Order not found")
+        raise HTTPException(status_code=409, detail="Reserva expirada ou inexistente.")
+    if status in UNCOUNTED_STATUSES:
+        await aunrecord_sales(db, [order_id])
+    await _settle(db, reservations, restock, status, **order_values)
+    await db.commit()
+    return await db.get(Order, order_id, populate_existing=True)
+
+
+async def confirm_order(db, order_id: int) -> Order:
+    """Pagamento: as unidades reservadas passam a vendidas."""
+    return await _close_order(db, order_id, False, PAID, paymentDate=datetime.now(timezone.utc))
+
+
+async def cancel_order(db, order_id: int) -> Order:
+    return await _close_order(db, order_id, True, CANCELLED)
+
+
+class ReservationReaper:
+    """Devolve ao stock as reservas expiradas, em lotes de RESERVATION_SWEEP_BATCH.
+
+    Cada lote é um `DELETE ... RETURNING` das reservas vencidas seguido de um
+    executemany que repõe o stock de cada produto, numa transação. Com vários workers
+    cada reserva é apagada por um só, pelo que o stock nunca é reposto duas vezes.
+    """
+
+    def __init__(self, engine=async_engine, interval: float = RESERVATION_SWEEP_SECONDS,
+                 batch_size: int = RESERVATION_SWEEP_BATCH):
+        self.engine = engine
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self.released = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                while await self.run_once() == self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro ao libertar reservas expiradas: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> int:
+        """Liberta um lote de reservas expiradas; devolve quantas."""
+        async with AsyncSession(self.engine) as db:
+            due = (await db.exec(
+                select(StockReservation.id)
+                .where(StockReservation.expiresAt <= datetime.now(timezone.utc))
+                .order_by(StockReservation.expiresAt)
+                .limit(self.batch_size)
+            )).all()
+            if not due:
+                return 0
+            reservations = (await db.execute(take_reservations(StockReservation.id.in_(due)))).all()
+            await aunrecord_sales(db, sorted({order_id for order_id, _, _ in reservations}))
+            await _settle(db, reservations, True, EXPIRED)
+            await db.commit()
+        self.released += len(reservations)
+        if reservations:
+            logger.info(f"Reservas expiradas: {len(reservations)} devolvidas ao stock")
+        return len(due)
+
+    async def stats(self) -> Dict[str, int]:
+        async with AsyncSession(self.engine) as db:
+            active, units = (await db.exec(
+                select(func.count(), func.coalesce(func.sum(StockReservation.quantity), 0))
+            )).one()
+        return {"activeReservations": active, "reservedUnits": units, "released": self.released}
+
+
+reservation_reaper = ReservationReaper()
@@ -0,0 +1,177 @@
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import String, cast, delete, exists, func, or_, union_all, update
+from sqlmodel import Session, select
+from .models import Category, Order, OrderLine, Product, SalesDaily
+from .upsert import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+# Pedidos cancelados ou expirados (ver reservations.py) não contam como vendas
+UNCOUNTED_STATUSES = ("cancelled", "expired")
+MEASURES = ("orderCount", "units", "revenue")
+BACKFILL_BATCH_SIZE = 5000
+
+
+def contributions(order_ids: Optional[List[int]] = None):
+    """(pedido, vendedor, produto, data, quantidade, valor) de cada produto vendido.
+
+    Os pedidos do checkout contam pelas suas linhas (OrderLine); os restantes pelo
+    productId, itemQuantity e invoiceAmount do próprio Order. O vendedor é o gravado no
+    pedido/linha por `stamp_sellers`, não o atual do produto. Só entram vendas com
+    vendedor e pedidos que não estejam cancelados/expirados.
+    """
+    counted = or_(Order.transactStatus.is_(None), Order.transactStatus.not_in(UNCOUNTED_STATUSES))
+    has_lines = exists().where(OrderLine.orderId == Order.orderId)
+    single = (
+        select(Order.orderId, Order.sellerId, Order.productId, Order.orderDate, Order.createdAt,
+               Order.itemQuantity.label("quantity"), Order.invoiceAmount.label("amount"))
+        .where(counted, ~has_lines, Order.sellerId.is_not(None))
+    )
+    lines = (
+        select(Order.orderId, OrderLine.sellerId, OrderLine.productId, Order.orderDate, Order.createdAt,
+               cast(OrderLine.quantity, String).label("quantity"), OrderLine.lineTotal.label("amount"))
+        .join(Order, Order.orderId == OrderLine.orderId)
+        .where(counted, OrderLine.sellerId.is_not(None))
+    )
+    if order_ids is not None:
+        single = single.where(Order.orderId.in_(order_ids))
+        lines = lines.where(OrderLine.orderId.in_(order_ids))
+    return union_all(single, lines)
+
+
+def stamp_sellers(order_ids: Optional[List[int]] = None, only_missing: bool = False) -> list:
+    """UPDATEs que copiam o vendedor atual do produto para os pedidos e as linhas.
+
+    Corre sempre que as vendas de um pedido são somadas: retirá-las mais tarde usa o
+    vendedor gravado, pelo que mudar o vendedor de um produto não desloca vendas já
+    contadas (uma nova alteração do pedido volta a atribuí-lo ao vendedor atual).
+    """
+    statements = []
+    for model in (Order, OrderLine):
+        seller = select(Product.sellerId).where(Product.productId == model.productId).scalar_subquery()
+        stmt = update(model).values(sellerId=seller)
+        if order_ids is not None:
+            stmt = stmt.where(model.orderId.in_(order_ids))
+        if only_missing:
+            stmt = stmt.where(model.sellerId.is_(None))
+        statements.append(stmt)
+    return statements
+
+
+def _units(quantity: Optional[str]) -> int:
+    # itemQuantity é texto livre nos pedidos antigos; sem um número, conta como uma unidade
+    quantity = (quantity or "").strip()
+    return int(quantity) if quantity.isdigit() else 1
+
+
+def sales_deltas(rows: Iterable[Any], sign: int = 1) -> List[Dict[str, Any]]:
+    """Soma as contribuições por (vendedor, produto, dia); `sign=-1` para as retirar."""
+    totals: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0, 0.0])
+    for row in rows:
+        moment = row.orderDate or row.createdAt
+        day = (moment.astimezone(timezone.utc) if moment.tzinfo else moment).date()
+        measures = totals[(row.sellerId, row.productId, day)]
+        measures[0] += 1
+        measures[1] += _units(row.quantity)
+        measures[2] += row.amount or 0.0
+    now = datetime.now(timezone.utc)
+    return [
+        {"sellerId": seller_id, "productId": product_id, "day": day, "orderCount": sign * orders,
+         "units": sign * units, "revenue": sign * revenue, "updatedAt": now}
+        for (seller_id, product_id, day), (orders, units, revenue) in totals.items()
+    ]
+
+
+def sales_upsert(db):
+    """INSERT ... ON CONFLICT que soma as medidas à linha do dia (executemany com `sales_deltas`)."""
+    table = SalesDaily.__table__
+    stmt = dialect_insert(db, table)
+    set_ = {name: table.c[name] + stmt.excluded[name] for name in MEASURES}
+    set_["updatedAt"] = stmt.excluded.updatedAt
+    return stmt.on_conflict_do_update(index_elements=["sellerId", "productId", "day"], set_=set_)
+
+
+def record_sales(db: Session, order_ids: List[int], sign: int = 1):
+    """Soma (ou retira, com `sign=-1`) as vendas dos pedidos; chamar na transação da escrita.
+
+    Numa atualização, retirar antes de alterar o pedido e voltar a somar depois.
+    """
+    if sign > 0:
+        for stmt in stamp_sellers(order_ids):
+            db.execute(stmt)
+    params = sales_deltas(db.execute(contributions(order_ids)).all(), sign)
+    if params:
+        db.execute(sales_upsert(db), params)
+
+
+async def arecord_sales(db, order_ids: List[int], sign: int = 1, stamp: bool = True):
+    # `stamp=False` quando quem grava o pedido já preencheu o vendedor (checkout)
+    if sign > 0 and stamp:
+        for stmt in stamp_sellers(order_ids):
+            await db.execute(stmt)
+    params = sales_deltas((await db.execute(contributions(order_ids))).all(), sign)
+    if params:
+        await db.execute(sales_upsert(db), params)
+
+
+async def aunrecord_sales(db, order_ids: List[int]):
+    await arecord_sales(db, order_ids, -1)
+
+
+def backfill_sales(db: Session, force: bool = False) -> int:
+    """Recalcula SalesDaily a partir dos pedidos (no arranque, quando a tabela está vazia)."""
+    if not force and db.exec(select(SalesDaily).limit(1)).first() is not None:
+        return 0
+    db.execute(delete(SalesDaily))
+    # Pedidos anteriores à atribuição de vendedor ficam com o vendedor atual do produto
+    for stmt in stamp_sellers(only_missing=True):
+        db.execute(stmt)
+    rows = db.execute(contributions().execution_options(yield_per=BACKFILL_BATCH_SIZE))
+    params = sales_deltas(rows)
+    for start in range(0, len(params), BACKFILL_BATCH_SIZE):
+        db.execute(sales_upsert(db), params[start:start + BACKFILL_BATCH_SIZE])
+    db.commit()
+    return len(params)
+
+
+def sales_query(seller_id: int, start: date, end: date, group_by: str):
+    """Medidas do vendedor entre `start` e `end` (inclusive), lidas apenas de SalesDaily."""
+    measures = [func.sum(SalesDaily.orderCount).label("orderCount"), func.sum(SalesDaily.units).label("units"),
+                func.sum(SalesDaily.revenue).label("revenue")]
+    in_range = (SalesDaily.sellerId == seller_id, SalesDaily.day >= start, SalesDaily.day <= end)
+    if group_by == "day":
+        return select(SalesDaily.day, *measures).where(*in_range).group_by(SalesDaily.day).order_by(SalesDaily.day)
+    if group_by == "product":
+        return (
+            select(SalesDaily.productId, Product.productName, *measures)
+            .join(Product, Product.productId == SalesDaily.productId)
+            .where(*in_range)
+            .group_by(SalesDaily.productId, Product.productName)
+            .order_by(func.sum(SalesDaily.revenue).desc(), SalesDaily.productId)
+        )
+    return (
+        select(Product.categoryId, Category.categoryName, *measures)
+        .join(Product, Product.productId == SalesDaily.productId)
+        .outerjoin(Category, Category.categoryId == Product.categoryId)
+        .where(*in_range)
+        .group_by(Product.categoryId, Category.categoryName)
+        .order_by(func.sum(SalesDaily.revenue).desc(), Product.categoryId)
+    )
+
+
+def format_sales_row(row) -> Dict[str, Any]:
+    data = dict(row._mapping)
+    data["revenue"] = round(data["revenue"] or 0.0, 2)
+    return data
+
+
+if __name__ == '__main__':
+    # Reconstrução manual: `python -m src.utils.sales`
+    from shared.security import engine
+
+    logging.basicConfig(level=logging.INFO)
+    with Session(engine) as session:
+        logger.info(f"SalesDaily reconstruída: {backfill_sales(session, force=True)} linhas")
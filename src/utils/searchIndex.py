@@ -0,0 +1,155 @@
+import os
+import re
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException
+from sqlalchemy import Float, and_, column, delete, func, insert, literal, literal_column, null, or_, table, update
+from sqlmodel import Session, select
+from .models import Category, Product, SearchDocument, User
+
+SEARCH_MAX_TERMS = int(os.getenv('SEARCH_MAX_TERMS', '8'))
+# Pesos das colunas no bm25 do SQLite (title, categoryName, body); no Postgres são os setweight A/B/C
+SQLITE_WEIGHTS = (10.0, 4.0, 1.0)
+POSTGRES_CONFIG = 'portuguese'
+
+DOCUMENT_COLUMNS = ["kind", "refId", "title", "body", "categoryId", "categoryName", "userType"]
+searchdocument_fts = table("searchdocument_fts", column("rowid"))
+
+
+def product_documents():
+    return (
+        select(literal("product"), Product.productId, Product.productName, Product.productDescription,
+               Product.categoryId, Category.categoryName, null())
+        .outerjoin(Category, Category.categoryId == Product.categoryId)
+        .where(Product.disabled == False)  # noqa: E712
+    )
+
+
+def seller_documents():
+    # Só utilizadores com empresa ou descrição têm algo para pesquisar
+    return (
+        select(literal("seller"), User.userId,
+               func.coalesce(User.companyName, User.userFirstName + " " + User.userLastName),
+               User.description, User.categoryId, Category.categoryName, User.userType)
+        .outerjoin(Category, Category.categoryId == User.categoryId)
+        .where(User.disabled == False, or_(User.companyName.is_not(None), User.description.is_not(None)))  # noqa: E712
+    )
+
+
+def _refresh_statements(kind: str, ref_ids: List[int]) -> list:
+    documents = product_documents().where(Product.productId.in_(ref_ids)) if kind == "product" \
+        else seller_documents().where(User.userId.in_(ref_ids))
+    return [
+        delete(SearchDocument).where(SearchDocument.kind == kind, SearchDocument.refId.in_(ref_ids)),
+        insert(SearchDocument).from_select(DOCUMENT_COLUMNS, documents),
+    ]
+
+
+def index_product(db: Session, product_id: int):
+    """Atualiza o documento do produto; chamar antes do commit da escrita."""
+    for stmt in _refresh_statements("product", [product_id]):
+        db.execute(stmt)
+
+
+async def aindex_products(db, product_ids: List[int]):
+    for stmt in _refresh_statements("product", product_ids):
+        await db.execute(stmt)
+
+
+async def aindex_products_after(db, last_id: int):
+    """Indexa os produtos com id maior que `last_id` (importações em massa)."""
+    await db.execute(delete(SearchDocument).where(SearchDocument.kind == "product", SearchDocument.refId > last_id))
+    await db.execute(insert(SearchDocument).from_select(
+        DOCUMENT_COLUMNS, product_documents().where(Product.productId > last_id)
+    ))
+
+
+async def aindex_seller(db, user_id: int):
+    for stmt in _refresh_statements("seller", [user_id]):
+        await db.execute(stmt)
+
+
+async def aunindex_seller(db, user_id: int):
+    await db.execute(delete(SearchDocument).where(SearchDocument.kind == "seller", SearchDocument.refId == user_id))
+
+
+async def arename_category(db, category_id: int, category_name: Optional[str]):
+    await db.execute(update(SearchDocument).where(SearchDocument.categoryId == category_id)
+                     .values(categoryName=category_name))
+
+
+async def aremove_category(db, category_id: int):
+    await db.execute(update(SearchDocument).where(SearchDocument.categoryId == category_id)
+                     .values(categoryId=None, categoryName=None))
+
+
+def rebuild_search_index(db: Session, force: bool = False) -> int:
+    """Reconstrói o índice a partir de Product/User (usado no arranque quando a tabela está vazia)."""
+    if not force and db.exec(select(SearchDocument.id).limit(1)).first() is not None:
+        return 0
+    db.execute(delete(SearchDocument))
+    db.execute(insert(SearchDocument).from_select(DOCUMENT_COLUMNS, product_documents()))
+    db.execute(insert(SearchDocument).from_select(DOCUMENT_COLUMNS, seller_documents()))
+    db.commit()
+    return db.exec(select(func.count()).select_from(SearchDocument)).one()
+
+
+def search_terms(q: str) -> List[str]:
+    terms = re.findall(r"\w+", q.lower())[:SEARCH_MAX_TERMS]
+    if not terms:
+        raise HTTPException(status_code=400, detail="Pesquisa inválida.")
+    return terms
+
+
+def search_query(dialect: str, q: str, kind: Optional[str] = None, category_id: Optional[int] = None,
+                 user_type: Optional[str] = None):
+    """Devolve (query, score): documentos que correspondem a `q` com a relevância como coluna `score`.
+
+    Todos os termos têm de aparecer, como prefixo de uma palavra. No Postgres a
+    relevância é o ts_rank_cd do tsvector ponderado somado à semelhança por trigramas do
+    título, que também apanha nomes mal escritos; no SQLite é o bm25 do FTS5.
+    """
+    terms = search_terms(q)
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery(POSTGRES_CONFIG, " & ".join(f"{term}:*" for term in terms))
+        vector = literal_column('searchdocument."searchVector"')
+        phrase = " ".join(terms)
+        score = (func.ts_rank_cd(vector, tsquery, type_=Float)
+                 + func.similarity(SearchDocument.title, phrase, type_=Float))
+        query = select(SearchDocument, score.label("score")).where(
+            or_(vector.op("@@")(tsquery), SearchDocument.title.op("%")(phrase))
+        )
+    elif dialect == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        score = -func.bm25(literal_column("searchdocument_fts"), *SQLITE_WEIGHTS, type_=Float)
+        query = (
+            select(SearchDocument, score.label("score"))
+            .join(searchdocument_fts, searchdocument_fts.c.rowid == SearchDocument.id)
+            .where(literal_column("searchdocument_fts").op("MATCH")(match))
+        )
+    else:
+        raise NotImplementedError(f"Pesquisa não suportada para o dialeto {dialect}")
+
+    filters = []
+    if kind is not None:
+        filters.append(SearchDocument.kind == kind)
+    if category_id is not None:
+        filters.append(SearchDocument.categoryId == category_id)
+    if user_type is not None:
+        filters.append(SearchDocument.userType == user_type)
+    if filters:
+        query = query.where(and_(*filters))
+    return query, score
+
+
+def format_search_result(row) -> Dict[str, Any]:
+    document, score = row
+    return {
+        "type": document.kind,
+        "id": document.refId,
+        "title": document.title,
+        "description": document.body,
+        "categoryId": document.categoryId,
+        "categoryName": document.categoryName,
+        "userType": document.userType,
+        "score": round(score, 4),
+    }
@@ -3,7 +3,7 @@ from shared.security import get_session
 from sqlmodel import Session, select
 from fastapi import Depends, HTTPException
 from sqlalchemy.exc import IntegrityError
-from passlib.hash import pbkdf2_sha256
+from shared.security import get_hash_password
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -160,7 +160,7 @@ def initialize_tables(db: Session = Depends(get_session)):
                 
                 if model_name == 'User':
                     data_copy = data.copy()
-                    hashed_password = pbkdf2_sha256.hash(data_copy["password"])
+                    hashed_password = get_hash_password(data_copy["password"])
                     data_copy["password"] = hashed_password
                     items_to_add.append(model(**data_copy))
                 else:
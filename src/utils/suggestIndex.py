@@ -0,0 +1,269 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import func
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+from .models import Category, Product, User
+
+logger = logging.getLogger(__name__)
+
+# Cada nome é indexado a partir das primeiras palavras ("Telemóvel Samsung" também responde a "sam")
+SUGGEST_MAX_WORDS = int(os.getenv('SUGGEST_MAX_WORDS', '4'))
+SUGGEST_MAX_LIMIT = int(os.getenv('SUGGEST_MAX_LIMIT', '20'))
+# Intervalo entre verificações de divergência com a base de dados (0 desativa)
+SUGGEST_CHECK_SECONDS = float(os.getenv('SUGGEST_CHECK_SECONDS', '300'))
+
+KINDS = ("product", "category", "seller")
+# chave: texto normalizado a partir de uma palavra + "\0" + id; uma lista ordenada por tipo.
+# Uma só string por chave (em vez de um tuplo) poupa ~70 bytes por chave.
+Key = str
+
+
+def normalize(text: str) -> str:
+    """Minúsculas e sem acentos, para "telemo" encontrar "Telemóvel"."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold().strip()
+
+
+def index_keys(ref_id: int, name: str) -> List[Key]:
+    words = normalize(name).split()
+    return [f"{' '.join(words[i:])}\0{ref_id}" for i in range(min(len(words), SUGGEST_MAX_WORDS))]
+
+
+def _sizeof(keys: List[Key], name: str) -> int:
+    # Chaves, mais o nome original e a sua chave (tipo, id) no dicionário
+    return sum(map(sys.getsizeof, keys)) + sys.getsizeof(name) + sys.getsizeof(("", 0)) + sys.getsizeof(2 ** 40)
+
+
+def load_names(db: Session) -> Dict[Tuple[str, int], str]:
+    names = {}
+    for product_id, name in db.exec(select(Product.productId, Product.productName)
+                                    .where(Product.disabled == False)):  # noqa: E712
+        names[("product", product_id)] = name
+    for category_id, name in db.exec(select(Category.categoryId, Category.categoryName)
+                                      .where(Category.categoryName.is_not(None))):
+        names[("category", category_id)] = name
+    for user_id, name in db.exec(select(User.userId, User.companyName)
+                                 .where(User.disabled == False, User.companyName.is_not(None))):  # noqa: E712
+        names[("seller", user_id)] = name
+    return names
+
+
+def signature(db: Session) -> Dict[str, Tuple[int, Optional[int]]]:
+    """(número de linhas, maior id) por tipo: muda quando outro processo cria ou apaga nomes."""
+    return {
+        "product": tuple(db.exec(select(func.count(), func.max(Product.productId))
+                                 .where(Product.disabled == False)).one()),  # noqa: E712
+        "category": tuple(db.exec(select(func.count(), func.max(Category.categoryId))
+                                  .where(Category.categoryName.is_not(None))).one()),
+        "seller": tuple(db.exec(select(func.count(), func.max(User.userId))
+                                .where(User.disabled == False, User.companyName.is_not(None))).one()),  # noqa: E712
+    }
+
+
+class SortedKeys:
+    """Lista ordenada dividida em blocos de ~SortedKeys.LOAD chaves, com o máximo de cada bloco.
+
+    Numa lista única cada inserção move, em média, metade dos ponteiros (milissegundos
+    com milhões de chaves); aqui move no máximo um bloco.
+    """
+
+    LOAD = 1000
+
+    def __init__(self, keys: List[Key] = ()):
+        keys = sorted(keys)
+        self._blocks = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._len = len(keys)
+
+    def add(self, key: Key):
+        if not self._blocks:
+            self._blocks, self._maxes = [[key]], [key]
+        else:
+            i = bisect_left(self._maxes, key)
+            if i == len(self._maxes):
+                i -= 1
+                self._blocks[i].append(key)
+                self._maxes[i] = key
+            else:
+                insort(self._blocks[i], key)
+            block = self._blocks[i]
+            if len(block) > 2 * self.LOAD:
+                self._blocks[i:i + 1] = [block[:self.LOAD], block[self.LOAD:]]
+                self._maxes[i:i + 1] = [block[self.LOAD - 1], block[-1]]
+        self._len += 1
+
+    def discard(self, key: Key) -> bool:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return False
+        block = self._blocks[i]
+        j = bisect_left(block, key)
+        if block[j] != key:
+            return False
+        del block[j]
+        if block:
+            self._maxes[i] = block[-1]
+        else:
+            del self._blocks[i], self._maxes[i]
+        self._len -= 1
+        return True
+
+    def iter_from(self, key: Key) -> Iterator[Key]:
+        """Chaves >= `key`, por ordem."""
+        blocks = self._blocks
+        i = bisect_left(self._maxes, key)
+        j = bisect_left(blocks[i], key) if i < len(blocks) else 0
+        while i < len(blocks):
+            block = blocks[i]
+            for position in range(j, len(block)):
+                yield block[position]
+            i, j = i + 1, 0
+
+    def sizeof(self) -> int:
+        return sys.getsizeof(self._blocks) + sys.getsizeof(self._maxes) + sum(map(sys.getsizeof, self._blocks))
+
+    def __len__(self) -> int:
+        return self._len
+
+
+class SuggestIndex:
+    """Índice de prefixos em memória: lista ordenada de chaves pesquisada com bisect.
+
+    Cada pesquisa é um `bisect_left` (O(log n)) por tipo seguido da leitura das
+    chaves seguintes enquanto começarem pelo prefixo, sem ir à base de dados. As
+    rotas de escrita atualizam o índice depois do commit (`put`/`remove`); a tarefa
+    lançada por `start` reconstrói-o em segundo plano quando diverge da base de
+    dados (escritas feitas por outros workers).
+    """
+
+    def __init__(self):
+        self._keys: Dict[str, SortedKeys] = {kind: SortedKeys() for kind in KINDS}
+        self._names: Dict[Tuple[str, int], str] = {}
+        self._lock = threading.Lock()
+        self._signature: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.memory_bytes = 0
+        self.rebuilds = 0
+
+    def rebuild(self, db: Session) -> int:
+        # Assinatura lida antes dos nomes: uma escrita feita entretanto é detetada na verificação seguinte
+        db_signature = signature(db)
+        return self.build(load_names(db), db_signature)
+
+    def build(self, names: Dict[Tuple[str, int], str], db_signature: Optional[Dict[str, Any]] = None) -> int:
+        """Substitui o conteúdo do índice por `names` ({(tipo, id): nome})."""
+        kind_keys: Dict[str, List[Key]] = {kind: [] for kind in KINDS}
+        memory = 0
+        for (kind, ref_id), name in names.items():
+            entry_keys = index_keys(ref_id, name)
+            kind_keys[kind].extend(entry_keys)
+            memory += _sizeof(entry_keys, name)
+        keys = {kind: SortedKeys(entries) for kind, entries in kind_keys.items()}
+        memory += sys.getsizeof(names) + sum(sorted_keys.sizeof() for sorted_keys in keys.values())
+        with self._lock:
+            self._keys, self._names = keys, names
+            self._signature = db_signature
+            self.memory_bytes = memory
+            self.rebuilds += 1
+        return len(names)
+
+    def put(self, kind: str, ref_id: int, name: Optional[str]):
+        """Insere ou atualiza um nome; `None` remove-o."""
+        with self._lock:
+            existed = self._remove(kind, ref_id)
+            if not name:
+                self._track(kind, ref_id, -1 if existed else 0)
+                return
+            entry_keys = index_keys(ref_id, name)
+            for key in entry_keys:
+                self._keys[kind].add(key)
+            self._names[(kind, ref_id)] = name
+            self.memory_bytes += _sizeof(entry_keys, name)
+            self._track(kind, ref_id, 0 if existed else 1)
+
+    def remove(self, kind: str, ref_id: int):
+        self.put(kind, ref_id, None)
+
+    def _track(self, kind: str, ref_id: int, delta: int):
+        # Acompanha a assinatura com as escritas deste processo, para não as confundir com divergência
+        if self._signature is None or not delta:
+            return
+        count, max_id = self._signature[kind]
+        self._signature[kind] = (count + delta, max(max_id or 0, ref_id) if delta > 0 else max_id)
+
+    def _remove(self, kind: str, ref_id: int) -> bool:
+        name = self._names.pop((kind, ref_id), None)
+        if name is None:
+            return False
+        entry_keys = index_keys(ref_id, name)
+        for key in entry_keys:
+            self._keys[kind].discard(key)
+        self.memory_bytes -= _sizeof(entry_keys, name)
+        return True
+
+    def suggest(self, prefix: str, limit: int = 10, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        prefix = " ".join(normalize(prefix).split())
+        if not prefix:
+            return []
+        matches = []
+        with self._lock:
+            for entry_kind in (kind,) if kind else KINDS:
+                seen = set()
+                for key in self._keys[entry_kind].iter_from(prefix):
+                    if len(seen) >= limit or not key.startswith(prefix):
+                        break
+                    text, _, ref_id = key.rpartition("\0")
+                    ref_id = int(ref_id)
+                    if ref_id not in seen:
+                        seen.add(ref_id)
+                        matches.append((text, entry_kind, ref_id, self._names[(entry_kind, ref_id)]))
+        matches.sort()
+        return [{"type": entry_kind, "id": ref_id, "text": name} for _, entry_kind, ref_id, name in matches[:limit]]
+
+    def check(self, engine) -> bool:
+        """Reconstrói o índice se a assinatura da base de dados mudou; devolve True se reconstruiu."""
+        with Session(engine) as db:
+            if signature(db) == self._signature:
+                return False
+            logger.info("Índice de sugestões divergente da base de dados, a reconstruir...")
+            self.rebuild(db)
+            return True
+
+    def start(self, engine, interval: float = SUGGEST_CHECK_SECONDS):
+        if interval > 0:
+            self._task = asyncio.create_task(self._watch(engine, interval))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self, engine, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await run_in_threadpool(self.check, engine)
+            except Exception as e:
+                logger.error(f"Erro ao verificar o índice de sugestões: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "names": len(self._names),
+            "keys": {kind: len(keys) for kind, keys in self._keys.items()},
+            "memoryBytes": self.memory_bytes,
+            "rebuilds": self.rebuilds,
+        }
+
+
+suggest_index = SuggestIndex()
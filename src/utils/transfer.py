@@ -0,0 +1,155 @@
+import csv
+import io
+import json
+import os
+from datetime import date, datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from .models import Order, Product, ProductBase, SellerReview
+from .searchIndex import aindex_products_after
+
+# Linhas por ida à base de dados: yield_per na exportação, COPY/executemany na importação
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '5000'))
+# Erros de validação devolvidos no relatório da importação (os restantes só são contados)
+IMPORT_MAX_ERRORS = int(os.getenv('IMPORT_MAX_ERRORS', '100'))
+
+EXPORTS = {"products": Product, "orders": Order, "sellerReviews": SellerReview}
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Colunas gravadas na importação de produtos: campos do ProductBase + valores por omissão
+PRODUCT_IMPORT_COLUMNS = list(ProductBase.model_fields) + ["disabled", "createdAt"]
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def export_query(model, since: Optional[datetime] = None):
+    table = model.__table__
+    query = select(*table.columns).order_by(*table.primary_key.columns)
+    if since is not None:
+        query = query.where(table.c.createdAt >= since)
+    # Cursor do lado do servidor: a memória não cresce com o tamanho da tabela
+    return query.execution_options(yield_per=EXPORT_CHUNK_SIZE)
+
+
+async def encode_rows(rows, columns: List[str], fmt: str) -> AsyncIterator[bytes]:
+    """Codifica as linhas (resultado de `AsyncSession.stream`) em blocos NDJSON ou CSV."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(columns)
+        async for partition in rows.partitions():
+            writer.writerows(
+                [value.isoformat() if isinstance(value, (datetime, date)) else value for value in row]
+                for row in partition
+            )
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    else:
+        async for partition in rows.partitions():
+            yield "".join(
+                json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) + "\n"
+                for row in partition
+            ).encode()
+
+
+async def read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Divide o corpo do pedido em linhas à medida que chega, sem o guardar todo."""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8")
+    if pending:
+        yield pending.decode("utf-8")
+
+
+async def read_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Any]:
+    """Registos de um corpo NDJSON (um objeto por linha) ou CSV (cabeçalho na primeira linha)."""
+    if fmt != "csv":
+        async for line in read_lines(chunks):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield ValueError(f"JSON inválido: {e.msg}")
+        return
+
+    header, record = None, ""
+    async for line in read_lines(chunks):
+        record = f"{record}\n{line}" if record else line.rstrip("\r")
+        # Aspas ímpares: campo entre aspas com quebra de linha, o registo continua na linha seguinte
+        if record.count('"') % 2:
+            continue
+        values, record = next(csv.reader([record])) if record else [], ""
+        if header is None:
+            header = values
+        elif values:
+            yield {name: value if value != "" else None for name, value in zip(header, values)}
+
+
+def _product_row(item: ProductBase, now: datetime) -> tuple:
+    values = item.model_dump()
+    if values["unitInOrder"] is None:
+        values["unitInOrder"] = 0
+    return (*values.values(), False, now)
+
+
+async def _load(db, rows: List[tuple]):
+    connection = await db.connection()
+    if connection.dialect.name == "postgresql":
+        # COPY pela ligação asyncpg da própria transação
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Product.__tablename__, records=rows, columns=PRODUCT_IMPORT_COLUMNS
+        )
+    else:
+        await db.execute(insert(Product.__table__), [dict(zip(PRODUCT_IMPORT_COLUMNS, row)) for row in rows])
+
+
+async def import_products(db, records: AsyncIterator[Any]) -> Dict[str, Any]:
+    """Valida e grava os produtos em lotes de IMPORT_BATCH_SIZE, numa só transação.
+
+    No Postgres cada lote é um COPY; nos outros dialetos um executemany. Linhas
+    inválidas são ignoradas e indicadas no relatório (número da linha de dados, a
+    começar em 1). Os documentos de pesquisa dos produtos novos são criados na mesma
+    transação; o índice de sugestões apanha-os na verificação de divergência.
+    """
+    last_id = (await db.execute(select(func.max(Product.productId)))).scalar() or 0
+    now = datetime.now(timezone.utc)
+    batch: List[tuple] = []
+    imported, failed, errors = 0, 0, []
+    number = 0
+    async for record in records:
+        number += 1
+        try:
+            if isinstance(record, Exception):
+                raise record
+            batch.append(_product_row(ProductBase.model_validate(record), now))
+        except (ValidationError, ValueError) as e:
+            failed += 1
+            if len(errors) < IMPORT_MAX_ERRORS:
+                detail = [{"loc": list(err["loc"]), "msg": err["msg"]} for err in e.errors()] \
+                    if isinstance(e, ValidationError) else str(e)
+                errors.append({"line": number, "detail": detail})
+            continue
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await _load(db, batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        await _load(db, batch)
+        imported += len(batch)
+    if imported:
+        await aindex_products_after(db, last_id)
+    await db.commit()
+    return {"imported": imported, "failed": failed, "errors": errors}
@@ -0,0 +1,91 @@
+import asyncio
+import os
+
+# Os testes correm sobre SQLite; evita que o engine da aplicação aponte para o Postgres
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.utils import models  # noqa: F401  (regista as tabelas no metadata)
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    return tmp_path / "test.db"
+
+
+@pytest.fixture
+def engine(database_path):
+    engine = create_engine(f"sqlite:///{database_path}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def async_engine(engine, database_path):
+    # NullPool: cada teste/cliente corre o seu próprio event loop, não se reaproveitam ligações
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}", poolclass=NullPool)
+    yield async_engine
+    asyncio.run(async_engine.dispose())
+
+
+@pytest.fixture
+def db(engine):
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def run_async(async_engine):
+    """Executa `fn(async_session, *args)` numa AsyncSession ligada à base de dados de teste."""
+    def run(fn, *args, **kwargs):
+        async def go():
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                return await fn(session, *args, **kwargs)
+        return asyncio.run(go())
+    return run
+
+
+@pytest.fixture
+def query_counter(engine, async_engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    targets = [engine, async_engine.sync_engine]
+    for target in targets:
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    for target in targets:
+        event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def client(engine, async_engine):
+    from fastapi.testclient import TestClient
+    from main import app
+    from shared.cache import response_cache
+    from shared.security import get_async_session, get_session
+
+    # Cada teste usa uma base de dados nova: não reaproveitar respostas de outro teste
+    response_cache.backend.clear()
+
+    def override_get_session():
+        with Session(engine) as session:
+            yield session
+
+    async def override_get_async_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_get_session
+    app.dependency_overrides[get_async_session] = override_get_async_session
+    yield TestClient(app)
+    app.dependency_overrides.clear()
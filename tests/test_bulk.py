@@ -0,0 +1,66 @@
+from sqlalchemy import event
+
+from src.utils.models import Category, Product
+
+
+def test_bulk_categories_upsert_by_name(client, db, query_counter):
+    db.add(Category(categoryName="Moda"))
+    db.commit()
+
+    query_counter.clear()
+    report = client.post("/api/add/bulk/categories", json=[
+        {"categoryName": "Casa"}, {"categoryName": "Moda"}, {"categoryName": "x" * 101},
+    ]).json()
+    assert (report["created"], report["updated"], report["failed"]) == (1, 1, 1)
+    assert [r["status"] for r in report["results"]] == ["created", "updated", "invalid"]
+    assert report["results"][1]["id"] == 1
+    assert len([s for s in query_counter if s.startswith("INSERT INTO category")]) == 1
+    assert report["results"][2]["detail"][0]["loc"] == ["categoryName"]
+    assert [c["categoryName"] for c in client.get("/api/see/categories").json()] == ["Moda", "Casa"]
+
+
+def test_bulk_products_upsert_and_per_item_errors(client, db, async_engine):
+    db.add(Category(categoryName="Moda"))
+    db.commit()
+    product = {"productDescription": None, "quantity": 1, "unitPrice": 10, "unitInStock": 5, "picture": None,
+               "categoryId": 1}
+
+    report = client.post("/api/add/bulk/products", json=[
+        {**product, "productName": f"Camisa {i}"} for i in range(3)
+    ]).json()
+    assert [r["id"] for r in report["results"]] == [1, 2, 3]
+    assert len(client.get("/api/search", params={"q": "camisa"}).json()) == 3
+
+    # Chave estrangeira inválida: o bloco é repetido item a item e só esse falha
+    event.listen(async_engine.sync_engine, "connect",
+                 lambda connection, record: connection.execute("PRAGMA foreign_keys=ON"))
+    report = client.post("/api/add/bulk/products", json=[
+        {**product, "productId": 2, "productName": "Camisa azul"},
+        {**product, "productName": "Sem categoria", "categoryId": 99},
+        {**product, "productName": "Calças"},
+        {**product, "productId": 50, "productName": "Id inventado"},
+    ]).json()
+    assert [r["status"] for r in report["results"]] == ["updated", "error", "created", "error"]
+    assert "FOREIGN KEY" in report["results"][1]["detail"]
+    # Sem linha criada com id explícito, o próximo produto segue a sequência
+    assert report["results"][2]["id"] == 4 and "productId=50" in report["results"][3]["detail"]
+    assert [r["title"] for r in client.get("/api/search", params={"q": "azul"}).json()] == ["Camisa azul"]
+
+
+def test_bulk_orders_only_update_orders_without_reservations(client, db):
+    db.add(Category(categoryName="Moda"))
+    db.add(Product(productName="Camisa", unitPrice=10, unitInStock=5, unitInOrder=0, categoryId=1))
+    db.commit()
+    order = {"itemQuantity": "1", "invoiceAmount": 10, "transactStatus": None, "paymentDate": None,
+             "buyerId": 1, "productId": 1}
+    legacy = client.post("/api/add/orders", json=order).json()
+    reserved = client.post("/api/checkout", json={"buyerId": 2, "productId": 1, "quantity": 2}).json()
+
+    report = client.post("/api/add/bulk/orders", json=[
+        {**order, "orderId": legacy["orderId"], "transactStatus": "paid"},
+        {**order, "orderId": reserved["orderId"], "transactStatus": "paid"},
+        order,
+    ]).json()
+    assert [r["status"] for r in report["results"]] == ["updated", "error", "invalid"]
+    assert "/api/checkout/2/confirm" in report["results"][1]["detail"]
+    assert client.get("/api/see/orders/buyer/2").json()[0]["transactStatus"] == "reserved"
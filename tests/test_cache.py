@@ -0,0 +1,105 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from shared.cache import MemoryBackend, RedisBackend, ResponseCache, ResponseCacheMiddleware, cached, response_cache
+from shared.pagination import NEXT_CURSOR_HEADER
+from src.utils.models import Address, Category, Country
+
+
+def test_memory_backend_lru_ttl_and_tags():
+    backend = MemoryBackend(max_entries=2)
+    entry = (200, [], b"[]")
+    backend.set("a", entry, 60, ["category"])
+    backend.set("b", entry, 60, ["address"])
+    backend.get("a")
+    backend.set("c", entry, 60, ["address"])
+    # "b" era a menos usada
+    assert backend.get("b") is None and backend.get("a") == entry
+
+    assert backend.invalidate(["address"]) == 1
+    assert backend.get("c") is None and backend.get("a") == entry
+
+    backend.set("d", entry, 0.01, [])
+    time.sleep(0.02)
+    assert backend.get("d") is None
+
+
+def test_categories_are_served_from_cache_until_a_write(client, db, query_counter):
+    db.add(Category(categoryName="Moda"))
+    db.commit()
+    # O primeiro pedido a uma rota que o worker ainda não conhecia não é guardado
+    client.get("/api/see/categories")
+
+    first = client.get("/api/see/categories")
+    hits = response_cache.hits
+    query_counter.clear()
+    second = client.get("/api/see/categories")
+    assert second.json() == first.json()
+    assert query_counter == []
+    assert response_cache.hits == hits + 1
+
+    client.put("/api/update/category/1", json={"categoryName": "Comida"})
+    names = [c["categoryName"] for c in client.get("/api/see/categories").json()]
+    assert names == ["Comida"]
+
+
+def test_cached_page_keeps_cursor_header(client, db):
+    db.add(Country(countryName="Angola"))
+    db.commit()
+    for i in range(3):
+        db.add(Address(distrit=f"Distrito {i}", countryId=1))
+    db.commit()
+
+    client.get("/api/see/addresses", params={"limit": 2})
+    first = client.get("/api/see/addresses", params={"limit": 2})
+    cached = client.get("/api/see/addresses", params={"limit": 2})
+    assert cached.headers[NEXT_CURSOR_HEADER] == first.headers[NEXT_CURSOR_HEADER]
+
+    client.delete("/api/delete/address/3")
+    assert NEXT_CURSOR_HEADER not in client.get("/api/see/addresses", params={"limit": 2}).headers
+    assert client.get("/health/cache").json()["backend"] == "MemoryBackend"
+
+
+def test_response_computed_across_an_invalidation_is_not_stored():
+    cache = ResponseCache(MemoryBackend())
+    state = {"version": 1, "write_during_read": False}
+    app = FastAPI()
+    app.add_middleware(ResponseCacheMiddleware, cache=cache)
+
+    @app.get("/items")
+    @cached("item")
+    async def items():
+        version = state["version"]
+        if state["write_during_read"]:
+            # Uma escrita faz commit e invalida depois de esta leitura ter visto os dados antigos
+            state["version"] += 1
+            await cache.ainvalidate("item")
+        return {"version": version}
+
+    client = TestClient(app)
+    client.get("/items")
+    state["write_during_read"] = True
+    assert client.get("/items").json() == {"version": 1}
+    assert cache.discarded == 1
+    state["write_during_read"] = False
+    assert client.get("/items").json() == {"version": 2}
+    assert client.get("/items").json() == {"version": 2} and cache.hits == 1
+
+
+def test_redis_backend_tags_and_generations():
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = RedisBackend(client=fakeredis.FakeRedis())
+    entry = (200, [(b"content-type", b"application/json")], "[\"Moda\"]".encode())
+
+    assert backend.set("a", entry, 60, ["category"], backend.generations(["category"]))
+    assert backend.get("a") == entry and len(backend) == 1
+
+    generations = backend.generations(["category"])
+    assert backend.invalidate(["category"]) == 1
+    assert backend.get("a") is None
+    # Gerações lidas antes da invalidação: a resposta antiga não é guardada
+    assert not backend.set("a", entry, 60, ["category"], generations)
+    assert backend.get("a") is None
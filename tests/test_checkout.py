@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from src.utils.models import Category, Order, Product, StockReservation
+from src.utils.reservations import ReservationReaper
+
+
+def _product(db, stock):
+    db.add(Category(categoryName="Moda"))
+    db.add(Product(productName="Camisa", unitPrice=10, unitInStock=stock, unitInOrder=0, categoryId=1))
+    db.commit()
+
+
+def _stock(db):
+    db.expire_all()
+    product = db.get(Product, 1)
+    return product.unitInStock, product.unitInOrder
+
+
+def test_checkout_reserves_confirms_and_cancels(client, db, query_counter):
+    _product(db, 3)
+
+    query_counter.clear()
+    order = client.post("/api/checkout", json={"buyerId": 1, "productId": 1, "quantity": 2}).json()
+    assert (order["transactStatus"], order["invoiceAmount"]) == ("reserved", 20)
+    assert len([s for s in query_counter if s.startswith("UPDATE product")]) == 1
+    assert _stock(db) == (1, 2)
+
+    response = client.post("/api/checkout", json={"buyerId": 2, "productId": 1, "quantity": 2})
+    assert response.status_code == 409
+    assert client.post("/api/checkout", json={"buyerId": 2, "productId": 9, "quantity": 1}).status_code == 404
+    assert _stock(db) == (1, 2)
+
+    assert client.post(f"/api/checkout/{order['orderId']}/cancel").json()["transactStatus"] == "cancelled"
+    assert _stock(db) == (3, 0)
+    assert client.post(f"/api/checkout/{order['orderId']}/confirm").status_code == 409
+
+    order = client.post("/api/checkout", json={"buyerId": 2, "productId": 1, "quantity": 3}).json()
+    paid = client.post(f"/api/checkout/{order['orderId']}/confirm").json()
+    assert paid["transactStatus"] == "paid" and paid["paymentDate"] is not None
+    assert _stock(db) == (0, 0)
+
+
+def test_expired_reservations_return_to_stock(client, db, async_engine):
+    _product(db, 5)
+    kept = client.post("/api/checkout", json={"buyerId": 1, "productId": 1, "quantity": 1}).json()
+    expired = client.post("/api/checkout", json={"buyerId": 2, "productId": 1, "quantity": 3}).json()
+    db.execute(update(StockReservation).where(StockReservation.orderId == expired["orderId"])
+               .values(expiresAt=datetime.now(timezone.utc) - timedelta(seconds=1)))
+    db.commit()
+
+    assert asyncio.run(ReservationReaper(async_engine).run_once()) == 1
+    assert _stock(db) == (4, 1)
+    assert db.get(Order, expired["orderId"]).transactStatus == "expired"
+    assert db.get(Order, kept["orderId"]).transactStatus == "reserved"
+
+    # Apagar um pedido reservado também devolve as unidades
+    client.delete(f"/api/delete/orders/{kept['orderId']}")
+    assert _stock(db) == (5, 0)
+
+
+def test_cart_checkout_prices_lines_on_the_server(client, db, query_counter):
+    db.add(Category(categoryName="Moda"))
+    for name, price, stock in (("Camisa", 10, 5), ("Calças", 24.5, 5), ("Boné", 7.25, 1), ("Sem preço", None, 5)):
+        db.add(Product(productName=name, unitPrice=price, unitInStock=stock, unitInOrder=0, categoryId=1))
+    db.commit()
+
+    query_counter.clear()
+    order = client.post("/api/checkout/cart", json={"buyerId": 1, "lines": [
+        {"productId": 1, "quantity": 2}, {"productId": 2, "quantity": 1},
+        {"productId": 3, "quantity": 1}, {"productId": 1, "quantity": 1},
+    ]}).json()
+    assert (order["invoiceAmount"], order["totalQuantity"], order["itemQuantity"]) == (61.75, 5, "5")
+    assert [(line["productId"], line["quantity"], line["lineTotal"]) for line in order["lines"]] == \
+        [(1, 3, 30), (2, 1, 24.5), (3, 1, 7.25)]
+    assert [s.split()[0] for s in query_counter if not s.startswith(("SELECT", "BEGIN"))] == \
+        ["UPDATE", "INSERT", "INSERT", "INSERT"]
+    assert [line["productId"] for line in client.get(f"/api/see/orders/{order['orderId']}/lines").json()] == [1, 2, 3]
+
+    # Um produto sem stock (ou sem preço) recusa o carrinho inteiro
+    response = client.post("/api/checkout/cart", json={"buyerId": 2, "lines": [
+        {"productId": 2, "quantity": 1}, {"productId": 3, "quantity": 1}, {"productId": 4, "quantity": 1},
+    ]})
+    assert response.status_code == 409 and "[3, 4]" in response.json()["detail"]
+    assert _stock(db) == (2, 3)
+    assert db.get(Product, 2).unitInStock == 4
+
+    client.post(f"/api/checkout/{order['orderId']}/cancel")
+    db.expire_all()
+    assert [db.get(Product, i).unitInStock for i in (1, 2, 3)] == [5, 5, 1]
+
+
+def test_reserved_order_status_only_changes_through_checkout(client, db):
+    _product(db, 3)
+    order = client.post("/api/checkout", json={"buyerId": 1, "productId": 1, "quantity": 2}).json()
+    body = {"itemQuantity": "2", "invoiceAmount": 20, "transactStatus": "paid", "buyerId": 1, "productId": 1}
+
+    response = client.put(f"/api/update/orders/{order['orderId']}", json=body)
+    assert response.status_code == 409 and "/confirm" in response.json()["detail"]
+    assert db.get(Order, order["orderId"]).transactStatus == "reserved"
+    # Outros campos continuam editáveis
+    assert client.put(f"/api/update/orders/{order['orderId']}", json={**body, "transactStatus": "reserved"}).status_code == 200
+
+    client.post(f"/api/checkout/{order['orderId']}/confirm")
+    assert client.put(f"/api/update/orders/{order['orderId']}", json={**body, "transactStatus": "shipped"}).status_code == 200
+    assert _stock(db) == (1, 0)
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone
+
+from shared.pagination import NEXT_CURSOR_HEADER
+from src.utils.models import Comment, CommentReply, User
+
+
+def _seed(db, comments=4, replies=5):
+    for i in range(3):
+        db.add(User(userFirstName=f"U{i}", userLastName="T", userEmail=f"u{i}@gmail.com", userType="Buyer", password="x"))
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for c in range(comments):
+        db.add(Comment(userId=1, commentDescription=f"c{c}", createdAt=start + timedelta(hours=c)))
+    db.commit()
+    for c in range(1, comments + 1):
+        for r in range(replies if c == 1 else 1):
+            db.add(CommentReply(commentId=c, userId=2 + r % 2, commentDescription=f"r{c}.{r}",
+                                createdAt=start + timedelta(hours=c, minutes=r)))
+    db.commit()
+
+
+def test_thread_page_uses_two_queries(client, db, query_counter):
+    _seed(db)
+    query_counter.clear()
+    response = client.get("/api/see/comments/thread", params={"limit": 3, "replies": 2})
+    selects = [s for s in query_counter if s.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 2
+
+    threads = response.json()
+    assert [t["commentDescription"] for t in threads] == ["c0", "c1", "c2"]
+    first = threads[0]
+    assert first["userFirstName"] == "U0" and first["replyCount"] == 5
+    assert [(r["commentDescription"], r["userFirstName"]) for r in first["replies"]] == [("r1.0", "U1"), ("r1.1", "U2")]
+    assert threads[1]["replyCount"] == 1 and threads[1]["moreRepliesCursor"] is None
+    assert NEXT_CURSOR_HEADER in response.headers
+
+    more = client.get("/api/see/comment/1/replies", params={"cursor": first["moreRepliesCursor"], "limit": 2})
+    assert [r["commentDescription"] for r in more.json()] == ["r1.2", "r1.3"]
+    rest = client.get("/api/see/comment/1/replies", params={"cursor": more.headers[NEXT_CURSOR_HEADER]})
+    assert [r["commentDescription"] for r in rest.json()] == ["r1.4"]
+
+
+def test_thread_last_page(client, db):
+    _seed(db)
+    first = client.get("/api/see/comments/thread", params={"limit": 3})
+    last = client.get("/api/see/comments/thread", params={"limit": 3, "cursor": first.headers[NEXT_CURSOR_HEADER]})
+    assert [t["commentDescription"] for t in last.json()] == ["c3"]
+    assert NEXT_CURSOR_HEADER not in last.headers
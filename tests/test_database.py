@@ -0,0 +1,49 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from shared import database
+from shared.database import MeteredQueuePool, instrument, sync_pool_metrics
+
+
+def test_metered_pool_reports_usage_and_timeouts(database_path):
+    engine = create_engine(f"sqlite:///{database_path}", poolclass=MeteredQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    before = sync_pool_metrics.snapshot(engine.pool)
+
+    with engine.connect():
+        busy = sync_pool_metrics.snapshot(engine.pool)
+        assert (busy["checkedOut"], busy["idle"]) == (1, 0)
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    after = sync_pool_metrics.snapshot(engine.pool)
+    assert after["checkouts"] - before["checkouts"] == 2
+    assert after["timeouts"] - before["timeouts"] == 1
+    assert after["maxWaitMs"] >= 50
+    assert (after["checkedOut"], after["idle"]) == (0, 1)
+    engine.dispose()
+
+
+def test_only_slow_queries_are_logged(database_path, monkeypatch, caplog):
+    engine = create_engine(f"sqlite:///{database_path}")
+    instrument(engine)
+    caplog.set_level(logging.INFO, logger=database.logger.name)
+
+    monkeypatch.setattr(database, "SQL_SLOW_QUERY_MS", 10_000)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert not caplog.records
+
+    monkeypatch.setattr(database, "SQL_SLOW_QUERY_MS", 0)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 2"))
+    assert "Consulta lenta" in caplog.records[-1].getMessage()
+    engine.dispose()
+
+
+def test_pool_endpoint(client):
+    body = client.get("/health/pool").json()
+    assert set(body) == {"sync", "async"}
+    assert "avgWaitMs" in body["sync"]
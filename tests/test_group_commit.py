@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+
+from src.utils.groupCommit import GroupCommitQueue
+from src.utils.models import Order
+
+
+def test_group_commit_coalesces_and_returns_each_result(db, async_engine, query_counter):
+    db.add(Order(orderId=1, itemQuantity="1"))
+    db.commit()
+    queue = GroupCommitQueue(Order, async_engine, delay=0.05, max_rows=10)
+
+    async def go():
+        queue.start()
+        rows = [Order(buyerId=i, itemQuantity="1") for i in range(24)]
+        rows[5] = Order(orderId=1, itemQuantity="duplicado")
+        results = await asyncio.gather(*(queue.add(row) for row in rows), return_exceptions=True)
+        await queue.stop()
+        return rows, results
+
+    query_counter.clear()
+    rows, results = asyncio.run(go())
+    assert isinstance(results[5], IntegrityError)
+    saved = [row for i, row in enumerate(rows) if i != 5]
+    assert all(results[i] is row for i, row in enumerate(rows) if i != 5)
+    assert sorted(row.orderId for row in saved) == list(range(2, 25))
+    stored = db.exec(select(Order.orderId, Order.buyerId).where(Order.orderId > 1)).all()
+    assert dict(stored) == {row.orderId: row.buyerId for row in saved}
+    # 24 pedidos em lotes de 10: 3 transações
+    assert (queue.batches, queue.rows, queue.failed) == (3, 23, 1)
+    assert len([s for s in query_counter if s == "COMMIT"]) <= 3
+
+
+def test_group_commit_writes_directly_when_stopped(async_engine):
+    queue = GroupCommitQueue(Order, async_engine)
+    order = asyncio.run(queue.add(Order(itemQuantity="2")))
+    assert order.orderId == 1 and queue.batches == 1
+    with pytest.raises(IntegrityError):
+        asyncio.run(queue.add(Order(orderId=1)))
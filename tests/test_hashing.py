@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import select
+
+from shared.hashing import PasswordHasher, build_context
+from src.utils.models import User
+
+
+def test_legacy_hash_is_upgraded_on_verify():
+    legacy_hash = build_context(rounds=1000).hash("segredo")
+    hasher = PasswordHasher(build_context(rounds=2000), workers=1)
+
+    ok, new_hash = asyncio.run(hasher.verify("segredo", legacy_hash))
+    assert ok and new_hash and "$2000$" in new_hash
+
+    ok, new_hash = asyncio.run(hasher.verify("segredo", new_hash))
+    assert ok and new_hash is None
+    assert asyncio.run(hasher.verify("errada", legacy_hash)) == (False, None)
+
+
+def test_queue_limit_rejects_excess_work():
+    release = threading.Event()
+
+    class SlowContext:
+        def hash(self, password):
+            release.wait(5)
+            return password
+
+    hasher = PasswordHasher(SlowContext(), workers=1, queue_limit=2)
+
+    async def scenario():
+        first = asyncio.create_task(hasher.hash("a"))
+        second = asyncio.create_task(hasher.hash("b"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as error:
+            await hasher.hash("c")
+        release.set()
+        return error.value.status_code, await asyncio.gather(first, second)
+
+    status, results = asyncio.run(scenario())
+    assert status == 503
+    assert results == ["a", "b"]
+    assert hasher.pending == 0
+
+
+def test_signup_hashes_once_and_login_works(client, db):
+    payload = {"userFirstName": "Ana", "userLastName": "Silva", "userEmail": "ana@gmail.com",
+               "userType": "Buyer", "password": "segredo", "userGender": None, "userPhoneNumber": None,
+               "userImage": None, "companyName": None, "dateOfBirth": None, "description": None}
+    assert client.post("/api/add/user", json=payload).status_code == 201
+
+    stored = db.exec(select(User).where(User.userEmail == "ana@gmail.com")).one().password
+    assert build_context().verify("segredo", stored)
+
+    response = client.post("/api/user/login", json={"userEmail": "ana@gmail.com", "password": "segredo"})
+    assert response.status_code == 200
+    assert response.json()["accessToken"]
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+from sqlmodel import Session
+
+from shared.security import create_access_token
+from src.routers import user
+from src.utils.likes import LikeCounter, like_counter
+from src.utils.models import Comment, CommentReply, User
+
+
+def _seed(db):
+    for i in range(3):
+        db.add(User(userFirstName=f"U{i}", userLastName="T", userEmail=f"u{i}@gmail.com", userType="Buyer", password="x"))
+    db.add(Comment(userId=1, commentDescription="Olá"))
+    db.commit()
+    db.add(CommentReply(commentId=1, userId=2, commentDescription="Olá também"))
+    db.commit()
+
+
+def _as(user_id):
+    return {"Authorization": f"Bearer {create_access_token(user_id)}"}
+
+
+def _flush(async_engine):
+    engine, like_counter.engine = like_counter.engine, async_engine
+    try:
+        asyncio.run(like_counter.flush())
+    finally:
+        like_counter.engine = engine
+
+
+def test_likes_are_deduplicated_and_flushed_in_batch(client, db, engine, async_engine, query_counter):
+    _seed(db)
+    for user_id in (1, 2, 3, 3):
+        client.post("/api/add/comment/1/like", headers=_as(user_id))
+    client.post("/api/add/commentReply/1/like", headers=_as(1))
+    assert client.delete("/api/delete/comment/1/like", headers=_as(2)).status_code == 200
+    assert client.delete("/api/delete/comment/1/like", headers=_as(2)).status_code == 404
+    assert client.post("/api/add/comment/99/like", headers=_as(1)).status_code == 404
+    assert client.post("/api/add/comment/1/like", headers=_as(99)).status_code == 404
+    assert client.post("/api/add/comment/1/like").status_code == 401
+
+    # Ainda não escrito, mas já visível nas leituras deste processo
+    assert client.get("/api/see/comment/1").json()["totalLikes"] == 2
+    with Session(engine) as session:
+        assert session.get(Comment, 1).totalLikes == 0
+
+    query_counter.clear()
+    _flush(async_engine)
+    assert len([s for s in query_counter if s.lstrip().upper().startswith("UPDATE")]) == 2
+    with Session(engine) as session:
+        assert session.get(Comment, 1).totalLikes == 2
+        assert session.get(CommentReply, 1).totalLikes == 1
+    assert client.get("/api/see/comment/1").json()["totalLikes"] == 2
+
+
+def test_deleting_a_user_discounts_their_likes(client, db, engine, async_engine):
+    _seed(db)
+    for user_id in (1, 3):
+        client.post("/api/add/comment/1/like", headers=_as(user_id))
+    client.post("/api/add/commentReply/1/like", headers=_as(3))
+    _flush(async_engine)
+
+    assert client.delete("/api/delete/user/3").status_code == 204
+    assert client.get("/api/see/comment/1").json()["totalLikes"] == 1
+    _flush(async_engine)
+    with Session(engine) as session:
+        assert session.get(Comment, 1).totalLikes == 1
+        assert session.get(CommentReply, 1).totalLikes == 0
+
+
+def test_failed_flush_keeps_pending_likes(async_engine):
+    counter = LikeCounter(engine=async_engine)
+    counter.add("comment", 1, 1)
+    counter.add("comment", 1, 1)
+    counter.add("reply", 2, 1)
+    counter.add("reply", 2, -1)
+    assert counter.stats()["pendingTargets"] == 1
+
+    async def broken():
+        counter.engine = None
+        try:
+            await counter.flush()
+        except Exception:
+            pass
+
+    asyncio.run(broken())
+    assert counter.pending("comment", 1) == 2
+
+
+def test_failed_user_deletion_keeps_like_counts(client, db, monkeypatch):
+    _seed(db)
+    client.post("/api/add/comment/1/like", headers=_as(3))
+    pending = like_counter.pending("comment", 1)
+
+    async def broken(db, user_id):
+        raise RuntimeError("falha a meio da remoção")
+
+    monkeypatch.setattr(user, "aunindex_seller", broken)
+    with pytest.raises(RuntimeError):
+        client.delete("/api/delete/user/3")
+    assert like_counter.pending("comment", 1) == pending
+
+
+def test_deltas_of_a_stopped_worker_are_applied_by_another(client, db, engine, async_engine):
+    _seed(db)
+    for user_id in (1, 2):
+        client.post("/api/add/comment/1/like", headers=_as(user_id))
+    # O worker parou antes do flush: o dicionário em memória perdeu-se, likedelta não
+    like_counter._pending.clear()
+
+    recent = LikeCounter(engine=async_engine)
+    assert asyncio.run(recent.flush()) == 0
+    assert asyncio.run(LikeCounter(engine=async_engine, orphan_after=0).flush()) == 1
+    with Session(engine) as session:
+        assert session.get(Comment, 1).totalLikes == 2
+    assert asyncio.run(LikeCounter(engine=async_engine, orphan_after=0).flush()) == 0
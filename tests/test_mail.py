@@ -0,0 +1,51 @@
+from email.mime.text import MIMEText
+
+import pytest
+
+from shared.mail import SMTPPool
+from shared.smtp_sink import SMTPSink
+
+
+def message(to: str, subject: str = "Olá") -> MIMEText:
+    msg = MIMEText("corpo")
+    msg['From'] = "loja@procuraaqui.ao"
+    msg['To'] = to
+    msg['Subject'] = subject
+    return msg
+
+
+@pytest.fixture
+def smtp_sink():
+    with SMTPSink() as sink:
+        yield sink
+
+
+@pytest.fixture
+def pool(smtp_sink):
+    pool = SMTPPool(smtp_sink.hostname, smtp_sink.port, password="", starttls=False, size=2, idle_seconds=5)
+    yield pool
+    pool.close(timeout=5)
+
+
+def test_pool_reuses_connections(pool, smtp_sink):
+    futures = [pool.submit(message(f"cliente{i}@gmail.com", f"m{i}")) for i in range(30)]
+    for future in futures:
+        future.result(timeout=5)
+
+    assert sorted(m['Subject'] for m in smtp_sink.messages) == sorted(f"m{i}" for i in range(30))
+    assert pool.stats()["connectionsOpened"] <= 2
+    assert smtp_sink.handler.sessions <= 2
+
+
+def test_pool_reconnects_after_server_restart():
+    first = SMTPSink().start()
+    pool = SMTPPool(first.hostname, first.port, password="", starttls=False, size=1)
+    try:
+        pool.submit(message("a@gmail.com")).result(timeout=5)
+        first.stop()
+        with SMTPSink(port=first.port) as restarted:
+            pool.submit(message("b@gmail.com")).result(timeout=5)
+            assert [m['To'] for m in restarted.messages] == ["b@gmail.com"]
+    finally:
+        pool.close(timeout=5)
+    assert pool.stats()["connectionsOpened"] == 2
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+from sqlmodel import SQLModel
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _upgrade(url: str):
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+
+def _indexes(engine, table):
+    return {index["name"]: index["column_names"] for index in inspect(engine).get_indexes(table)}
+
+
+def test_upgrade_updates_tables_created_before_the_change(tmp_path):
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text(
+            'CREATE TABLE commentreply ("commentReplyId" INTEGER PRIMARY KEY, "commentId" INTEGER, "createdAt" DATETIME)'
+        ))
+        connection.execute(text('CREATE INDEX idx_comment_reply_comment ON commentreply ("commentId")'))
+        connection.execute(text('CREATE TABLE user ("userId" INTEGER PRIMARY KEY)'))
+        connection.execute(text('CREATE TABLE product ("productId" INTEGER PRIMARY KEY, "productName" VARCHAR)'))
+        connection.execute(text('CREATE TABLE "order" ("orderId" INTEGER PRIMARY KEY, "productId" INTEGER)'))
+        connection.execute(text('INSERT INTO product ("productName") VALUES (\'Camisa\')'))
+
+    _upgrade(url)
+    assert _indexes(engine, "commentreply")["idx_comment_reply_comment"] == ["commentId", "createdAt"]
+    assert "sellerId" in {column["name"] for column in inspect(engine).get_columns("product")}
+    assert _indexes(engine, "product")["idx_product_seller"] == ["sellerId"]
+    assert _indexes(engine, "order")["idx_order_seller"] == ["sellerId"]
+    with engine.connect() as connection:
+        assert connection.execute(text('SELECT "productName", "sellerId" FROM product')).all() == [("Camisa", None)]
+
+
+def test_upgrade_is_a_no_op_on_a_fresh_schema(tmp_path):
+    url = f"sqlite:///{tmp_path / 'fresh.db'}"
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    before = {table: _indexes(engine, table) for table in inspect(engine).get_table_names()}
+
+    _upgrade(url)
+    assert {table: _indexes(engine, table) for table in inspect(engine).get_table_names()
+            if table != "alembic_version"} == before
@@ -0,0 +1,66 @@
+import asyncio
+import socket
+from datetime import datetime, timezone
+
+import pytest
+from sqlmodel import select
+
+from shared.mail import SMTPPool
+from shared.smtp_sink import SMTPSink
+from src.utils.models import EmailOutbox, User, VerificationCode
+from src.utils.outbox import OutboxDispatcher
+
+
+@pytest.fixture
+def smtp_sink():
+    with SMTPSink() as sink:
+        yield sink
+
+
+def dispatcher_for(async_engine, host, port, **kwargs) -> OutboxDispatcher:
+    return OutboxDispatcher(async_engine, SMTPPool(host, port, password="", starttls=False, size=1), **kwargs)
+
+
+def test_send_code_writes_outbox_in_same_transaction(client, db, async_engine, smtp_sink):
+    db.add(User(userFirstName="Ana", userLastName="Silva", userEmail="ana@gmail.com", userType="Buyer", password="x"))
+    db.commit()
+
+    response = client.post("/api/send-code/", json={"email": "ana@gmail.com"})
+    assert response.status_code == 200
+    assert db.exec(select(VerificationCode)).one().code == response.json()["code"]
+    entry = db.exec(select(EmailOutbox)).one()
+    assert (entry.recipients, entry.status) == ("ana@gmail.com", "pending")
+    assert smtp_sink.messages == []
+
+    dispatcher = dispatcher_for(async_engine, smtp_sink.hostname, smtp_sink.port)
+    assert asyncio.run(dispatcher.run_once()) == 1
+    dispatcher.sender.close(timeout=5)
+
+    db.refresh(entry)
+    assert entry.status == "sent" and entry.sentAt is not None
+    assert str(response.json()["code"]) in smtp_sink.messages[0].get_payload(decode=True).decode()
+
+
+def test_failed_send_is_retried_with_backoff(client, db, async_engine):
+    client.post("/api/send_email/", json={"subject": "Olá", "message": "teste", "recipients": ["b@gmail.com"]})
+
+    # Porta sem servidor: o envio falha e a linha fica agendada para mais tarde
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    failing = dispatcher_for(async_engine, "127.0.0.1", port, max_attempts=2)
+    assert asyncio.run(failing.run_once()) == 1
+    failing.sender.close(timeout=5)
+
+    entry = db.exec(select(EmailOutbox)).one()
+    assert entry.status == "pending" and entry.attempts == 1 and entry.lastError
+    assert entry.nextAttemptAt.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)
+    # Ainda não está vencida: não é reclamada de novo
+    assert asyncio.run(failing.run_once()) == 0
+
+    entry.nextAttemptAt = datetime.now(timezone.utc)
+    db.add(entry)
+    db.commit()
+    asyncio.run(failing.run_once())
+    db.refresh(entry)
+    assert entry.status == "failed" and entry.attempts == 2
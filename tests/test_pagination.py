@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+
+from shared.pagination import NEXT_CURSOR_HEADER
+from src.utils.models import Category, Comment, User
+
+
+def _walk(client, url, limit):
+    items, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        items.extend(response.json())
+        pages += 1
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return items, pages
+
+
+def test_categories_keyset_pages(client, db):
+    for i in range(7):
+        db.add(Category(categoryName=f"Categoria {i}"))
+    db.commit()
+
+    items, pages = _walk(client, "/api/see/categories", limit=3)
+    assert [c["categoryId"] for c in items] == list(range(1, 8))
+    assert pages == 3
+
+
+def test_comments_paginate_on_created_at(client, db):
+    db.add(User(userFirstName="A", userLastName="B", userEmail="a@gmail.com", userType="Buyer", password="x"))
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    # createdAt repetido garante que o desempate pela chave primária funciona
+    for i in range(5):
+        db.add(Comment(userId=1, commentDescription=f"c{i}", createdAt=start + timedelta(minutes=i // 2)))
+    db.commit()
+
+    items, _ = _walk(client, "/api/see/comments", limit=2)
+    assert [c["commentDescription"] for c in items] == ["c0", "c1", "c2", "c3", "c4"]
+    assert items[0]["userEmail"] == "a@gmail.com"
+
+
+def test_stream_returns_every_row(client, db):
+    for i in range(12):
+        db.add(Category(categoryName=f"Categoria {i}"))
+    db.commit()
+
+    response = client.get("/api/see/categories", params={"stream": True, "limit": 1})
+    assert response.headers["content-type"] == "application/json"
+    assert len(response.json()) == 12
+
+
+def test_invalid_cursor_and_limit_cap(client):
+    assert client.get("/api/see/addresses", params={"cursor": "nao-e-cursor"}).status_code == 400
+    assert client.get("/api/see/addresses", params={"limit": 100000}).status_code == 422
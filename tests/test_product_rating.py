@@ -0,0 +1,58 @@
+from sqlmodel import Session
+
+from src.utils.models import Category, Product, ProductRatingSummary, User
+from src.utils.ratingSummary import backfill_product_summaries
+
+
+def _catalog(db):
+    db.add(Category(categoryName="Roupa"))
+    db.add(Category(categoryName="Livros"))
+    for email in ["a@gmail.com", "b@gmail.com", "c@gmail.com"]:
+        db.add(User(userFirstName="Teste", userLastName="Teste", userEmail=email, userType="Buyer", password="x"))
+    db.commit()
+    for name, category_id in [("Camisa", 1), ("Casaco", 1), ("Romance", 2)]:
+        db.add(Product(productName=name, categoryId=category_id, unitPrice=10.0))
+    db.commit()
+
+
+def _summary(engine, product_id=1):
+    with Session(engine) as session:
+        return session.get(ProductRatingSummary, product_id)
+
+
+def test_summary_follows_review_writes(client, db, engine):
+    _catalog(db)
+    assert client.post("/api/add/productReviews", json={"productId": 1, "customerId": 1, "rating": 4}).status_code == 201
+    client.post("/api/add/productReviews", json={"productId": 1, "customerId": 2, "rating": 2})
+    assert client.post("/api/add/productReviews", json={"productId": 1, "customerId": 2, "rating": 5}).status_code == 400
+    assert client.post("/api/add/productReviews", json={"productId": 9, "customerId": 1, "rating": 5}).status_code == 404
+
+    summary = _summary(engine)
+    assert (summary.ratingCount, summary.ratingSum, summary.ratingAverage, summary.categoryId) == (2, 6, 3.0, 1)
+
+    client.put("/api/update/productReview/1", params={"rating": 5})
+    client.delete("/api/delete/productReview/2")
+    rating = client.get("/api/see/products/1/rating").json()
+    assert (rating["ratingCount"], rating["ratingAverage"]) == (1, 5.0)
+    assert rating["histogram"] == {"1": 0, "2": 0, "3": 0, "4": 0, "5": 1}
+    assert client.get("/api/see/products/3/rating").json()["ratingCount"] == 0
+
+
+def test_top_rated_by_category(client, db, engine):
+    _catalog(db)
+    for product_id, customer_id, rating in [(1, 1, 3), (2, 1, 5), (2, 2, 4), (3, 1, 5)]:
+        client.post("/api/add/productReviews", json={"productId": product_id, "customerId": customer_id, "rating": rating})
+
+    top = client.get("/api/see/products/top").json()
+    assert [product["productId"] for product in top] == [3, 2, 1]
+    top = client.get("/api/see/products/top", params={"category_id": 1}).json()
+    assert [(product["productName"], product["ratingAverage"]) for product in top] == [("Casaco", 4.5), ("Camisa", 3.0)]
+    assert [p["productId"] for p in client.get("/api/see/products/top", params={"min_ratings": 2}).json()] == [2]
+
+    page = client.get("/api/see/products/top", params={"limit": 2})
+    following = client.get("/api/see/products/top", params={"limit": 2, "cursor": page.headers["X-Next-Cursor"]})
+    assert [product["productId"] for product in following.json()] == [1]
+
+    incremental = _summary(engine, 2).model_dump(exclude={"updatedAt"})
+    backfill_product_summaries(db, force=True)
+    assert _summary(engine, 2).model_dump(exclude={"updatedAt"}) == incremental
@@ -0,0 +1,89 @@
+from datetime import datetime, timezone
+
+from sqlmodel import select
+
+from src.utils.models import Category, Product, SalesDaily
+from src.utils.sales import backfill_sales
+
+
+def _sales(db):
+    db.expire_all()
+    rows = db.exec(select(SalesDaily).where(SalesDaily.orderCount != 0)).all()
+    return sorted((r.sellerId, r.productId, r.orderCount, r.units, round(r.revenue, 2)) for r in rows)
+
+
+def test_sales_rollup_follows_order_writes(client, db):
+    db.add(Category(categoryName="Moda"))
+    db.add(Category(categoryName="Casa"))
+    for name, price, category_id, seller_id in (("Camisa", 10, 1, 7), ("Vaso", 25, 2, 7), ("Boné", 5, 1, 8)):
+        db.add(Product(productName=name, unitPrice=price, unitInStock=100, unitInOrder=0, categoryId=category_id,
+                       sellerId=seller_id))
+    db.commit()
+
+    order = {"itemQuantity": "2", "invoiceAmount": 20, "transactStatus": None, "paymentDate": None,
+             "buyerId": 1, "productId": 1}
+    legacy = client.post("/api/add/orders", json=order).json()
+    cart = client.post("/api/checkout/cart", json={"buyerId": 2, "lines": [
+        {"productId": 1, "quantity": 1}, {"productId": 2, "quantity": 3},
+    ]}).json()
+    assert _sales(db) == [(7, 1, 2, 3, 30), (7, 2, 1, 3, 75)]
+
+    today = datetime.now(timezone.utc).date().isoformat()
+    report = client.get("/api/analytics/sales/7", params={"group_by": "category"}).json()
+    assert report["totals"] == {"orderCount": 3, "units": 6, "revenue": 105}
+    assert [(r["categoryName"], r["revenue"]) for r in report["rows"]] == [("Casa", 75), ("Moda", 30)]
+    by_day = client.get("/api/analytics/sales/7", params={"start": today, "end": today}).json()["rows"]
+    assert by_day == [{"day": today, "orderCount": 3, "units": 6, "revenue": 105}]
+    assert client.get("/api/analytics/sales/7", params={"start": today, "end": "2000-01-01"}).status_code == 400
+
+    client.post(f"/api/checkout/{cart['orderId']}/cancel")
+    assert _sales(db) == [(7, 1, 1, 2, 20)]
+
+    client.put(f"/api/update/orders/{legacy['orderId']}", json={**order, "productId": 3})
+    assert _sales(db) == [(8, 3, 1, 2, 20)]
+    by_product = client.get("/api/analytics/sales/8", params={"group_by": "product"}).json()["rows"]
+    assert by_product == [{"productId": 3, "productName": "Boné", "orderCount": 1, "units": 2, "revenue": 20}]
+
+    client.post("/api/checkout/cart", json={"buyerId": 3, "lines": [{"productId": 2, "quantity": 1}]})
+    incremental = _sales(db)
+    backfill_sales(db, force=True)
+    assert _sales(db) == incremental
+
+    client.delete(f"/api/delete/orders/{legacy['orderId']}")
+    assert _sales(db) == [(7, 2, 1, 1, 25)]
+
+
+def test_bulk_order_updates_move_sales(client, db):
+    db.add(Category(categoryName="Moda"))
+    db.add(Product(productName="Camisa", unitPrice=10, categoryId=1, sellerId=7))
+    db.add(Product(productName="Boné", unitPrice=5, categoryId=1, sellerId=8))
+    db.commit()
+    order = {"itemQuantity": "1", "invoiceAmount": 10, "transactStatus": None, "paymentDate": None, "buyerId": 1}
+
+    for _ in range(2):
+        client.post("/api/add/orders", json={**order, "productId": 1})
+    assert _sales(db) == [(7, 1, 2, 2, 20)]
+    report = client.post("/api/add/bulk/orders", json=[{**order, "orderId": 2, "productId": 2, "invoiceAmount": 5}])
+    assert report.json()["updated"] == 1
+    assert _sales(db) == [(7, 1, 1, 1, 10), (8, 2, 1, 1, 5)]
+
+
+def test_sales_stay_with_the_seller_they_were_recorded_for(client, db):
+    db.add(Category(categoryName="Moda"))
+    db.add(Product(productName="Camisa", unitPrice=10, unitInStock=10, unitInOrder=0, categoryId=1, sellerId=7))
+    db.commit()
+    order = {"itemQuantity": "1", "invoiceAmount": 10, "transactStatus": None, "paymentDate": None,
+             "buyerId": 1, "productId": 1}
+    legacy = client.post("/api/add/orders", json=order).json()
+    cart = client.post("/api/checkout/cart", json={"buyerId": 2, "lines": [{"productId": 1, "quantity": 2}]}).json()
+    assert _sales(db) == [(7, 1, 2, 3, 30)]
+
+    product = {"productId": 1, "productName": "Camisa", "productDescription": None, "quantity": None, "unitPrice": 10,
+               "unitInStock": 7, "picture": None, "categoryId": 1, "sellerId": 8}
+    assert client.post("/api/add/bulk/products", json=[product]).json()["updated"] == 1
+    client.post(f"/api/checkout/{cart['orderId']}/cancel")
+    client.delete(f"/api/delete/orders/{legacy['orderId']}")
+    assert _sales(db) == []
+
+    client.post("/api/add/orders", json=order)
+    assert _sales(db) == [(8, 1, 1, 1, 10)]
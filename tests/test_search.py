@@ -0,0 +1,50 @@
+from shared.pagination import NEXT_CURSOR_HEADER
+from src.utils.models import Category, Product, User
+from src.utils.searchIndex import rebuild_search_index
+
+
+def _seed(db):
+    db.add(Category(categoryName="Eletrónica"))
+    db.add(Category(categoryName="Moda"))
+    db.commit()
+    db.add(Product(productName="Telemóvel Samsung", productDescription="Ecrã de 6 polegadas", categoryId=1))
+    db.add(Product(productName="Capa para telemóvel", productDescription="Silicone", categoryId=2))
+    db.add(Product(productName="Sapatos", productDescription="Couro, ideais para o telemóvel caber no bolso", categoryId=2))
+    db.add(User(userFirstName="Ana", userLastName="Silva", userEmail="ana@example.com", userType="Seller",
+                password="x", companyName="Loja do Telemóvel", description="Reparações", categoryId=1))
+    db.commit()
+    rebuild_search_index(db)
+
+
+def test_search_ranks_titles_first_and_filters(client, db):
+    _seed(db)
+    results = client.get("/api/search", params={"q": "telemovel"}).json()
+    assert [r["title"] for r in results][-1] == "Sapatos"
+    assert {r["type"] for r in results} == {"product", "seller"}
+    assert results == sorted(results, key=lambda r: r["score"], reverse=True)
+
+    sellers = client.get("/api/search", params={"q": "telem", "user_type": "Seller"}).json()
+    assert [(r["type"], r["title"]) for r in sellers] == [("seller", "Loja do Telemóvel")]
+    moda = client.get("/api/search", params={"q": "moda", "kind": "product"}).json()
+    assert {r["title"] for r in moda} == {"Capa para telemóvel", "Sapatos"}
+    assert client.get("/api/search", params={"q": "!!"}).status_code == 400
+
+
+def test_search_cursor_and_index_maintenance(client, db):
+    _seed(db)
+    first = client.get("/api/search", params={"q": "telemovel", "limit": 2})
+    second = client.get("/api/search", params={"q": "telemovel", "limit": 2,
+                                                "cursor": first.headers[NEXT_CURSOR_HEADER]})
+    assert NEXT_CURSOR_HEADER not in second.headers
+    assert len(first.json()) + len(second.json()) == 4
+
+    client.put("/api/update/category/2", json={"categoryName": "Acessórios"})
+    assert client.get("/api/search", params={"q": "moda"}).json() == []
+    assert len(client.get("/api/search", params={"q": "acessorios"}).json()) == 2
+
+    client.post("/api/add/products/", json={"productName": "Tablet", "productDescription": None, "quantity": 1,
+                                            "unitPrice": 10, "unitInStock": 1, "picture": None, "categoryId": 1})
+    assert [r["title"] for r in client.get("/api/search", params={"q": "tablet"}).json()] == ["Tablet"]
+
+    client.delete("/api/delete/user/1")
+    assert client.get("/api/search", params={"q": "loja"}).json() == []
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+
+from shared import security
+from shared.security import Principal, TokenCache, create_access_token
+from src.utils.models import User
+
+
+def _principal(token: str, expires_in: timedelta = timedelta(minutes=5)) -> Principal:
+    return Principal(userId=1, token=token, expiresAt=datetime.now(timezone.utc) + expires_in)
+
+
+def test_token_cache_is_lru_and_honours_exp():
+    cache = TokenCache(maxsize=2)
+    cache.put(_principal("a"))
+    cache.put(_principal("b"))
+    assert cache.get("a") is not None
+    cache.put(_principal("c"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+    cache.put(_principal("expired", expires_in=timedelta(seconds=-1)))
+    assert cache.get("expired") is None
+    assert len(cache) == 1
+
+
+def test_me_verifies_each_token_once(client, db, monkeypatch):
+    db.add(User(userFirstName="Ana", userLastName="Silva", userEmail="ana@gmail.com", userType="Buyer", password="x"))
+    db.commit()
+    monkeypatch.setattr(security, "token_cache", TokenCache())
+    decodes = []
+    original_decode = security.decodeJWT
+    monkeypatch.setattr(security, "decodeJWT", lambda token: decodes.append(token) or original_decode(token))
+
+    headers = {"Authorization": f"Bearer {create_access_token(1)}"}
+    for _ in range(3):
+        response = client.get("/api/users/me", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["userEmail"] == "ana@gmail.com"
+    assert len(decodes) == 1
+
+
+def test_invalid_token_is_rejected(client):
+    response = client.get("/api/users/me", headers={"Authorization": "Bearer nao.e.token"})
+    assert response.status_code == 403
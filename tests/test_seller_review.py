@@ -0,0 +1,91 @@
+from src.routers.sellerReview import get_customer_reviews, get_seller_reviews
+from src.utils.models import Address, Category, Country, SellerReview, User
+from src.utils.ratingSummary import backfill_seller_summaries
+
+
+def _seed(db, total_reviews: int):
+    db.add(Country(countryName="São Tomé e Príncipe"))
+    db.add(Category(categoryName="Serviços de Pintura"))
+    db.commit()
+    db.add(Address(distrit="Água Grande", countryId=1))
+    db.add(Address(distrit="Lobata", countryId=1))
+    db.commit()
+    seller = User(userFirstName="Vendedor", userLastName="Teste", userEmail="vendedor@gmail.com",
+                  userType="Seller", password="x", categoryId=1, adressId=1, companyName="ProcuraAqui")
+    db.add(seller)
+    db.commit()
+    for i in range(total_reviews):
+        customer = User(userFirstName=f"Cliente{i}", userLastName="Teste", userEmail=f"cliente{i}@gmail.com",
+                        userType="Buyer", password="x", adressId=2)
+        db.add(customer)
+        db.commit()
+        db.add(SellerReview(sellerId=seller.userId, customerId=customer.userId,
+                            customerReview="Bom serviço", rating=1 + i % 5, hasRating=True))
+    db.commit()
+    return seller.userId
+
+
+def _count_queries(query_counter, run_async, fn, *args):
+    query_counter.clear()
+    result = run_async(fn, *args)
+    return result, len(query_counter)
+
+
+def test_seller_reviews_use_constant_queries(db, query_counter, run_async):
+    seller_id = _seed(db, 1)
+    _, few_queries = _count_queries(query_counter, run_async, get_seller_reviews, seller_id)
+
+    _seed_more(db, seller_id, 40)
+    backfill_seller_summaries(db, force=True)
+    reviews, many_queries = _count_queries(query_counter, run_async, get_seller_reviews, seller_id)
+
+    assert few_queries == many_queries == 2
+    assert len(reviews) == 42
+    assert reviews[-1] == {"totalCustomers": 41}
+
+
+def test_seller_review_shape(db, run_async):
+    seller_id = _seed(db, 1)
+    review = run_async(get_seller_reviews, seller_id)[0]
+
+    assert review["sellerCategory"] == "Serviços de Pintura"
+    assert review["sellerDistrict"] == "Água Grande"
+    assert review["sellerCountry"] == "São Tomé e Príncipe"
+    assert review["costumerDistrict"] == "Lobata"
+    assert review["costumerAdressId"] == 2
+    assert list(review)[:5] == ["sellerReviewId", "customerReview", "hasRating", "rating", "#################"]
+
+
+def test_customer_reviews_use_single_query(db, query_counter, run_async):
+    _seed(db, 30)
+    reviews, queries = _count_queries(query_counter, run_async, get_customer_reviews)
+
+    assert queries == 1
+    assert len(reviews) == 30
+    assert reviews[0]["sellerDistrict"] == "Água Grande"
+
+
+def _seed_more(db, seller_id: int, total: int):
+    for i in range(total):
+        customer = User(userFirstName=f"Extra{i}", userLastName="Teste", userEmail=f"extra{i}@gmail.com",
+                        userType="Buyer", password="x")
+        db.add(customer)
+        db.commit()
+        db.add(SellerReview(sellerId=seller_id, customerId=customer.userId, rating=5, hasRating=True))
+    db.commit()
+
+
+def test_total_customers_closes_the_last_page_and_the_stream(client, db):
+    seller_id = _seed(db, 3)
+    backfill_seller_summaries(db, force=True)
+    params = {"sellerId": seller_id, "limit": 2}
+
+    first = client.get("/api/see/sellerReviews", params=params)
+    assert all("totalCustomers" not in review for review in first.json())
+    last = client.get("/api/see/sellerReviews", params={**params, "cursor": first.headers["X-Next-Cursor"]})
+    assert "X-Next-Cursor" not in last.headers
+    assert last.json()[-1] == {"totalCustomers": 3} and len(last.json()) == 2
+
+    streamed = client.get("/api/see/sellerReviews", params={**params, "stream": True}).json()
+    assert len(streamed) == 4 and streamed[-1] == {"totalCustomers": 3}
+    assert client.get("/api/see/sellerReviews", params={"sellerId": 99, "stream": True}).json() == []
@@ -0,0 +1,76 @@
+from sqlmodel import Session
+
+from src.utils.models import SellerCustomer, SellerReview, SellerSummary, User
+from src.utils.ratingSummary import backfill_seller_summaries
+
+
+def _users(db):
+    for email, user_type in [("vendedor@gmail.com", "Seller"), ("a@gmail.com", "Buyer"), ("b@gmail.com", "Buyer")]:
+        db.add(User(userFirstName="Teste", userLastName="Teste", userEmail=email, userType=user_type, password="x"))
+    db.commit()
+
+
+def _summary(engine, seller_id=1):
+    with Session(engine) as session:
+        return session.get(SellerSummary, seller_id)
+
+
+def test_summary_follows_review_writes(client, db, engine):
+    _users(db)
+    client.post("/api/add/sellerReviews", json={"sellerId": 1, "customerId": 2, "rating": 4})
+    client.post("/api/add/sellerReviews", json={"sellerId": 1, "customerId": 3, "rating": 2})
+
+    summary = _summary(engine)
+    assert (summary.reviewCount, summary.ratingSum, summary.totalCustomers) == (2, 6, 2)
+    assert summary.ratingAverage == 3.0
+
+    client.put("/api/update/sellerReview/1", params={"customerReview": "Ótimo", "rating": 5})
+    summary = _summary(engine)
+    assert (summary.ratingSum, summary.rating4, summary.rating5) == (7, 0, 1)
+
+    client.delete("/api/delete/sellerReview/2")
+    summary = _summary(engine)
+    assert (summary.reviewCount, summary.totalCustomers, summary.ratingAverage) == (1, 1, 5.0)
+
+
+def test_list_users_returns_summary_without_reviews(client, db):
+    _users(db)
+    client.post("/api/add/sellerReviews", json={"sellerId": 1, "customerId": 2, "rating": 5})
+
+    seller = client.get("/api/see/users", params={"user_id": 1}).json()[0]
+    assert "reviewsReceived" not in seller
+    assert seller["reviewSummary"]["histogram"]["5"] == 1
+    assert seller["reviewSummary"]["totalCustomers"] == 1
+
+    seller = client.get("/api/see/users", params={"user_id": 1, "include_reviews": True}).json()[0]
+    assert len(seller["reviewsReceived"]) == 2
+
+
+def test_backfill_matches_incremental_summary(client, db, engine):
+    _users(db)
+    client.post("/api/add/sellerReviews", json={"sellerId": 1, "customerId": 2, "rating": 3})
+    client.post("/api/add/sellerReviews", json={"sellerId": 1, "customerId": 3, "rating": 5})
+    incremental = _summary(engine).model_dump(exclude={"updatedAt"})
+
+    backfill_seller_summaries(db, force=True)
+    assert _summary(engine).model_dump(exclude={"updatedAt"}) == incremental
+
+
+def test_customer_counts_once_until_their_last_review_is_deleted(client, db, engine):
+    _users(db)
+    # Avaliações antigas sem hasRating: o mesmo comprador pode ter várias
+    for rating in (2, 4):
+        db.add(SellerReview(sellerId=1, customerId=2, rating=rating, hasRating=False))
+    db.commit()
+    backfill_seller_summaries(db, force=True)
+    client.post("/api/add/sellerReviews", json={"sellerId": 1, "customerId": 3, "rating": 5})
+    with Session(engine) as session:
+        assert session.get(SellerCustomer, (1, 2)).reviewCount == 2
+    assert (_summary(engine).reviewCount, _summary(engine).totalCustomers) == (3, 2)
+
+    client.delete("/api/delete/sellerReview/1")
+    assert _summary(engine).totalCustomers == 2
+    client.delete("/api/delete/sellerReview/2")
+    assert _summary(engine).totalCustomers == 1
+    with Session(engine) as session:
+        assert session.get(SellerCustomer, (1, 2)) is None
@@ -0,0 +1,45 @@
+from src.utils.models import Category, User
+from src.utils.suggestIndex import SuggestIndex, suggest_index
+
+
+def test_prefix_index_matches_any_word_without_accents():
+    index = SuggestIndex()
+    index.put("product", 1, "Telemóvel Samsung")
+    index.put("product", 2, "Capa para telemóvel")
+    index.put("category", 1, "Telecomunicações")
+
+    assert [(r["type"], r["id"]) for r in index.suggest("TELE")] == [("category", 1), ("product", 2), ("product", 1)]
+    assert [r["text"] for r in index.suggest("sams")] == ["Telemóvel Samsung"]
+    assert index.suggest("tele", kind="category", limit=5) == [{"type": "category", "id": 1, "text": "Telecomunicações"}]
+
+    memory = index.memory_bytes
+    index.put("product", 1, "Tablet")
+    assert index.suggest("sams") == [] and index.suggest("tab")[0]["id"] == 1
+    index.remove("product", 1)
+    assert index.suggest("tab") == [] and index.memory_bytes < memory
+
+
+def test_suggest_route_follows_writes_and_detects_drift(client, db, engine):
+    db.add(Category(categoryName="Moda"))
+    db.commit()
+    suggest_index.rebuild(db)
+
+    response = client.get("/api/suggest", params={"q": "mo"})
+    assert response.json() == [{"type": "category", "id": 1, "text": "Moda"}]
+    assert "suggest;dur=" in response.headers["server-timing"]
+
+    client.put("/api/update/category/1", json={"categoryName": "Calçado"})
+    assert client.get("/api/suggest", params={"q": "mo"}).json() == []
+    client.post("/api/add/products/", json={"productName": "Calças de ganga", "productDescription": None,
+                                            "quantity": 1, "unitPrice": 10, "unitInStock": 1, "picture": None,
+                                            "categoryId": 1})
+    assert [r["text"] for r in client.get("/api/suggest", params={"q": "calc"}).json()] == ["Calçado", "Calças de ganga"]
+    assert suggest_index.check(engine) is False
+
+    # Escrita feita por outro worker: só a verificação de divergência a apanha
+    db.add(User(userFirstName="Ana", userLastName="Silva", userEmail="ana@example.com", userType="Seller",
+                password="x", companyName="Calçados Ana"))
+    db.commit()
+    assert suggest_index.check(engine) is True
+    assert len(client.get("/api/suggest", params={"q": "calc"}).json()) == 3
+    assert client.get("/health/suggest").json()["names"] == 3
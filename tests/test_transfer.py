@@ -0,0 +1,48 @@
+import csv
+import io
+import json
+
+from src.utils.models import Category
+
+
+def test_import_products_csv_and_export_round_trip(client, db, query_counter):
+    db.add(Category(categoryName="Moda"))
+    db.commit()
+    body = (
+        "productName,productDescription,quantity,unitPrice,unitInStock,picture,categoryId\n"
+        'Camisa,"Algodão, ""slim""\ncom bolso",1,19.9,5,,1\n'
+        "Calças,,1,-3,5,,1\n"
+        "Casaco,,1,49.5,2,,1\n"
+    )
+
+    query_counter.clear()
+    report = client.post("/api/import/products", params={"format": "csv"}, content=body.encode()).json()
+    assert (report["imported"], report["failed"]) == (2, 1)
+    assert report["errors"][0]["line"] == 2
+    assert report["errors"][0]["detail"][0]["loc"] == ["unitPrice"]
+    assert len([s for s in query_counter if s.startswith("INSERT INTO product ")]) == 1
+    assert [r["title"] for r in client.get("/api/search", params={"q": "casaco"}).json()] == ["Casaco"]
+
+    response = client.get("/api/export/products", params={"format": "csv"})
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["productName"] for row in rows] == ["Camisa", "Casaco"]
+    assert rows[0]["productDescription"] == 'Algodão, "slim"\ncom bolso'
+    assert rows[0]["unitInOrder"] == "0"
+
+    lines = client.get("/api/export/products").text.splitlines()
+    assert [json.loads(line)["productId"] for line in lines] == [1, 2]
+
+
+def test_import_products_ndjson_reports_bad_lines(client, db):
+    db.add(Category(categoryName="Moda"))
+    db.commit()
+    product = {"productName": "Camisa", "productDescription": None, "quantity": 1, "unitPrice": 10,
+               "unitInStock": 5, "picture": None, "categoryId": 1}
+    body = "\n".join([json.dumps(product), "{não é json", "", json.dumps({**product, "productName": "Boné"})])
+
+    report = client.post("/api/import/products", content=body.encode()).json()
+    assert (report["imported"], report["failed"]) == (2, 1)
+    assert report["errors"][0]["line"] == 2
+    assert report["errors"][0]["detail"].startswith("JSON inválido")
+    assert client.get("/api/export/orders").text == ""
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from shared import uploads
+from src.utils.models import User
+
+
+@pytest.fixture
+def upload_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_ROOT", str(tmp_path))
+    return tmp_path
+
+
+def add_seller(db, email: str) -> int:
+    user = User(userFirstName="Ana", userLastName="Silva", userEmail=email, userType="Seller", password="x")
+    db.add(user)
+    db.commit()
+    return user.userId
+
+
+def upload(client, user_id: int, content: bytes, filename: str = "foto.PNG"):
+    return client.put(f"/api/update/user/{user_id}/image", files={"userImage": (filename, content, "image/png")})
+
+
+def test_identical_images_are_stored_once(client, db, upload_root):
+    first, second = add_seller(db, "a@gmail.com"), add_seller(db, "b@gmail.com")
+    content = b"\x89PNG" + os.urandom(200_000)
+
+    image_a = upload(client, first, content).json()["userImage"]
+    image_b = upload(client, second, content, "outra.png").json()["userImage"]
+    assert image_a == image_b
+
+    relative = image_a.split("/images/", 1)[1]
+    folder, shard1, shard2, name = relative.split("/")
+    assert folder == "seller_images" and name.endswith(".png")
+    assert name.startswith(shard1 + shard2)
+    assert (upload_root / relative).read_bytes() == content
+    files = [f for _, _, names in os.walk(upload_root / "seller_images") for f in names]
+    assert files == [name]
+
+
+def test_oversized_upload_is_rejected(client, db, upload_root, monkeypatch):
+    user_id = add_seller(db, "c@gmail.com")
+    monkeypatch.setattr(uploads, "IMAGE_MAX_BYTES", 1000)
+    # O middleware deixa passar (limite de 5 MB), o limite por ficheiro corta a escrita
+    response = client.put(f"/api/update/user/{user_id}/image",
+                          files={"userImage": ("foto.png", b"x" * 5000, "image/png")})
+    assert response.status_code == 413
+    assert not any(names for _, _, names in os.walk(upload_root / "seller_images"))
+
+
+def test_middleware_rejects_large_multipart_body(client, db, upload_root):
+    user_id = add_seller(db, "d@gmail.com")
+    response = upload(client, user_id, b"x" * (uploads.IMAGE_MAX_BYTES + uploads.MULTIPART_OVERHEAD + 1))
+    assert response.status_code == 413
+
+
+def test_content_addressed_image_is_immutable_and_revalidates(client, db, upload_root):
+    user_id = add_seller(db, "e@gmail.com")
+    content = os.urandom(4096)
+    url = upload(client, user_id, content).json()["userImage"]
+    path = "/images/" + url.split("/images/", 1)[1]
+
+    response = client.get(path)
+    assert response.content == content
+    assert "immutable" in response.headers["cache-control"]
+    etag = response.headers["etag"]
+
+    cached = client.get(path, headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.content == b""
+
+    partial = client.get(path, headers={"Range": "bytes=100-199"})
+    assert partial.status_code == 206 and partial.content == content[100:200]
+
+
+def test_legacy_image_urls_still_served(client, upload_root):
+    legacy = upload_root / "buyer_images" / "7_avatar.png"
+    legacy.parent.mkdir(parents=True, exist_ok=True)
+    legacy.write_bytes(b"antigo")
+
+    response = client.get("/buyer_images/7_avatar.png")
+    assert response.content == b"antigo"
+    assert response.headers["cache-control"] == "public, no-cache"
+    assert client.get("/images/buyer_images/..%2F..%2F..%2Fetc%2Fpasswd").status_code == 404
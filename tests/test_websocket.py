@@ -0,0 +1,249 @@
+import asyncio
+import json
+
+import pytest
+
+from shared.broker import Broker, InMemoryBroker, MessageTooLarge, PostgresBroker, pack_batches
+from shared.websocket import ConnectionManager
+
+
+class FakeSocket:
+    def __init__(self, stalled: bool = False):
+        self.stalled = stalled
+        self.received = []
+        self.closed_with = None
+
+    async def send_text(self, message: str):
+        if self.stalled:
+            await asyncio.Event().wait()
+        self.received.append(message)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+def test_stalled_client_does_not_block_broadcast():
+    async def scenario():
+        manager = ConnectionManager(queue_size=2, policy="drop_oldest")
+        fast, stalled = FakeSocket(), FakeSocket(stalled=True)
+        manager.register(fast)
+        manager.register(stalled)
+        for i in range(5):
+            await manager.broadcast(f"m{i}")
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.01)
+        return manager, fast
+
+    manager, fast = asyncio.run(scenario())
+    assert fast.received == ["m0", "m1", "m2", "m3", "m4"]
+    # O cliente parado ficou com a mensagem em envio e a fila limitada a 2
+    assert manager.dropped_messages == 2
+    assert manager.stats()["connections"] == 2
+
+
+def test_disconnect_policy_evicts_slow_consumer():
+    async def scenario():
+        manager = ConnectionManager(queue_size=1, policy="disconnect")
+        stalled = FakeSocket(stalled=True)
+        manager.register(stalled)
+        for i in range(3):
+            await manager.broadcast(f"m{i}")
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        return manager, stalled
+
+    manager, stalled = asyncio.run(scenario())
+    assert manager.stats()["connections"] == 0
+    assert manager.evicted_connections == 1
+    assert stalled.closed_with == 1013
+
+
+def test_chat_endpoint_broadcasts(client):
+    with client.websocket_connect("/ws/1") as first, client.websocket_connect("/ws/2") as second:
+        first.send_text("olá")
+        assert first.receive_text() == "You wrote: olá"
+        assert first.receive_text() == "Client #1 says: olá"
+        assert second.receive_text() == "Client #1 says: olá"
+
+
+def test_shared_broker_reaches_every_worker():
+    async def scenario():
+        broker = InMemoryBroker()
+        workers = [ConnectionManager(broker=broker), ConnectionManager(broker=broker)]
+        sockets = [FakeSocket(), FakeSocket()]
+        for worker, socket in zip(workers, sockets):
+            worker.register(socket)
+        await workers[0].broadcast("olá")
+        await asyncio.sleep(0.001)
+        return sockets
+
+    assert [socket.received for socket in asyncio.run(scenario())] == [["olá"], ["olá"]]
+
+
+class RecordingPostgresBroker(PostgresBroker):
+    def __init__(self):
+        super().__init__("postgresql://unused", batch_interval=0.001)
+        self.payloads = []
+
+    async def _notify(self, payload: str):
+        self.payloads.append(payload)
+
+
+def test_postgres_broker_batches_one_notify_per_tick():
+    async def scenario():
+        sender, receiver = RecordingPostgresBroker(), RecordingPostgresBroker()
+        received = []
+
+        async def deliver(message):
+            received.append(message)
+
+        receiver.subscribe(deliver)
+        for i in range(50):
+            await sender.publish(f"m{i}")
+        await asyncio.sleep(0.01)
+        for payload in sender.payloads:
+            await receiver._receive(payload)
+            # A própria origem é ignorada: os clientes locais já receberam a mensagem
+            await sender._receive(payload)
+        return sender, received
+
+    sender, received = asyncio.run(scenario())
+    assert len(sender.payloads) == 1
+    assert json.loads(sender.payloads[0])["messages"] == [f"m{i}" for i in range(50)]
+    assert received == [f"m{i}" for i in range(50)]
+
+
+def test_pack_batches_respects_notify_limit():
+    batches = pack_batches(["x" * 30] * 10, limit=100)
+    assert all(len(json.dumps(batch)) <= 100 for batch in batches)
+    assert sum(batches, []) == ["x" * 30] * 10
+
+
+def test_oversized_message_is_refused_on_every_broker():
+    async def scenario():
+        memory, postgres = InMemoryBroker(max_message_size=100), RecordingPostgresBroker()
+        postgres.max_message_size = 100
+        received = []
+
+        async def deliver(message):
+            received.append(message)
+
+        for broker in (memory, postgres):
+            broker.subscribe(deliver)
+            await broker.publish("curta")
+            try:
+                await broker.publish("é" * 50)
+            except MessageTooLarge:
+                pass
+        await asyncio.sleep(0.01)
+        return memory, postgres, received
+
+    memory, postgres, received = asyncio.run(scenario())
+    # Nem os clientes locais recebem a mensagem que não cabe no NOTIFY
+    assert received == ["curta", "curta"]
+    assert [json.loads(payload)["messages"] for payload in postgres.payloads] == [["curta"]]
+    assert memory.stats()["rejected"] == postgres.stats()["rejected"] == 1
+
+
+def test_chat_endpoint_refuses_oversized_message(client):
+    with client.websocket_connect("/ws/1") as first:
+        first.send_text("x" * 5000)
+        assert first.receive_text() == "You wrote: " + "x" * 5000
+        assert first.receive_text() == "Message too long, it was not sent"
+
+
+def test_notifications_are_delivered_in_order():
+    async def scenario():
+        sender, receiver = RecordingPostgresBroker(), RecordingPostgresBroker()
+        received = []
+
+        async def deliver(message):
+            await asyncio.sleep(0.001 * (len(received) % 2))
+            received.append(message)
+
+        receiver.subscribe(deliver)
+        receiver._receiver = asyncio.create_task(receiver._receive_forever())
+        for i in range(20):
+            await sender.publish(f"m{i}")
+            await asyncio.sleep(0.002)
+        for payload in sender.payloads:
+            receiver._on_notify(None, 0, receiver.channel, payload)
+        await asyncio.sleep(0.1)
+        receiver._receiver.cancel()
+        return sender, received
+
+    sender, received = asyncio.run(scenario())
+    assert len(sender.payloads) > 1
+    assert received == [f"m{i}" for i in range(20)]
+
+
+class FakeConnection:
+    def __init__(self):
+        self.termination_listeners = []
+        self.closed = False
+        self.executed = []
+
+    def add_termination_listener(self, callback):
+        self.termination_listeners.append(callback)
+
+    def remove_termination_listener(self, callback):
+        self.termination_listeners.remove(callback)
+
+    async def add_listener(self, channel, callback):
+        pass
+
+    async def execute(self, query, *args):
+        self.executed.append(args)
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+        for callback in list(self.termination_listeners):
+            callback(self)
+
+    def terminate(self):
+        self.closed = True
+
+    def drop(self):
+        self.closed = True
+        for callback in list(self.termination_listeners):
+            callback(self)
+
+
+def test_lost_publisher_reconnects_and_closes_old_connections(monkeypatch):
+    import asyncpg
+
+    connections = []
+
+    async def connect(dsn):
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(asyncpg, "connect", connect)
+
+    async def scenario():
+        broker = PostgresBroker("postgresql://unused", batch_interval=0.001)
+        await broker.start()
+        listener, publisher = connections
+        publisher.drop()
+        await asyncio.sleep(0.01)
+        await broker.publish("olá")
+        await asyncio.sleep(0.01)
+        tasks = [broker._supervisor, broker._receiver]
+        await broker.stop()
+        # As tarefas canceladas terminaram antes de stop() devolver
+        assert all(task.done() for task in tasks)
+        return broker, listener
+
+    broker, listener = asyncio.run(scenario())
+    # Um só restabelecimento: fechar as ligações antigas não conta como nova perda
+    assert len(connections) == 4 and broker.reconnects == 1
+    assert listener.closed and all(connection.closed for connection in connections)
+    assert connections[3].executed == [("chat", json.dumps({"origin": broker.origin, "messages": ["olá"]}))]
+
+
+def test_broker_without_publish_cannot_be_created():
+    with pytest.raises(TypeError):
+        Broker()